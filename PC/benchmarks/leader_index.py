@@ -0,0 +1,112 @@
+"""Per-lap cost of gap/interval computation over a long (endurance) race.
+
+Feeds synthetic crossings through RaceManager + RaceLog and reports the
+median cost per LAP event in consecutive windows, next to the previous approach
+(scan every car's lap list for the leader of that lap) replayed on the same laps.
+
+    python benchmarks/leader_index.py
+    python benchmarks/leader_index.py --cars 6 --laps 20000 --window 2000
+"""
+import argparse
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import numpy as np  # noqa: E402
+
+from perlap.models import race_log  # noqa: E402
+from perlap.models.events import EventType  # noqa: E402
+from perlap.models.race import RaceManager  # noqa: E402
+from perlap.models.race_log import RaceLog  # noqa: E402
+
+
+def crossings(cars: int, laps: int, seed: int = 1):
+    """(car_id, t) in time order; every car laps in 4-6 s with some noise."""
+    rng = random.Random(seed)
+    pace = [rng.uniform(4.0, 6.0) for _ in range(cars)]
+    events = []
+    for car in range(cars):
+        t = rng.uniform(0, 1)
+        for _ in range(laps + 1):
+            events.append((t, car))
+            t += pace[car] + rng.uniform(-0.3, 0.3)
+    events.sort()
+    return [(car, t) for t, car in events]
+
+
+def scan_leader(car_laps: dict[int, list[dict]], lap_number: int) -> int:
+    # Previous RaceLog._find_leader_timestamp
+    earliest = 0
+    for laps in car_laps.values():
+        for lap in laps:
+            if lap["lap"] == lap_number:
+                if earliest == 0 or lap["timestamp_ms"] < earliest:
+                    earliest = lap["timestamp_ms"]
+                break
+    return earliest
+
+
+def run(cars: int, laps_per_car: int, with_scan: bool):
+    race = RaceManager()
+    for i in range(cars):
+        race.register_car(i, f"CAR{i}", np.zeros(3), np.zeros(3), (0, 0, 0))
+    log = RaceLog()
+    race.reset()
+    log.start_race({i: f"CAR{i}" for i in range(cars)})
+    t0 = race._start_time
+
+    indexed: list[float] = []
+    laps = []
+    for car, t in crossings(cars, laps_per_car):
+        start = time.perf_counter()
+        ev = race.process_crossing(car, "BENCH", t0 + t)
+        log.record_event(ev)
+        elapsed = time.perf_counter() - start
+        if ev is not None and ev.event == EventType.LAP:
+            indexed.append(elapsed)
+            laps.append(ev)
+    log.end_race()
+
+    # Separate pass so the scan's growing lists don't skew the indexed timings
+    scanned: list[float] = []
+    if with_scan:
+        car_laps: dict[int, list[dict]] = {i: [] for i in range(cars)}
+        for ev in laps:
+            start = time.perf_counter()
+            leader = scan_leader(car_laps, ev.lap_number)
+            car_laps[ev.car_id].append({"lap": ev.lap_number, "timestamp_ms": ev.timestamp_ms})
+            scanned.append(time.perf_counter() - start)
+            assert ev.timestamp_ms - (leader or ev.timestamp_ms) == ev.gap_to_leader_ms
+    return indexed, scanned
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=6)
+    parser.add_argument("--laps", type=int, default=2000, help="vueltas por auto")
+    parser.add_argument("--window", type=int, default=1000, help="vueltas por fila")
+    parser.add_argument("--no-scan", action="store_true",
+                        help="no medir el recorrido lineal anterior")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        race_log.RACES_DIR = tmp
+        indexed, scanned = run(args.cars, args.laps, not args.no_scan)
+
+    print(f"cars={args.cars} laps={len(indexed)} (mediana, us por evento LAP)")
+    print(f"{'laps':>12} {'indice':>10} {'scan':>10}")
+    for lo in range(0, len(indexed), args.window):
+        hi = min(lo + args.window, len(indexed))
+        # Median: batched fsync makes every FSYNC_BATCH-th event an outlier
+        idx_us = statistics.median(indexed[lo:hi]) * 1e6
+        scan_us = statistics.median(scanned[lo:hi]) * 1e6 if scanned else float("nan")
+        print(f"{lo:>5}-{hi:<6} {idx_us:>10.1f} {scan_us:>10.1f}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,90 @@
+"""UI load test: replay a race through MainWindow at max speed.
+
+Every event goes through ``RaceManager`` and then, one batch per replay
+step, to the standings/lap history exactly as live timing results would.
+Reports events per second, the longest event loop iteration (what a user
+would feel as a stall) and the cost of seeking back and forth.
+
+    python benchmarks/replay_ui.py                       # synthetic 6 cars x 2000 laps
+    python benchmarks/replay_ui.py --cars 20 --laps 5000 --offscreen
+    python benchmarks/replay_ui.py --race races/2026-02-12_15-30-00.plr
+"""
+import argparse
+import functools
+import os
+import random
+import statistics
+import sys
+import tempfile
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from perlap.models import race_log  # noqa: E402
+from perlap.models.race import RaceManager  # noqa: E402
+from perlap.models.race_log import RaceLog  # noqa: E402
+from perlap.models.ranking_store import RankingStore  # noqa: E402
+from perlap.sim.race_sim import SimConfig, simulate  # noqa: E402
+
+
+def synthetic_race(cars: int, laps: int) -> str:
+    simulate(SimConfig(cars=cars, laps=laps), RaceLog())
+    return RaceLog.list_races()[0]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--race", help="archivo .plr/.json (por defecto una carrera sintetica)")
+    parser.add_argument("--cars", type=int, default=6)
+    parser.add_argument("--laps", type=int, default=2000, help="vueltas por auto")
+    parser.add_argument("--seeks", type=int, default=20)
+    parser.add_argument("--offscreen", action="store_true", help="sin ventana (QPA offscreen)")
+    args = parser.parse_args()
+    if args.offscreen:
+        os.environ["QT_QPA_PLATFORM"] = "offscreen"
+
+    from PySide6.QtWidgets import QApplication
+    from perlap.ui.sources import CameraSource
+    from perlap.detection.replay import SPEED_MAX
+    from perlap.ui import main_window
+
+    with tempfile.TemporaryDirectory() as tmp:
+        race_log.RACES_DIR = tmp
+        main_window.CONFIG_PATH = os.path.join(tmp, "config.json")
+        main_window.RankingStore = functools.partial(
+            RankingStore, os.path.join(tmp, "ranking.sqlite3"), None)
+        path = args.race or synthetic_race(args.cars, args.laps)
+
+        app = QApplication.instance() or QApplication([])
+        window = main_window.MainWindow(RaceManager(), CameraSource())
+        window.show()
+        app.processEvents()
+
+        window.start_replay(path, SPEED_MAX)
+        replay = window._replay
+        stalls = []
+        start = time.perf_counter()
+        while replay.index < len(replay):
+            t = time.perf_counter()
+            app.processEvents()
+            stalls.append(time.perf_counter() - t)
+        elapsed = time.perf_counter() - start
+
+        rng = random.Random(1)
+        seeks = []
+        for _ in range(args.seeks):
+            t = time.perf_counter()
+            replay.seek(rng.randint(0, len(replay)))
+            app.processEvents()
+            seeks.append(time.perf_counter() - t)
+
+        print(f"{len(replay)} eventos en {elapsed:.2f} s = {len(replay) / elapsed:.0f} eventos/s")
+        print(f"iteracion del event loop: mediana {statistics.median(stalls) * 1000:.1f} ms, "
+              f"max {max(stalls) * 1000:.1f} ms")
+        print(f"seek (con redibujado): mediana {statistics.median(seeks) * 1000:.1f} ms, "
+              f"max {max(seeks) * 1000:.1f} ms")
+        window.close()
+
+
+if __name__ == "__main__":
+    main()
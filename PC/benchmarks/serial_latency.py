@@ -0,0 +1,178 @@
+"""End-to-end latency and throughput of an Arduino reader against VirtualArduino.
+
+Latency is measured from the moment the simulated device writes a crossing
+line to the moment ``crossing_detected`` (``device_start``/``device_lap`` for
+LapTimer v2) is delivered to a slot on the Qt main thread. ``stamp`` is the
+error of the capture timestamp the signal carries (what lap times are computed
+from), which should stay flat however loaded the dispatch is.
+
+    python benchmarks/serial_latency.py
+    python benchmarks/serial_latency.py --firmware v2 --stream-hz 0 100 1000 5000
+    python benchmarks/serial_latency.py --reader mymodule:FasterArduinoSource
+"""
+import argparse
+import importlib
+import os
+import statistics
+import sys
+import threading
+import time
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from PySide6.QtCore import QCoreApplication, QTimer  # noqa: E402
+
+from perlap.sim.virtual_arduino import VirtualArduino, FIRMWARE_LASER, FIRMWARE_V2  # noqa: E402
+
+
+def load_reader(spec: str):
+    module, _, name = spec.partition(":")
+    return getattr(importlib.import_module(module), name)
+
+
+def percentile(values: list[float], p: float) -> float:
+    if not values:
+        return 0.0
+    values = sorted(values)
+    k = min(len(values) - 1, int(round(p / 100 * (len(values) - 1))))
+    return values[k]
+
+
+def run_case(app, reader_cls, firmware: str, stream_hz: float, cuts: int,
+             interval_s: float, malformed_rate: float, unplug_s: float) -> dict:
+    dev = VirtualArduino(firmware, stream_hz=stream_hz, enforce_min_lap=False)
+    dev.start()
+
+    reader = reader_cls()
+    reader.port = dev.port
+    sent: list[float] = []
+    received: list[float] = []
+    stamped: list[float] = []
+    ldr_count = [0]
+    connected = threading.Event()
+
+    def on_crossing(*args):
+        received.append(time.perf_counter())
+        stamped.append(next(a for a in args if isinstance(a, float)))
+
+    def on_ldr(_value):
+        ldr_count[0] += 1
+
+    reconnected_at: list[float] = []
+
+    def on_connection(ok):
+        if ok:
+            if connected.is_set():
+                reconnected_at.append(time.perf_counter())
+            connected.set()
+
+    if firmware == FIRMWARE_V2:
+        reader.set_cars([(0, "SIM")])
+        reader.device_start.connect(on_crossing)
+        reader.device_lap.connect(on_crossing)
+    else:
+        reader.crossing_detected.connect(on_crossing)
+    reader.ldr_value.connect(on_ldr)
+    reader.connection_changed.connect(on_connection)
+
+    done = threading.Event()
+
+    def drive():
+        if not connected.wait(10):
+            done.set()
+            return
+        if firmware == FIRMWARE_V2:
+            time.sleep(0.2)  # let REG reach the device
+        dev.streaming = stream_hz > 0
+        time.sleep(0.2)
+        ldr_start = ldr_count[0]
+        t0 = time.perf_counter()
+        for _ in range(cuts):
+            t = dev.cut(0)
+            if t is not None:
+                sent.append(t)
+            if malformed_rate and len(sent) % max(1, int(1 / malformed_rate)) == 0:
+                dev.send_malformed()
+            time.sleep(interval_s)
+        time.sleep(0.5)  # drain
+        elapsed = time.perf_counter() - t0
+        drive.ldr_rate = (ldr_count[0] - ldr_start) / elapsed
+        if unplug_s > 0:
+            # Cable bump: time from plugging back in to the reader streaming again
+            dev.disconnect(unplug_s, blocking=True)
+            replugged = time.perf_counter()
+            deadline = replugged + 10
+            while not reconnected_at and time.perf_counter() < deadline:
+                time.sleep(0.01)
+            if reconnected_at:
+                drive.reconnect_ms = (reconnected_at[0] - replugged) * 1000
+        done.set()
+
+    drive.ldr_rate = 0.0
+    drive.reconnect_ms = float("nan")
+    threading.Thread(target=drive, daemon=True).start()
+
+    reader.start()
+
+    def check_done():
+        if done.is_set():
+            app.quit()
+
+    poll = QTimer()
+    poll.timeout.connect(check_done)
+    poll.start(20)
+    app.exec()
+    poll.stop()
+    reader.stop()
+    dev.stop()
+
+    n = min(len(sent), len(received))
+    lat_ms = [(received[i] - sent[i]) * 1000 for i in range(n)]
+    stamp_ms = [(stamped[i] - sent[i]) * 1000 for i in range(n)]
+    return {
+        "firmware": firmware,
+        "stream_hz": stream_hz,
+        "sent": len(sent),
+        "received": len(received),
+        "p50_ms": percentile(lat_ms, 50),
+        "p95_ms": percentile(lat_ms, 95),
+        "p99_ms": percentile(lat_ms, 99),
+        "max_ms": max(lat_ms, default=0.0),
+        "mean_ms": statistics.fmean(lat_ms) if lat_ms else 0.0,
+        "stamp_p99_ms": percentile(stamp_ms, 99),
+        "ldr_per_s": drive.ldr_rate,
+        "reconnect_ms": drive.reconnect_ms,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--reader", default="perlap.ui.sources:ArduinoSource")
+    parser.add_argument("--firmware", choices=(FIRMWARE_LASER, FIRMWARE_V2),
+                        default=FIRMWARE_LASER)
+    parser.add_argument("--cuts", type=int, default=200)
+    parser.add_argument("--interval", type=float, default=0.02, help="s entre cruces")
+    parser.add_argument("--stream-hz", type=float, nargs="+", default=[0, 10, 200, 2000],
+                        help="LDR_STREAM simultaneo (carga)")
+    parser.add_argument("--malformed", type=float, default=0.0,
+                        help="fraccion de lineas corruptas intercaladas")
+    parser.add_argument("--unplug", type=float, default=0.3,
+                        help="s desconectado al final de cada caso (0 = no)")
+    args = parser.parse_args()
+
+    app = QCoreApplication(sys.argv)
+    reader_cls = load_reader(args.reader)
+    print(f"reader={args.reader} firmware={args.firmware} cuts={args.cuts}")
+    print(f"{'stream_hz':>9} {'sent':>5} {'recv':>5} {'p50':>7} {'p95':>7} "
+          f"{'p99':>7} {'max':>7} {'stamp99':>8} {'ldr/s':>8} {'reconn':>8}")
+    for hz in args.stream_hz:
+        r = run_case(app, reader_cls, args.firmware, hz, args.cuts, args.interval,
+                     args.malformed, args.unplug)
+        print(f"{r['stream_hz']:>9.0f} {r['sent']:>5} {r['received']:>5} "
+              f"{r['p50_ms']:>6.2f}m {r['p95_ms']:>6.2f}m {r['p99_ms']:>6.2f}m "
+              f"{r['max_ms']:>6.2f}m {r['stamp_p99_ms']:>7.2f}m "
+              f"{r['ldr_per_s']:>8.0f} {r['reconnect_ms']:>6.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
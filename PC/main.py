@@ -1,9 +1,9 @@
 import sys
 from PySide6.QtWidgets import QApplication
+from perlap.config import load_config
 from perlap.models.race import RaceManager
-from perlap.detection.camera import CameraSource
-from perlap.detection.arduino import ArduinoSource
 from perlap.ui.main_window import MainWindow
+from perlap.ui.sources import CameraSource, ArduinoSource, MultiCameraSource
 
 
 def main():
@@ -11,7 +11,9 @@ def main():
     app.setStyle("Fusion")
 
     race = RaceManager()
-    camera = CameraSource(device_index=0)
+    # config.json "cameras": several cameras, each in its own process
+    cameras = load_config().cameras
+    camera = MultiCameraSource(cameras) if cameras else CameraSource(device_index=0)
     arduino = ArduinoSource()
 
     window = MainWindow(
@@ -19,7 +21,6 @@ def main():
         camera_source=camera,
         arduino_source=arduino,
     )
-    camera.start()
     window.show()
 
     ret = app.exec()
@@ -0,0 +1,167 @@
+"""Race archive tools.
+
+    python -m perlap.archive rebuild [--full]
+    python -m perlap.archive races --since 2026-03
+    python -m perlap.archive best-laps --car ROJO --since 2026-03 --until 2026-03
+    python -m perlap.archive report --since 2026-01 [--car ROJO]
+    python -m perlap.archive export 2026-03-01_15-30-00 --csv [--laps-only] [-o salida/]
+    python -m perlap.archive compact [--keep-json]
+"""
+import argparse
+import os
+import sys
+import time
+
+from ..models import race_log
+from ..timefmt import format_time
+from . import analytics, columnar
+from .catalog import RaceCatalog, CATALOG_NAME
+
+
+def cmd_rebuild(catalog: RaceCatalog, args):
+    t0 = time.perf_counter()
+    res = catalog.rebuild(args.dir, full=args.full)
+    print(f"importadas {res['imported']}, sin cambios {res['skipped']}, "
+          f"con error {res['failed']}, eliminadas {res['removed']} "
+          f"({time.perf_counter() - t0:.2f}s)")
+
+
+def cmd_races(catalog: RaceCatalog, args):
+    for r in catalog.list_races(args.since, args.until, args.limit):
+        print(f"{r['id']}  {r['num_cars']:>2} autos  {r['total_laps']:>4} vueltas  "
+              f"{format_time(r['duration_ms'])}")
+
+
+def cmd_best_laps(catalog: RaceCatalog, args):
+    t0 = time.perf_counter()
+    rows = catalog.best_laps(args.car, args.since, args.until, args.limit)
+    for i, lap in enumerate(rows, 1):
+        print(f"{i:>3}. {format_time(lap['time_ms']):>9}  {lap['car_name']:<12} "
+              f"vuelta {lap['lap']:<4} {lap['race_id']}")
+    print(f"({len(rows)} filas en {(time.perf_counter() - t0) * 1000:.1f} ms)")
+
+
+def cmd_cars(catalog: RaceCatalog, args):
+    for name in catalog.car_names():
+        print(name)
+
+
+def cmd_report(args):
+    t0 = time.perf_counter()
+    data = analytics.load_laps(args.dir, use_cache=not args.no_cache)
+    load_s = time.perf_counter() - t0
+    if args.car:
+        for s in data.sessions(args.car, args.since, args.until):
+            print(f"{s['date']}  {s['race_id']}  {s['laps']:>4} vueltas  "
+                  f"mejor {format_time(s['best_ms']):>8}  mediana {format_time(s['median_ms']):>8}")
+    else:
+        print(f"{'Auto':<12} {'Ses':>4} {'Vtas':>6} {'Mejor':>8} {'Mediana':>8} {'P10':>8} "
+              f"{'P90':>8} {'σ':>8} {'Teorica':>8} {'Mejora':>8} {'ms/dia':>7}")
+        for r in data.car_stats(args.since, args.until):
+            print(f"{r['car']:<12} {r['sessions']:>4} {r['laps']:>6} "
+                  f"{format_time(r['best_ms']):>8} {format_time(r['median_ms']):>8} "
+                  f"{format_time(r['p10_ms']):>8} {format_time(r['p90_ms']):>8} "
+                  f"{format_time(r['stddev_ms']):>8} {format_time(r['theoretical_best_ms']):>8} "
+                  f"{r['improvement_ms'] / 1000:>+7.3f}s {r['trend_ms_per_day']:>7.1f}")
+    print(f"({data.num_races} carreras, {len(data)} vueltas; carga {load_s * 1000:.0f} ms, "
+          f"total {(time.perf_counter() - t0) * 1000:.0f} ms)")
+
+
+def _race_path(name: str) -> str:
+    """A path as given, or a race id looked up in races/."""
+    if os.path.exists(name):
+        return name
+    for ext in (columnar.RACE_EXT, columnar.JSON_EXT):
+        path = os.path.join(race_log.RACES_DIR, name + ext)
+        if os.path.exists(path):
+            return path
+    raise SystemExit(f"No existe la carrera: {name}")
+
+
+def cmd_export(args):
+    os.makedirs(args.out, exist_ok=True)
+    t0 = time.perf_counter()
+    for name in args.races:
+        path = _race_path(name)
+        stem = os.path.join(args.out, os.path.splitext(os.path.basename(path))[0])
+        if not path.endswith(columnar.RACE_EXT):
+            # Legacy JSON: convert in memory through a temporary race file
+            tmp = stem + columnar.RACE_EXT + ".export"
+            columnar.from_summary(race_log.RaceLog.load_race(path), tmp)
+            path = tmp
+        race = columnar.RaceFile(path)
+        try:
+            if args.json:
+                race.export_json(stem + ".json")
+            if args.csv or not args.json:
+                race.export_csv(stem + ".csv", laps_only=args.laps_only)
+        finally:
+            race.close()
+            if path.endswith(".export"):
+                os.remove(path)
+    print(f"{len(args.races)} carrera(s) exportadas a {args.out} "
+          f"({(time.perf_counter() - t0) * 1000:.0f} ms)")
+
+
+def cmd_compact(args):
+    converted, failed = columnar.compact_dir(args.dir or race_log.RACES_DIR, args.keep_json)
+    print(f"convertidas {converted}, con error {failed}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(prog="python -m perlap.archive",
+                                     description=__doc__.splitlines()[0])
+    parser.add_argument("--catalog", help="ruta del catalogo (por defecto races/)")
+    sub = parser.add_subparsers(dest="command", required=True)
+
+    p = sub.add_parser("rebuild", help="importar/sincronizar los archivos de carreras")
+    p.add_argument("--dir", default=None, help="carpeta de carreras")
+    p.add_argument("--full", action="store_true", help="reimportar todo")
+    p.set_defaults(func=cmd_rebuild)
+
+    for name, func in (("races", cmd_races), ("best-laps", cmd_best_laps)):
+        p = sub.add_parser(name)
+        p.add_argument("--since", default="", help="fecha ISO inicial (YYYY-MM[-DD])")
+        p.add_argument("--until", default="", help="fecha ISO final, inclusive")
+        p.add_argument("--limit", type=int, default=10 if name == "best-laps" else None)
+        if name == "best-laps":
+            p.add_argument("--car", default="", help="nombre del auto")
+        p.set_defaults(func=func)
+
+    p = sub.add_parser("cars", help="nombres de autos en el catalogo")
+    p.set_defaults(func=cmd_cars)
+
+    p = sub.add_parser("report", help="estadisticas por auto entre carreras")
+    p.add_argument("--dir", default=None, help="carpeta de carreras")
+    p.add_argument("--since", default="", help="fecha ISO inicial (YYYY-MM[-DD])")
+    p.add_argument("--until", default="", help="fecha ISO final, inclusive")
+    p.add_argument("--car", default="", help="detalle por sesion de un auto")
+    p.add_argument("--no-cache", action="store_true", help="releer todas las carreras")
+
+    p = sub.add_parser("export", help="exportar carreras a CSV y/o JSON")
+    p.add_argument("races", nargs="+", help="id de carrera o ruta del archivo")
+    p.add_argument("--csv", action="store_true", help="CSV (por defecto)")
+    p.add_argument("--json", action="store_true", help="JSON con el formato anterior")
+    p.add_argument("--laps-only", action="store_true", help="solo eventos de vuelta")
+    p.add_argument("-o", "--out", default=".", help="carpeta de salida")
+
+    p = sub.add_parser("compact", help="convertir los JSON de carreras a .plr")
+    p.add_argument("--dir", default=None, help="carpeta de carreras")
+    p.add_argument("--keep-json", action="store_true", help="no borrar los JSON")
+
+    args = parser.parse_args(argv)
+    # These read the race files directly; no catalog needed
+    if args.command == "report":
+        return cmd_report(args)
+    if args.command == "export":
+        return cmd_export(args)
+    if args.command == "compact":
+        return cmd_compact(args)
+    if args.command == "rebuild" and args.dir and not args.catalog:
+        args.catalog = os.path.join(args.dir, CATALOG_NAME)
+    with RaceCatalog(args.catalog) as catalog:
+        args.func(catalog, args)
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,365 @@
+import json
+import os
+from typing import Optional
+
+import numpy as np
+
+from ..models import race_log
+from . import columnar
+from .columnar import MAX_SECTORS
+
+CACHE_NAME = "laps_cache.npz"
+
+_LAP_COLUMNS = ("race", "car", "lap", "time_ms", "timestamp_ms", "sectors")
+_RACE_COLUMNS = ("race_ids", "race_days", "race_paths", "race_mtimes", "race_offsets")
+_BAD_COLUMNS = ("bad_paths", "bad_mtimes")  # files that did not parse, skipped until modified
+
+# races_dir -> ((path, mtime) signature, LapData): repeated reports skip even the cache file
+_memo: dict[str, tuple[tuple, "LapData"]] = {}
+
+
+class LapData:
+    """Every lap of the archive as flat NumPy columns.
+
+    Lap rows are grouped by race (``race_offsets``); ``race`` and ``car`` are
+    indices into the per-race arrays and ``car_names``. Dates are kept as days
+    since the epoch so range filters are plain integer comparisons.
+    """
+
+    def __init__(self, **arrays):
+        self.race = arrays["race"]
+        self.car = arrays["car"]
+        self.lap = arrays["lap"]
+        self.time_ms = arrays["time_ms"]
+        self.timestamp_ms = arrays["timestamp_ms"]
+        self.sectors = arrays["sectors"]          # (laps, MAX_SECTORS), 0 = not timed
+        self.race_ids = arrays["race_ids"]
+        self.race_days = arrays["race_days"]
+        self.race_paths = arrays["race_paths"]
+        self.race_mtimes = arrays["race_mtimes"]
+        self.race_offsets = arrays["race_offsets"]
+        self.car_names = arrays["car_names"]
+        self.bad_paths = arrays.get("bad_paths", np.zeros(0, "U260"))
+        self.bad_mtimes = arrays.get("bad_mtimes", np.zeros(0, np.float64))
+
+    @staticmethod
+    def empty() -> "LapData":
+        return LapData(
+            race=np.zeros(0, np.int32), car=np.zeros(0, np.int32),
+            lap=np.zeros(0, np.int32), time_ms=np.zeros(0, np.int32),
+            timestamp_ms=np.zeros(0, np.int64),
+            sectors=np.zeros((0, MAX_SECTORS), np.int32),
+            race_ids=np.zeros(0, "U32"), race_days=np.zeros(0, np.int32),
+            race_paths=np.zeros(0, "U260"), race_mtimes=np.zeros(0, np.float64),
+            race_offsets=np.zeros(1, np.int64), car_names=np.zeros(0, "U32"),
+        )
+
+    def __len__(self):
+        return len(self.time_ms)
+
+    @property
+    def num_races(self) -> int:
+        return len(self.race_ids)
+
+    @property
+    def signature(self) -> tuple:
+        """(path, mtime) of every file this data was built from, parsed or not."""
+        return tuple(sorted(
+            zip(self.race_paths.tolist() + self.bad_paths.tolist(),
+                self.race_mtimes.tolist() + self.bad_mtimes.tolist())))
+
+    def sector_layout(self) -> np.ndarray:
+        """Per lap: sectors its race was timed with (0 = finish line only)."""
+        per_race = np.zeros(self.num_races, np.int32)
+        np.maximum.at(per_race, self.race, (self.sectors > 0).sum(axis=1).astype(np.int32))
+        return per_race[self.race]
+
+    def save(self, path: str):
+        tmp = path + ".tmp.npz"
+        np.savez(tmp, car_names=self.car_names,
+                 **{k: getattr(self, k) for k in _LAP_COLUMNS + _RACE_COLUMNS + _BAD_COLUMNS})
+        os.replace(tmp, path)
+
+    @staticmethod
+    def read(path: str) -> Optional["LapData"]:
+        try:
+            with np.load(path, allow_pickle=False) as f:
+                return LapData(**{k: f[k] for k in f.files})
+        except (OSError, ValueError, KeyError):
+            return None
+
+    # ── Metrics ──
+
+    def car_stats(self, since: str = "", until: str = "",
+                  percentiles: tuple = (10, 90)) -> list[dict]:
+        """Per car name: laps, sessions, best/median/percentile laps, consistency
+        (σ), improvement and trend across sessions, and theoretical best."""
+        mask = self._mask(since, until)
+        car, race = self.car[mask], self.race[mask]
+        t = self.time_ms[mask].astype(np.int64)
+        sectors = self.sectors[mask]
+        layout = self.sector_layout()[mask]
+        if len(t) == 0:
+            return []
+
+        # Rows sorted by (car, lap time): group starts give best, order statistics
+        order = np.lexsort((t, car))
+        car_s, t_s = car[order], t[order]
+        starts = np.flatnonzero(np.r_[True, car_s[1:] != car_s[:-1]])
+        counts = np.diff(np.r_[starts, len(t_s)])
+        cars = car_s[starts]
+
+        def quantile(q: float) -> np.ndarray:
+            pos = starts + (counts - 1) * (q / 100)
+            lo = np.floor(pos).astype(np.int64)
+            hi = np.ceil(pos).astype(np.int64)
+            return t_s[lo] + (t_s[hi] - t_s[lo]) * (pos - lo)
+
+        tf = t_s.astype(np.float64)
+        sums = np.add.reduceat(tf, starts)
+        sq = np.add.reduceat(tf * tf, starts)
+        var = np.where(counts > 1, (sq - sums * sums / counts) / np.maximum(counts - 1, 1), 0)
+
+        # Theoretical best: best split of every sector over all sessions with the
+        # same gates (splits of another layout cover other stretches of track)
+        big = np.iinfo(np.int32).max
+        g_order = np.lexsort((layout, car))
+        g_car, g_layout = car[g_order], layout[g_order]
+        g_starts = np.flatnonzero(np.r_[True, (g_car[1:] != g_car[:-1])
+                                        | (g_layout[1:] != g_layout[:-1])])
+        sec_s = np.where(sectors[g_order] > 0, sectors[g_order], big)
+        best_sec = np.minimum.reduceat(sec_s, g_starts, axis=0)
+        timed = best_sec < big
+        complete = (g_layout[g_starts] > 0) & (timed.sum(axis=1) == g_layout[g_starts])
+        g_theo = np.where(complete, np.where(timed, best_sec, 0).sum(axis=1), big)
+        # Groups are ordered by car like ``starts``: best layout per car
+        car_first = np.flatnonzero(np.r_[True, g_car[g_starts][1:] != g_car[g_starts][:-1]])
+        theo = np.minimum(np.minimum.reduceat(g_theo, car_first), t_s[starts])
+
+        sess = self._session_table(car, race, t)
+
+        out = []
+        qs = {q: quantile(q) for q in (50,) + tuple(percentiles)}
+        for i, c in enumerate(cars):
+            s = sess.get(int(c), {})
+            out.append({
+                "car": str(self.car_names[c]),
+                "laps": int(counts[i]),
+                "sessions": s.get("sessions", 0),
+                "best_ms": int(t_s[starts[i]]),
+                "median_ms": int(round(qs[50][i])),
+                **{f"p{q}_ms": int(round(qs[q][i])) for q in percentiles},
+                "stddev_ms": int(np.sqrt(var[i])),
+                "theoretical_best_ms": int(theo[i]),
+                "improvement_ms": s.get("improvement_ms", 0),
+                "trend_ms_per_day": s.get("trend_ms_per_day", 0.0),
+            })
+        out.sort(key=lambda r: r["best_ms"])
+        return out
+
+    def sessions(self, car_name: str, since: str = "", until: str = "") -> list[dict]:
+        """One row per race the car ran: date, best and median lap."""
+        idx = np.flatnonzero(self.car_names == car_name)
+        if len(idx) == 0:
+            return []
+        mask = self._mask(since, until) & (self.car == idx[0])
+        race, t = self.race[mask], self.time_ms[mask].astype(np.int64)
+        out = []
+        for r in np.unique(race):
+            times = t[race == r]
+            out.append({
+                "race_id": str(self.race_ids[r]),
+                "date": str(np.datetime64(int(self.race_days[r]), "D")),
+                "laps": len(times),
+                "best_ms": int(times.min()),
+                "median_ms": int(np.median(times)),
+            })
+        out.sort(key=lambda s: (s["date"], s["race_id"]))
+        return out
+
+    def _session_table(self, car: np.ndarray, race: np.ndarray, t: np.ndarray) -> dict:
+        """Per car: session count, first-minus-last session best, and the
+        least-squares slope of session best over time (ms per day)."""
+        key = car.astype(np.int64) * max(self.num_races, 1) + race
+        order = np.lexsort((t, key))
+        key_s = key[order]
+        starts = np.flatnonzero(np.r_[True, key_s[1:] != key_s[:-1]])
+        s_car = car[order][starts]
+        s_best = t[order][starts].astype(np.float64)
+        s_day = self.race_days[race[order][starts]].astype(np.float64)
+        s_day -= s_day.min()  # small x values keep the sums well conditioned
+
+        # Sessions by (car, day) to pick each car's first and last
+        o = np.lexsort((s_day, s_car))
+        s_car, s_best, s_day = s_car[o], s_best[o], s_day[o]
+        first = np.flatnonzero(np.r_[True, s_car[1:] != s_car[:-1]])
+        last = np.r_[first[1:] - 1, len(s_car) - 1]
+        n = (last - first + 1).astype(np.float64)
+
+        sx = np.add.reduceat(s_day, first)
+        sy = np.add.reduceat(s_best, first)
+        sxx = np.add.reduceat(s_day * s_day, first)
+        sxy = np.add.reduceat(s_day * s_best, first)
+        den = n * sxx - sx * sx
+        slope = np.where(den > 0, (n * sxy - sx * sy) / np.where(den > 0, den, 1), 0.0)
+
+        return {
+            int(c): {
+                "sessions": int(n[i]),
+                "improvement_ms": int(s_best[first[i]] - s_best[last[i]]),
+                "trend_ms_per_day": round(float(slope[i]), 1),
+            }
+            for i, c in enumerate(s_car[first])
+        }
+
+    def _mask(self, since: str, until: str) -> np.ndarray:
+        """Laps whose race date falls in [since, until]; ISO prefixes (YYYY[-MM[-DD]])."""
+        days = self.race_days[self.race] if len(self.race) else np.zeros(0, np.int32)
+        mask = self.time_ms > 0
+        if since:
+            mask &= days >= np.datetime64(since).astype("datetime64[D]").astype(np.int64)
+        if until:
+            # Prefix match: until "2026-03" includes the whole month
+            end = (np.datetime64(until) + 1).astype("datetime64[D]").astype(np.int64)
+            mask &= days < end
+        return mask
+
+
+def _parse_race(path: str) -> tuple[str, int, list[str], dict]:
+    """(race id, day number, car name per row, lap columns) of one race file."""
+    if path.endswith(columnar.RACE_EXT):
+        return _read_columnar(path)
+    with open(path, "r", encoding="utf-8") as f:
+        race = json.load(f)
+    day = np.datetime64(race.get("date", "1970-01-01")[:10], "D").astype(np.int64)
+    names, lap, time_ms, ts, sectors = [], [], [], [], []
+    for c in race.get("cars", []):
+        for l in c.get("laps", []):
+            names.append(c.get("name", ""))
+            lap.append(l["lap"])
+            time_ms.append(l["time_ms"])
+            ts.append(l.get("timestamp_ms", 0))
+            splits = l.get("sectors_ms", [])[:MAX_SECTORS]
+            sectors.append(splits + [0] * (MAX_SECTORS - len(splits)))
+    cols = {
+        "lap": np.array(lap, np.int32),
+        "time_ms": np.array(time_ms, np.int32),
+        "timestamp_ms": np.array(ts, np.int64),
+        "sectors": np.array(sectors, np.int32).reshape(-1, MAX_SECTORS),
+    }
+    return race["id"], int(day), names, cols
+
+
+def _read_columnar(path: str) -> tuple[str, int, list[str], dict]:
+    with columnar.RaceFile(path) as race:
+        laps = race.lap_mask()
+        names = race.cars
+        car_ids = race["car_id"][laps]
+        cols = {
+            "lap": race["lap"][laps].astype(np.int32),
+            "time_ms": race["time_ms"][laps].astype(np.int32),
+            "timestamp_ms": race["timestamp_ms"][laps].astype(np.int64),
+            "sectors": race["sectors_ms"][laps].astype(np.int32),
+        }
+        day = np.datetime64(race.date[:10] or "1970-01-01", "D").astype(np.int64)
+        row_names = [names.get(c, f"Auto {c}") for c in car_ids.tolist()]
+        return race.race_id, int(day), row_names, cols
+
+
+def cache_path(races_dir: Optional[str] = None) -> str:
+    return os.path.join(races_dir or race_log.RACES_DIR, CACHE_NAME)
+
+
+def load_laps(races_dir: Optional[str] = None, use_cache: bool = True) -> LapData:
+    """Lap columns for every saved race (``.plr`` or JSON) in ``races_dir``.
+
+    Backed by ``laps_cache.npz``, keyed by each file's mtime: only new or
+    modified races are parsed, deleted ones are dropped, and the cache is
+    rewritten when anything changed. Files that fail to parse are remembered
+    too and only retried once modified.
+    """
+    races_dir = os.path.abspath(races_dir or race_log.RACES_DIR)
+    if not os.path.isdir(races_dir):
+        return LapData.empty()
+    files = {p: os.path.getmtime(p) for p in columnar.race_files(races_dir)}
+    signature = tuple(sorted(files.items()))
+    memo = _memo.get(races_dir)
+    if use_cache and memo is not None and memo[0] == signature:
+        return memo[1]
+
+    path = cache_path(races_dir)
+    cached = LapData.read(path) if use_cache and os.path.exists(path) else None
+    if cached is not None and cached.signature == signature:
+        _memo[races_dir] = (signature, cached)
+        return cached
+
+    data = _merge(cached, files)
+    if use_cache:
+        try:
+            data.save(path)
+        except OSError:
+            pass
+        _memo[races_dir] = (signature, data)
+    return data
+
+
+def _merge(cached: Optional[LapData], files: dict[str, float]) -> LapData:
+    names: dict[str, int] = {}
+    races = []  # (day, race id, path, mtime, car index array, lap columns)
+
+    remap = None
+    keep: dict[str, int] = {}
+    known_bad: set[str] = set()
+    bad: list[tuple[str, float]] = []
+    if cached is not None:
+        remap = np.array([names.setdefault(str(n), len(names)) for n in cached.car_names],
+                         dtype=np.int32)
+        keep = {p: i for i, (p, m) in enumerate(zip(cached.race_paths.tolist(),
+                                                    cached.race_mtimes.tolist()))
+                if files.get(p) == m}
+        known_bad = {p for p, m in zip(cached.bad_paths.tolist(), cached.bad_mtimes.tolist())
+                     if files.get(p) == m}
+
+    for path, mtime in files.items():
+        if path in known_bad:
+            bad.append((path, mtime))
+            continue
+        if path in keep:
+            i = keep[path]
+            lo, hi = cached.race_offsets[i], cached.race_offsets[i + 1]
+            cols = {k: getattr(cached, k)[lo:hi] for k in ("lap", "time_ms",
+                                                           "timestamp_ms", "sectors")}
+            races.append((int(cached.race_days[i]), str(cached.race_ids[i]), path, mtime,
+                          remap[cached.car[lo:hi]], cols))
+            continue
+        try:
+            race_id, day, row_names, cols = _parse_race(path)
+        except (OSError, ValueError, KeyError, TypeError):
+            bad.append((path, mtime))
+            continue
+        car_idx = np.array([names.setdefault(n, len(names)) for n in row_names], np.int32)
+        races.append((day, race_id, path, mtime, car_idx, cols))
+
+    bad_cols = {"bad_paths": np.array([p for p, _ in bad], "U260"),
+                "bad_mtimes": np.array([m for _, m in bad], np.float64)}
+    if not races:
+        data = LapData.empty()
+        data.bad_paths, data.bad_mtimes = bad_cols["bad_paths"], bad_cols["bad_mtimes"]
+        return data
+    races.sort(key=lambda r: (r[0], r[1]))
+    sizes = np.array([len(r[4]) for r in races], np.int64)
+    return LapData(
+        race=np.repeat(np.arange(len(races), dtype=np.int32), sizes),
+        car=np.concatenate([r[4] for r in races]).astype(np.int32),
+        lap=np.concatenate([r[5]["lap"] for r in races]),
+        time_ms=np.concatenate([r[5]["time_ms"] for r in races]),
+        timestamp_ms=np.concatenate([r[5]["timestamp_ms"] for r in races]),
+        sectors=np.concatenate([r[5]["sectors"] for r in races]),
+        race_ids=np.array([r[1] for r in races]),
+        race_days=np.array([r[0] for r in races], np.int32),
+        race_paths=np.array([r[2] for r in races]),
+        race_mtimes=np.array([r[3] for r in races], np.float64),
+        race_offsets=np.r_[0, np.cumsum(sizes)],
+        car_names=np.array(list(names) or [""]),
+        **bad_cols,
+    )
@@ -0,0 +1,225 @@
+import json
+import os
+import sqlite3
+from typing import Optional
+
+from ..models import race_log
+from . import columnar
+
+CATALOG_NAME = "catalog.sqlite3"
+SCHEMA_VERSION = 1
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS races (
+    id          TEXT PRIMARY KEY,
+    date        TEXT NOT NULL,
+    duration_ms INTEGER NOT NULL,
+    num_cars    INTEGER NOT NULL,
+    total_laps  INTEGER NOT NULL,
+    path        TEXT NOT NULL,
+    mtime       REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS races_date ON races(date);
+
+CREATE TABLE IF NOT EXISTS cars (
+    race_id     TEXT NOT NULL REFERENCES races(id) ON DELETE CASCADE,
+    car_id      INTEGER NOT NULL,
+    name        TEXT NOT NULL,
+    total_laps  INTEGER NOT NULL,
+    best_lap_ms INTEGER NOT NULL,
+    avg_lap_ms  INTEGER NOT NULL,
+    PRIMARY KEY (race_id, car_id)
+);
+CREATE INDEX IF NOT EXISTS cars_name ON cars(name, best_lap_ms);
+
+-- Race date and car name are repeated so lap queries need no join
+CREATE TABLE IF NOT EXISTS laps (
+    race_id          TEXT NOT NULL REFERENCES races(id) ON DELETE CASCADE,
+    car_id           INTEGER NOT NULL,
+    car_name         TEXT NOT NULL,
+    date             TEXT NOT NULL,
+    lap              INTEGER NOT NULL,
+    time_ms          INTEGER NOT NULL,
+    timestamp_ms     INTEGER NOT NULL,
+    gap_to_leader_ms INTEGER NOT NULL
+);
+CREATE INDEX IF NOT EXISTS laps_car_date ON laps(car_name, date);
+CREATE INDEX IF NOT EXISTS laps_date_time ON laps(date, time_ms);
+CREATE INDEX IF NOT EXISTS laps_race ON laps(race_id);
+"""
+
+
+def default_path() -> str:
+    return os.path.join(race_log.RACES_DIR, CATALOG_NAME)
+
+
+class RaceCatalog:
+    """SQLite index of the race summaries in ``races/``.
+
+    The race files stay the source of truth: the catalog only holds race, car
+    and lap rows for fast browsing and can be rebuilt from them at any time.
+    """
+
+    def __init__(self, path: Optional[str] = None):
+        self.path = path or default_path()
+        os.makedirs(os.path.dirname(self.path), exist_ok=True)
+        self._db = sqlite3.connect(self.path)
+        self._db.row_factory = sqlite3.Row
+        self._db.execute("PRAGMA journal_mode=WAL")
+        self._db.execute("PRAGMA foreign_keys=ON")
+        version = self._db.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            # Derived data only: an old layout is simply dropped and re-imported
+            with self._db:
+                self._db.executescript(
+                    "DROP TABLE IF EXISTS laps; DROP TABLE IF EXISTS cars; "
+                    "DROP TABLE IF EXISTS races;")
+                self._db.executescript(_SCHEMA)
+                self._db.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+
+    def close(self):
+        self._db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # ── Indexing ──
+
+    def index_race(self, race: dict, path: str):
+        """Insert or replace one race summary (as written by ``RaceLog``)."""
+        race_id = race["id"]
+        date = race.get("date", "")
+        cars = race.get("cars", [])
+        with self._db:
+            self._db.execute("DELETE FROM races WHERE id = ?", (race_id,))
+            self._db.execute(
+                "INSERT INTO races VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (race_id, date, race.get("duration_ms", 0), len(cars),
+                 sum(c.get("total_laps", 0) for c in cars),
+                 os.path.abspath(path), os.path.getmtime(path)),
+            )
+            self._db.executemany(
+                "INSERT INTO cars VALUES (?, ?, ?, ?, ?, ?)",
+                [(race_id, c["id"], c.get("name", ""), c.get("total_laps", 0),
+                  c.get("best_lap_ms", 0), c.get("avg_lap_ms", 0)) for c in cars],
+            )
+            self._db.executemany(
+                "INSERT INTO laps VALUES (?, ?, ?, ?, ?, ?, ?, ?)",
+                [(race_id, c["id"], c.get("name", ""), date, lap["lap"], lap["time_ms"],
+                  lap.get("timestamp_ms", 0), lap.get("gap_to_leader_ms", 0))
+                 for c in cars for lap in c.get("laps", [])],
+            )
+
+    def import_file(self, path: str, force: bool = False) -> bool:
+        """Index a race file unless it is already indexed and unchanged."""
+        if not force:
+            row = self._db.execute(
+                "SELECT mtime FROM races WHERE path = ?", (os.path.abspath(path),)
+            ).fetchone()
+            if row is not None and row["mtime"] == os.path.getmtime(path):
+                return False
+        if path.endswith(columnar.RACE_EXT):
+            with columnar.RaceFile(path) as race:
+                self.index_race(race.to_summary(with_events=False), path)
+        else:
+            with open(path, "r", encoding="utf-8") as f:
+                self.index_race(json.load(f), path)
+        return True
+
+    def rebuild(self, races_dir: Optional[str] = None, full: bool = False) -> dict:
+        """Sync the catalog with the race files: import new/changed, drop deleted."""
+        races_dir = races_dir or os.path.dirname(self.path)
+        if full:
+            with self._db:
+                self._db.execute("DELETE FROM races")
+        imported = skipped = failed = 0
+        present = set()
+        for path in columnar.race_files(races_dir):
+            present.add(os.path.abspath(path))
+            try:
+                if self.import_file(path):
+                    imported += 1
+                else:
+                    skipped += 1
+            except (OSError, ValueError, KeyError, TypeError):
+                failed += 1
+        stale = [r["id"] for r in self._db.execute("SELECT id, path FROM races")
+                 if r["path"] not in present]
+        with self._db:
+            self._db.executemany("DELETE FROM races WHERE id = ?", [(i,) for i in stale])
+        return {"imported": imported, "skipped": skipped,
+                "failed": failed, "removed": len(stale)}
+
+    # ── Queries ──
+
+    def list_races(self, since: str = "", until: str = "",
+                   limit: Optional[int] = None) -> list[dict]:
+        """Newest first; ``since``/``until`` are ISO date prefixes (YYYY-MM[-DD])."""
+        sql = "SELECT * FROM races WHERE 1=1"
+        sql, params = self._date_filter(sql, [], since, until)
+        sql += " ORDER BY date DESC"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        return [dict(r) for r in self._db.execute(sql, params)]
+
+    def race_cars(self, race_id: str) -> list[dict]:
+        return [dict(r) for r in self._db.execute(
+            "SELECT * FROM cars WHERE race_id = ? ORDER BY total_laps DESC, best_lap_ms",
+            (race_id,))]
+
+    def best_laps(self, car: str = "", since: str = "", until: str = "",
+                  limit: int = 10) -> list[dict]:
+        """Fastest laps, optionally for one car name and a date range."""
+        sql = "SELECT * FROM laps WHERE 1=1"
+        params: list = []
+        if car:
+            sql += " AND car_name = ?"
+            params.append(car)
+        sql, params = self._date_filter(sql, params, since, until)
+        sql += " ORDER BY time_ms LIMIT ?"
+        params.append(int(limit))
+        return [dict(r) for r in self._db.execute(sql, params)]
+
+    def car_names(self) -> list[str]:
+        return [r[0] for r in self._db.execute(
+            "SELECT DISTINCT name FROM cars ORDER BY name")]
+
+    @staticmethod
+    def _date_filter(sql: str, params: list, since: str, until: str):
+        if since:
+            sql += " AND date >= ?"
+            params.append(since)
+        if until:
+            # Prefix match: until "2026-03" includes the whole month
+            sql += " AND date < ?"
+            params.append(until + "\uffff")
+        return sql, params
+
+
+def index_race_quietly(race: dict, path: str):
+    """Add a just-written race to the catalog; failures are left for ``rebuild``."""
+    try:
+        with RaceCatalog(os.path.join(os.path.dirname(path), CATALOG_NAME)) as catalog:
+            catalog.index_race(race, path)
+    except sqlite3.Error:
+        pass
+
+
+def browse_races(races_dir: Optional[str] = None) -> list[dict]:
+    """Races of ``races_dir``, newest first, as catalog rows (date, cars, laps, path).
+
+    The catalog is synced first, which parses only new or modified files.
+    If it cannot be opened, the files are listed without details.
+    """
+    races_dir = races_dir or race_log.RACES_DIR
+    try:
+        with RaceCatalog(os.path.join(races_dir, CATALOG_NAME)) as catalog:
+            catalog.rebuild(races_dir)
+            return catalog.list_races()
+    except sqlite3.Error:
+        return [{"id": os.path.splitext(os.path.basename(p))[0], "date": "", "duration_ms": 0,
+                 "num_cars": 0, "total_laps": 0, "path": os.path.abspath(p)}
+                for p in columnar.race_files(races_dir)[::-1]]
@@ -0,0 +1,353 @@
+"""Compact columnar race file (``.plr``).
+
+Layout: an 8-byte magic, a little-endian uint32 header length, a JSON header
+(race id, date, car names, code tables and where each column lives), then
+one raw array per event column, each aligned to 64 bytes. Files are opened
+with mmap, so opening is instant and nothing is parsed until a column is read.
+"""
+import csv
+import json
+import mmap
+import os
+import struct
+from typing import Iterable
+
+import numpy as np
+
+from ..models.events import EventType
+
+RACE_EXT = ".plr"
+JSON_EXT = ".json"
+MAGIC = b"PLRACE1\n"
+VERSION = 1
+ALIGN = 64
+MAX_SECTORS = 4  # finish gate + up to 3 sector gates
+
+# Event columns; every logged event is one row
+COLUMNS = {
+    "event": "u1",             # index into header["events"]
+    "source": "u1",            # index into header["sources"]
+    "car_id": "<i2",
+    "lap": "<i4",
+    "time_ms": "<i4",
+    "best_ms": "<i4",
+    "timestamp_ms": "<i8",
+    "gap_to_leader_ms": "<i4",
+    "interval_ms": "<i4",
+    "position": "<i2",
+    "sector": "u1",
+    "sectors_ms": "<i4",       # (rows, MAX_SECTORS), 0 = not timed
+}
+EVENT_NAMES = [e.value for e in EventType]
+
+CSV_FIELDS = ["event", "car_id", "car", "lap", "time_ms", "timestamp_ms", "source",
+              "gap_to_leader_ms", "interval_ms", "position", "best_ms", "sector",
+              "sectors_ms"]
+
+
+class ColumnBuilder:
+    """Collects event dicts (``LapEvent.to_dict`` layout) into columns."""
+
+    def __init__(self):
+        self._cols: dict[str, list] = {name: [] for name in COLUMNS}
+        self.sources: list[str] = []
+        self._source_idx: dict[str, int] = {}
+
+    def __len__(self):
+        return len(self._cols["event"])
+
+    def append(self, r: dict):
+        src = r.get("source", "")
+        if src not in self._source_idx:
+            self._source_idx[src] = len(self.sources)
+            self.sources.append(src)
+        c = self._cols
+        c["event"].append(EVENT_NAMES.index(r["event"]))
+        c["source"].append(self._source_idx[src])
+        c["car_id"].append(r.get("car_id", -1))
+        c["lap"].append(r.get("lap", 0))
+        c["time_ms"].append(r.get("time_ms", 0))
+        c["best_ms"].append(r.get("best_ms", 0))
+        c["timestamp_ms"].append(r.get("timestamp_ms", 0))
+        c["gap_to_leader_ms"].append(r.get("gap_to_leader_ms", 0))
+        c["interval_ms"].append(r.get("interval_ms", 0))
+        c["position"].append(r.get("position", 0))
+        c["sector"].append(r.get("sector", 0))
+        splits = list(r.get("sectors_ms", []))[:MAX_SECTORS]
+        c["sectors_ms"].append(splits + [0] * (MAX_SECTORS - len(splits)))
+
+    def arrays(self) -> dict[str, np.ndarray]:
+        out = {name: np.array(self._cols[name], dtype=dtype) for name, dtype in COLUMNS.items()}
+        out["sectors_ms"] = out["sectors_ms"].reshape(-1, MAX_SECTORS)
+        return out
+
+
+def write_race(path: str, race_id: str, date: str, cars: dict[int, str],
+               arrays: dict[str, np.ndarray], sources: list[str]):
+    """Write a race file atomically (tmp + fsync + rename)."""
+    rows = len(arrays["event"])
+    header = {
+        "version": VERSION,
+        "id": race_id,
+        "date": date,
+        "duration_ms": int(arrays["timestamp_ms"].max()) if rows else 0,
+        "cars": {str(k): v for k, v in cars.items()},
+        "events": EVENT_NAMES,
+        "sources": sources,
+        "rows": rows,
+        "columns": {},
+    }
+    # Offsets depend on the header size, which depends on the offsets: reserve
+    # room for them by sizing the header with the largest possible values first
+    blocks = [(name, np.ascontiguousarray(arrays[name], dtype=dtype))
+              for name, dtype in COLUMNS.items()]
+    for name, arr in blocks:
+        header["columns"][name] = {"dtype": arr.dtype.str, "shape": list(arr.shape),
+                                   "offset": 10 ** 12}
+    start = _align(len(MAGIC) + 4 + len(json.dumps(header).encode()))
+    offset = start
+    for name, arr in blocks:
+        header["columns"][name]["offset"] = offset
+        offset = _align(offset + arr.nbytes)
+    raw = json.dumps(header, ensure_ascii=False).encode()
+
+    tmp = path + ".tmp"
+    with open(tmp, "wb") as f:
+        f.write(MAGIC + struct.pack("<I", len(raw)) + raw)
+        for name, arr in blocks:
+            f.seek(header["columns"][name]["offset"])
+            f.write(arr.tobytes())
+        f.truncate(offset)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def _align(n: int) -> int:
+    return (n + ALIGN - 1) // ALIGN * ALIGN
+
+
+class RaceFile:
+    """A ``.plr`` file mapped read-only; columns are NumPy views on the map."""
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(path, "rb") as f:
+            if f.read(len(MAGIC)) != MAGIC:
+                raise ValueError(f"No es un archivo de carrera: {path}")
+            (size,) = struct.unpack("<I", f.read(4))
+            self.header = json.loads(f.read(size))
+            self._map = (mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+                         if self.header["rows"] else None)
+        self._columns: dict[str, np.ndarray] = {}
+
+    def close(self):
+        self._columns.clear()
+        if self._map is not None:
+            try:
+                self._map.close()
+            except BufferError:
+                pass  # a caller still holds a column view; closed when collected
+            self._map = None
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    @property
+    def race_id(self) -> str:
+        return self.header["id"]
+
+    @property
+    def date(self) -> str:
+        return self.header["date"]
+
+    @property
+    def cars(self) -> dict[int, str]:
+        return {int(k): v for k, v in self.header["cars"].items()}
+
+    def __len__(self):
+        return self.header["rows"]
+
+    def __getitem__(self, name: str) -> np.ndarray:
+        col = self._columns.get(name)
+        if col is None:
+            spec = self.header["columns"][name]
+            dtype = np.dtype(spec["dtype"])
+            shape = tuple(spec["shape"])
+            if self._map is None:
+                col = np.zeros(shape, dtype)
+            else:
+                col = np.frombuffer(self._map, dtype, int(np.prod(shape)),
+                                    spec["offset"]).reshape(shape)
+            self._columns[name] = col
+        return col
+
+    def lap_mask(self) -> np.ndarray:
+        return self["event"] == EVENT_NAMES.index(EventType.LAP.value)
+
+    # ── Conversions ──
+
+    def events(self) -> Iterable[dict]:
+        """Rows as ``LapEvent.to_dict`` dicts."""
+        names = self.cars
+        sources = self.header["sources"]
+        events = self.header["events"]
+        cols = {name: self[name].tolist() for name in COLUMNS}
+        for i in range(len(self)):
+            car_id = cols["car_id"][i]
+            yield {
+                "event": events[cols["event"][i]],
+                "timestamp_ms": cols["timestamp_ms"][i],
+                "car": names.get(car_id, ""),
+                "car_id": car_id,
+                "lap": cols["lap"][i],
+                "time_ms": cols["time_ms"][i],
+                "best_ms": cols["best_ms"][i],
+                "source": sources[cols["source"][i]],
+                "sector": cols["sector"][i],
+                "sectors_ms": [ms for ms in cols["sectors_ms"][i] if ms > 0],
+                "gap_to_leader_ms": cols["gap_to_leader_ms"][i],
+                "interval_ms": cols["interval_ms"][i],
+                "position": cols["position"][i],
+            }
+
+    def car_summaries(self) -> list[dict]:
+        """Per-car laps and aggregates, as in the race summary JSON."""
+        laps = self.lap_mask()
+        car_ids = self["car_id"][laps]
+        cols = {name: self[name][laps] for name in
+                ("lap", "time_ms", "timestamp_ms", "gap_to_leader_ms", "interval_ms")}
+        sectors = self["sectors_ms"][laps]
+        names = self.cars
+        out = []
+        for car_id in sorted(set(names) | set(np.unique(car_ids).tolist())):
+            sel = car_ids == car_id
+            times = cols["time_ms"][sel]
+            sec = sectors[sel]
+            complete = sec[(sec > 0).any(axis=1)]
+            width = int((complete[0] > 0).sum()) if len(complete) else 0
+            out.append({
+                "id": car_id,
+                "name": names.get(car_id, f"Auto {car_id}"),
+                "laps": [
+                    {"lap": lap, "time_ms": t, "timestamp_ms": ts,
+                     "gap_to_leader_ms": gap, "interval_ms": iv,
+                     "sectors_ms": [ms for ms in s if ms > 0]}
+                    for lap, t, ts, gap, iv, s in zip(
+                        cols["lap"][sel].tolist(), times.tolist(),
+                        cols["timestamp_ms"][sel].tolist(),
+                        cols["gap_to_leader_ms"][sel].tolist(),
+                        cols["interval_ms"][sel].tolist(), sec.tolist())
+                ],
+                "total_laps": int(len(times)),
+                "best_lap_ms": int(times.min()) if len(times) else 0,
+                "avg_lap_ms": int(times.sum() // len(times)) if len(times) else 0,
+                "best_sectors_ms": complete[:, :width].min(axis=0).tolist() if width else [],
+            })
+        return out
+
+    def to_summary(self, with_events: bool = True) -> dict:
+        """The race summary dict (same layout as the JSON export)."""
+        summary = {
+            "id": self.race_id,
+            "date": self.date,
+            "duration_ms": self.header["duration_ms"],
+            "cars": self.car_summaries(),
+        }
+        if with_events:
+            summary["events"] = list(self.events())
+        return summary
+
+    def export_json(self, out: str):
+        tmp = out + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(self.to_summary(), f, indent=2, ensure_ascii=False)
+        os.replace(tmp, out)
+
+    def export_csv(self, out: str, laps_only: bool = False):
+        """One CSV row per event (or per lap); sector splits joined with '|'."""
+        rows = np.flatnonzero(self.lap_mask()) if laps_only else np.arange(len(self))
+        names = self.cars
+        car_ids = self["car_id"][rows]
+        car_col = np.array([names.get(c, "") for c in range(-1, max(names, default=0) + 1)],
+                           dtype=object)
+        sectors = self["sectors_ms"][rows]
+        table = [
+            np.array(self.header["events"], dtype=object)[self["event"][rows]],
+            car_ids,
+            car_col[np.clip(car_ids + 1, 0, len(car_col) - 1)],
+            self["lap"][rows],
+            self["time_ms"][rows],
+            self["timestamp_ms"][rows],
+            np.array(self.header["sources"] or [""], dtype=object)[self["source"][rows]],
+            self["gap_to_leader_ms"][rows],
+            self["interval_ms"][rows],
+            self["position"][rows],
+            self["best_ms"][rows],
+            self["sector"][rows],
+            ["|".join(str(ms) for ms in s if ms > 0) for s in sectors.tolist()],
+        ]
+        with open(out, "w", encoding="utf-8", newline="") as f:
+            w = csv.writer(f)
+            w.writerow(CSV_FIELDS)
+            w.writerows(zip(*(col.tolist() if isinstance(col, np.ndarray) else col
+                              for col in table)))
+
+
+def from_summary(race: dict, out: str) -> str:
+    """Write a race summary dict (the JSON format) as a ``.plr`` file."""
+    builder = ColumnBuilder()
+    for r in race.get("events", []):
+        builder.append(r)
+    if not len(builder):
+        # Summary without an event list: the per-car laps are all there is
+        for c in race.get("cars", []):
+            for lap in c.get("laps", []):
+                builder.append({**lap, "event": EventType.LAP.value, "car_id": c["id"],
+                                "lap": lap["lap"], "time_ms": lap["time_ms"]})
+    cars = {c["id"]: c.get("name", "") for c in race.get("cars", [])}
+    write_race(out, race["id"], race.get("date", ""), cars, builder.arrays(), builder.sources)
+    return out
+
+
+def load_summary(path: str) -> dict:
+    """Race summary dict from either format."""
+    if path.endswith(RACE_EXT):
+        with RaceFile(path) as race:
+            return race.to_summary()
+    with open(path, "r", encoding="utf-8") as f:
+        return json.load(f)
+
+
+def race_files(races_dir: str) -> list[str]:
+    """One file per saved race, sorted; ``.plr`` wins over a same-named ``.json``."""
+    if not os.path.isdir(races_dir):
+        return []
+    found: dict[str, str] = {}
+    for name in os.listdir(races_dir):
+        stem, ext = os.path.splitext(name)
+        if ext == RACE_EXT or (ext == JSON_EXT and stem not in found):
+            found[stem] = os.path.join(races_dir, name)
+    return [found[stem] for stem in sorted(found)]
+
+
+def compact_dir(races_dir: str, keep_json: bool = False) -> tuple[int, int]:
+    """Convert every race JSON in a folder; returns (converted, failed)."""
+    converted = failed = 0
+    for path in race_files(races_dir):
+        if not path.endswith(JSON_EXT):
+            continue
+        try:
+            race = load_summary(path)
+            from_summary(race, os.path.splitext(path)[0] + RACE_EXT)
+        except (OSError, ValueError, KeyError, TypeError):
+            failed += 1
+            continue
+        if not keep_json:
+            os.remove(path)
+        converted += 1
+    return converted, failed
+
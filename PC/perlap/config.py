@@ -0,0 +1,222 @@
+"""Settings saved by the GUI (``config.json``), typed and versioned.
+
+``load_config`` gives a ``Config`` with every field already converted
+(finish line, gates, cars), so callers apply it without parsing anything.
+``ConfigStore`` writes it from a background thread: changes are coalesced
+and the file is replaced atomically, so a crash never leaves it half-written.
+"""
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .detection.finish_line import FinishLine
+from .detection.fusion import DEFAULT_FUSION_WINDOW_MS
+from .detection.gates import GateConfig
+from .detection.multicam import CameraSpec
+from .models.car import CarColor
+from .models.event_bus import SOURCE_CAMERA
+
+CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(__file__)), "config.json")
+
+CONFIG_VERSION = 2
+SAVE_DEBOUNCE_S = 0.5   # written once changes stop for this long...
+SAVE_MAX_DELAY_S = 2.0  # ...or at the latest this long after the first one
+
+
+@dataclass
+class Config:
+    finish_line: Optional[FinishLine] = None
+    camera_index: int = 0
+    sensitivity: Optional[str] = None        # None: ColorCalibrator default
+    min_pixel_count: Optional[int] = None    # None: camera default
+    detection_source: str = SOURCE_CAMERA
+    arduino_port: str = ""
+    arduino_threshold: Optional[int] = None  # None: firmware default
+    fusion_window_ms: int = DEFAULT_FUSION_WINDOW_MS
+    gates: list[GateConfig] = field(default_factory=list)
+    ranking_track: str = ""
+    live_port: int = 0                       # 0: no live broadcast (net.live_server)
+    live_multicast: str = ""
+    node_port: int = 0                       # 0: no timing nodes (net.nodes)
+    cars: list[tuple[int, CarColor]] = field(default_factory=list)  # (slot, car)
+    cameras: list[CameraSpec] = field(default_factory=list)  # several: one process each
+    extra: dict = field(default_factory=dict)  # keys of newer versions, written back as read
+
+    def to_dict(self) -> dict:
+        d = dict(self.extra)
+        d.update({
+            "version": CONFIG_VERSION,
+            "finish_line": self.finish_line.to_dict() if self.finish_line else None,
+            "camera_index": self.camera_index,
+            "sensitivity": self.sensitivity,
+            "min_pixel_count": self.min_pixel_count,
+            "detection_source": self.detection_source,
+            "arduino_port": self.arduino_port,
+            "arduino_threshold": self.arduino_threshold,
+            "fusion_window_ms": self.fusion_window_ms,
+            "gates": [g.to_dict() for g in self.gates],
+            "ranking_track": self.ranking_track,
+            "live_port": self.live_port,
+            "live_multicast": self.live_multicast,
+            "node_port": self.node_port,
+            "cars": [dict(car.to_dict(), slot=slot) for slot, car in self.cars],
+            "cameras": [c.to_dict() for c in self.cameras],
+        })
+        return d
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "Config":
+        d = _migrate(dict(d))
+        extra = {k: v for k, v in d.items() if k not in _FIELDS}
+        cars = []
+        for car in d.get("cars") or []:
+            car = dict(car)
+            slot = int(car.pop("slot", 0))
+            cars.append((slot, CarColor.from_dict(car)))
+        return cls(
+            finish_line=FinishLine.from_dict(d["finish_line"]) if d.get("finish_line") else None,
+            camera_index=int(d.get("camera_index") or 0),
+            sensitivity=d.get("sensitivity") or None,
+            min_pixel_count=_opt_int(d.get("min_pixel_count")),
+            detection_source=d.get("detection_source") or SOURCE_CAMERA,
+            arduino_port=d.get("arduino_port") or "",
+            arduino_threshold=_opt_int(d.get("arduino_threshold")),
+            fusion_window_ms=int(d.get("fusion_window_ms") or DEFAULT_FUSION_WINDOW_MS),
+            gates=[GateConfig.from_dict(g) for g in d.get("gates") or []],
+            ranking_track=d.get("ranking_track") or "",
+            live_port=int(d.get("live_port") or 0),
+            live_multicast=d.get("live_multicast") or "",
+            node_port=int(d.get("node_port") or 0),
+            cars=cars,
+            cameras=[CameraSpec.from_dict(c) for c in d.get("cameras") or []],
+            extra=extra,
+        )
+
+
+_FIELDS = {"version"} | set(Config.__dataclass_fields__) - {"extra"}
+
+
+def _opt_int(value) -> Optional[int]:
+    return None if value is None else int(value)
+
+
+def _migrate(d: dict) -> dict:
+    """Bring a file of any earlier version up to ``CONFIG_VERSION``."""
+    if d.get("version", 1) < 2:
+        # v1 (no "version"): only active cars were saved, some without the flag
+        for car in d.get("cars") or []:
+            car.setdefault("active", True)
+    d["version"] = CONFIG_VERSION
+    return d
+
+
+def load_config(path: str = CONFIG_PATH) -> Config:
+    """Settings saved by the GUI (defaults if there are none or the file is unreadable)."""
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return Config.from_dict(json.load(f))
+    except FileNotFoundError:
+        return Config()
+    except (OSError, ValueError, KeyError, TypeError, AttributeError):
+        return Config()
+
+
+class ConfigStore:
+    """``config.json`` saved off the calling thread.
+
+    ``save`` takes a snapshot and returns; the writer thread waits until
+    changes stop for ``debounce_s`` (``max_delay_s`` at most) and writes
+    only the latest, so dragging a slider costs one write. ``close``
+    writes whatever is still pending before returning.
+    """
+
+    def __init__(self, path: str = CONFIG_PATH, debounce_s: float = SAVE_DEBOUNCE_S,
+                 max_delay_s: float = SAVE_MAX_DELAY_S):
+        self.path = path
+        self.debounce_s = debounce_s
+        self.max_delay_s = max_delay_s
+        self.writes = 0
+        self.last_error: Optional[OSError] = None
+        self._cond = threading.Condition()
+        self._write_lock = threading.Lock()
+        self._pending: Optional[dict] = None
+        self._gen = 0            # snapshots taken
+        self._written_gen = 0    # newest snapshot on disk
+        self._first = self._last = 0.0
+        self._closing = False
+        self._thread: Optional[threading.Thread] = None
+
+    def load(self) -> Config:
+        return load_config(self.path)
+
+    def save(self, config: Config):
+        data = config.to_dict()
+        with self._cond:
+            now = time.monotonic()
+            if self._pending is None:
+                self._first = now
+            self._pending = data
+            self._gen += 1
+            self._last = now
+            self._cond.notify()
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._run, name="perlap-config",
+                                                daemon=True)
+                self._thread.start()
+
+    def flush(self):
+        """Write the pending snapshot now, on the calling thread."""
+        with self._cond:
+            data, gen = self._pending, self._gen
+            self._pending = None
+        if data is not None:
+            self._write(data, gen)
+
+    def close(self):
+        with self._cond:
+            self._closing = True
+            self._cond.notify()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        while True:
+            with self._cond:
+                while self._pending is None and not self._closing:
+                    self._cond.wait()
+                if self._closing:
+                    return  # ``close`` flushes
+                while not self._closing:
+                    due = min(self._last + self.debounce_s, self._first + self.max_delay_s)
+                    wait = due - time.monotonic()
+                    if wait <= 0:
+                        break
+                    self._cond.wait(wait)
+                if self._closing:
+                    return
+                data, gen = self._pending, self._gen
+                self._pending = None
+            self._write(data, gen)
+
+    def _write(self, data: dict, gen: int):
+        with self._write_lock:
+            if gen <= self._written_gen:
+                return  # a newer snapshot is already on disk
+            tmp = self.path + ".tmp"
+            try:
+                with open(tmp, "w", encoding="utf-8") as f:
+                    json.dump(data, f, indent=2, ensure_ascii=False)
+                    f.flush()
+                    os.fsync(f.fileno())
+                os.replace(tmp, self.path)
+            except OSError as e:
+                self.last_error = e
+                return
+            self._written_gen = gen
+            self.writes += 1
+            self.last_error = None
@@ -1,41 +1,133 @@
 import json
+import threading
 import time
 import queue
-import serial
-import serial.tools.list_ports
-from PySide6.QtCore import QThread, Signal
-
+from collections import deque
 
-class ArduinoSource(QThread):
-    """QThread that communicates with the LaserLapTimer Arduino firmware."""
+import serial
 
-    crossing_detected = Signal(int)     # car_id (always 0)
-    ldr_value = Signal(int)             # live LDR reading
-    connection_changed = Signal(bool)   # connected/disconnected
-    threshold_changed = Signal(int)     # confirmed threshold from Arduino
-    ready = Signal(int, int)            # baseline, threshold on startup
-    error_occurred = Signal(str)        # error message
-    test_result = Signal(int, int, int, bool)  # ldr_off, ldr_on, diff, laser_detected
+from ..profiler import profiler
+from .port_watcher import PortWatcher, PortInfo, scan_ports
+from .reader import Hook, Reader
+
+PROTOCOL_LASER = "LASER"            # Arduino/LaserLapTimer: single car, LDR_CUT
+PROTOCOL_LAPTIMER_V2 = "LAPTIMER_V2"  # Arduino/LapTimer: Hall+laser+TCS3200, per-car
+
+V2_MAX_CARS = 6                     # MAX_CARS in LapTimer.ino
+V2_NAME_LEN = 11                    # char name[12] in LapTimer.ino
+V2_LDR_THRESHOLD = 300              # LDR_THRESHOLD in LapTimer.ino (not configurable)
+
+# Commands only understood by LaserLapTimer; LapTimer v2 answers them with ERROR
+LASER_ONLY_COMMANDS = ("THRESHOLD", "LASER", "STREAM", "TEST")
+
+# Connection state machine
+STATE_DISCONNECTED = "DISCONNECTED"  # no port, or port not present
+STATE_WAIT_READY = "WAIT_READY"      # port open, Arduino rebooting after DTR reset
+STATE_STREAMING = "STREAMING"
+STATE_BACKOFF = "BACKOFF"            # open failed or link dropped, retry later
+
+READY_TIMEOUT_S = 5.0
+READ_TIMEOUT_S = 0.01                # max wait for the first byte per loop
+BACKOFF_MIN_S = 0.25
+BACKOFF_MAX_S = 2.0
+DEVICE_CLOCK_WINDOW_S = 5.0          # Arduino resonators drift up to ~0.5%: keep it short
+
+_LINE = profiler.stage("arduino.line")  # decode + parse + dispatch of one line
+
+
+class DeviceClock:
+    """Maps the firmware's ``millis()`` stamp onto ``perf_counter()``.
+
+    A line can only arrive late, so the smallest (read time - device time)
+    over the lines of the last ``window_s`` is the closest offset; a cut is
+    then timed when the firmware saw it rather than when USB delivered it.
+    """
+
+    def __init__(self, window_s: float = DEVICE_CLOCK_WINDOW_S):
+        self.window_s = window_s
+        self._offsets: deque[tuple[float, float]] = deque()  # (read time, offset), offsets ascending
+
+    def reset(self):
+        """The firmware rebooted: its millis() started over."""
+        self._offsets.clear()
+
+    def to_host(self, device_ms: float, t: float) -> float:
+        """Host time of ``device_ms``, for a line read at ``t``."""
+        offset = t - device_ms / 1000
+        offsets = self._offsets
+        while offsets and offsets[-1][1] >= offset:
+            offsets.pop()
+        offsets.append((t, offset))
+        while offsets[0][0] < t - self.window_s:
+            offsets.popleft()
+        return device_ms / 1000 + offsets[0][1]
+
+
+class ArduinoReader(Reader):
+    """Talks to the LaserLapTimer / LapTimer v2 Arduino firmware on its own
+    thread (Qt-free; the GUI wraps it in ``ui.sources.ArduinoSource``)."""
+
+    thread_name = "perlap-arduino"
+
+    def __init__(self):
+        super().__init__()
+        # Times are perf_counter() when the line was read, before any dispatch;
+        # LDR_CUT: when the firmware stamped it (see DeviceClock)
+        self.crossing_detected = Hook()  # car_id (0), time, {"ldr", "device_ms"}
+        self.device_start = Hook()       # car_id, time (LapTimer v2 START)
+        self.device_lap = Hook()         # car_id, lap_time_ms measured by the device, time
+        self.protocol_detected = Hook()  # PROTOCOL_LASER / PROTOCOL_LAPTIMER_V2
+        self.car_registered = Hook()     # car_id, name confirmed by CAR_REG
+        self.car_calibrated = Hook()     # car_id, r, g, b (CAL_SET)
+        self.status_received = Hook()    # STATUS line, "car_id" mapped to RaceManager
+        self.ldr_value = Hook()          # live LDR reading
+        self.connection_changed = Hook()  # connected/disconnected
+        self.threshold_changed = Hook()  # confirmed threshold from Arduino
+        self.ready = Hook()              # baseline, threshold on startup
+        self.error_occurred = Hook()     # error message
+        self.test_result = Hook()        # ldr_off, ldr_on, diff, laser_detected
+        self.state_changed = Hook()      # STATE_*
+        self.ports_changed = Hook()      # [(device, description)] on hot-plug
+        self.port_reassigned = Hook()    # same Arduino re-enumerated / auto-found
 
-    def __init__(self, parent=None):
-        super().__init__(parent)
         self.port = ""
         self.baudrate = 115200
-        self._running = False
         self._cmd_queue: queue.Queue[str] = queue.Queue()
-
-    # ── Public API (called from main thread) ──
+        self._port_events: queue.Queue[dict[str, PortInfo]] = queue.Queue()
+        self._state = STATE_DISCONNECTED
+        self._ser: serial.Serial | None = None
+        self._rx = bytearray()
+        self._ready_deadline = 0.0
+        self._retry_at = 0.0
+        self._backoff_s = BACKOFF_MIN_S
+        self._port_identity = ""
+        self._ports: dict[str, PortInfo] = {}
+        # Settings re-applied after a reconnect (the Arduino reboots and forgets)
+        self._threshold: int | None = None
+        self._streaming = False
+        self._device_clock = DeviceClock()
+        self.protocol = PROTOCOL_LASER
+        # LapTimer v2 slot mapping: RaceManager slot <-> firmware slot. Replaced
+        # whole under _slots_lock by set_cars (any thread), read by this thread
+        self._slots_lock = threading.Lock()
+        self._car_names: dict[int, str] = {}
+        self._fw_slot: dict[int, int] = {}
+        self._race_slot: dict[int, int] = {}
+
+    # ── Public API (called from any thread) ──
 
     def send_command(self, cmd: str):
         self._cmd_queue.put(cmd)
 
     def set_threshold(self, value: int):
+        self._threshold = value
         self.send_command(f"THRESHOLD {value}")
 
     def set_laser(self, on: bool):
         self.send_command(f"LASER {'ON' if on else 'OFF'}")
 
     def set_streaming(self, on: bool):
+        self._streaming = on
         self.send_command(f"STREAM {'ON' if on else 'OFF'}")
 
     def request_ldr(self):
@@ -47,119 +139,255 @@ class ArduinoSource(QThread):
     def request_test(self):
         self.send_command("TEST")
 
-    def stop(self):
-        self._running = False
-        self.wait(3000)
+    def request_status(self):
+        self.send_command("STATUS")
+
+    # ── LapTimer v2 car registration ──
+
+    def set_cars(self, cars: list[tuple[int, str]]):
+        """Mirror RaceManager registrations onto the firmware's car slots.
+
+        Firmware slots are kept stable for cars already mapped; new cars take
+        the lowest free slot. Cars beyond the firmware capacity are reported
+        through error_occurred and stay unmapped. Only new or renamed slots
+        are sent: REG resets the slot, and with it that car's lap on the device.
+        """
+        names = dict(cars)
+        full = []
+        with self._slots_lock:
+            before = self._registrations()
+            fw_slot = {cid: fw for cid, fw in self._fw_slot.items() if cid in names}
+            used = set(fw_slot.values())
+            for cid in sorted(names):
+                if cid in fw_slot:
+                    continue
+                free = next((fw for fw in range(V2_MAX_CARS) if fw not in used), None)
+                if free is None:
+                    full.append(names[cid])
+                    continue
+                fw_slot[cid] = free
+                used.add(free)
+
+            self._car_names = names
+            self._fw_slot = fw_slot
+            self._race_slot = {fw: cid for cid, fw in fw_slot.items()}
+            changed = [(fw, name) for fw, name in self._registrations().items()
+                       if before.get(fw) != name]
+        for name in full:
+            self.error_occurred.emit(f"LapTimer sin slots libres para {name} (max {V2_MAX_CARS})")
+        if self.protocol == PROTOCOL_LAPTIMER_V2:
+            for fw, name in changed:
+                self.send_command(f"REG {fw} {name}")
+
+    def calibrate_car(self, car_id: int):
+        """Read the TCS3200 and store it as the color of car_id (car over the sensor)."""
+        with self._slots_lock:
+            fw = self._fw_slot.get(car_id)
+        if fw is not None:
+            self.send_command(f"CAL {fw}")
+
+    def _registrations(self) -> dict[int, str]:
+        """Firmware slot -> name as sent with REG (caller holds _slots_lock)."""
+        return {fw: self._car_names.get(cid, f"AUTO{cid}")[:V2_NAME_LEN]
+                for cid, fw in self._fw_slot.items()}
+
+    def _send_registrations(self):
+        """Every mapped slot, for a firmware that just rebooted and forgot them."""
+        with self._slots_lock:
+            registrations = sorted(self._registrations().items())
+        for fw, name in registrations:
+            self.send_command(f"REG {fw} {name}")
+
+    def _car_for_slot(self, fw: int):
+        with self._slots_lock:
+            return self._race_slot.get(fw)
+
+    def _set_protocol(self, protocol: str):
+        if protocol == self.protocol:
+            return
+        self.protocol = protocol
+        self.protocol_detected.emit(protocol)
+
+    @property
+    def state(self) -> str:
+        return self._state
 
     # ── Port detection ──
 
     @staticmethod
     def list_ports() -> list[tuple[str, str]]:
-        ports = serial.tools.list_ports.comports()
-        return [(p.device, p.description) for p in sorted(ports)]
+        return [(p.device, p.description) for p in sorted(
+            scan_ports().values(), key=lambda p: p.device)]
 
     @staticmethod
-    def find_arduino() -> str | None:
-        for port, desc in ArduinoSource.list_ports():
-            low = desc.lower()
-            if any(kw in low for kw in ("ch340", "ch341", "arduino", "mega", "usb-serial")):
-                return port
+    def find_arduino(ports: dict[str, PortInfo] | None = None) -> str | None:
+        if ports is None:
+            ports = scan_ports()
+        for device in sorted(ports):
+            if ports[device].looks_like_arduino:
+                return device
         return None
 
     # ── Thread run loop ──
 
     def run(self):
-        self._running = True
-        ser = None
-
-        while self._running:
-            # Connect
-            if ser is None or not ser.is_open:
-                ser = self._try_connect()
-                if ser is None:
-                    self.connection_changed.emit(False)
-                    # Wait before retry
-                    for _ in range(20):
-                        if not self._running:
-                            return
-                        time.sleep(0.1)
-                    continue
+        self._state = STATE_DISCONNECTED
+        self._retry_at = 0.0
+        self._backoff_s = BACKOFF_MIN_S
+        watcher = PortWatcher(self._port_events.put)
+        watcher.start()
 
-            # Read & process
-            try:
-                # Drain command queue
-                while not self._cmd_queue.empty():
-                    try:
-                        cmd = self._cmd_queue.get_nowait()
-                        ser.write((cmd + "\n").encode("utf-8"))
-                    except queue.Empty:
-                        break
+        try:
+            while self._running:
+                self._handle_port_events()
+                if self._state in (STATE_DISCONNECTED, STATE_BACKOFF):
+                    self._step_connect()
+                else:
+                    self._step_io()
+        finally:
+            watcher.stop()
+            self._close(notify=False)
+
+    def _set_state(self, state: str):
+        if state != self._state:
+            self._state = state
+            self.state_changed.emit(state)
+
+    def _step_connect(self):
+        now = time.monotonic()
+        if not self.port or now < self._retry_at:
+            # Nothing to do until the watcher reports a port or backoff ends
+            time.sleep(0.02)
+            return
 
-                # Read line (with timeout from serial config)
-                if ser.in_waiting > 0:
-                    raw = ser.readline()
-                    if raw:
-                        self._process_line(raw.decode("utf-8", errors="replace").strip())
-
-            except (serial.SerialException, OSError):
-                self.connection_changed.emit(False)
-                self.error_occurred.emit("Conexion perdida con Arduino")
-                try:
-                    ser.close()
-                except Exception:
-                    pass
-                ser = None
-
-            time.sleep(0.01)  # Prevent busy loop
-
-        # Cleanup
-        if ser and ser.is_open:
-            try:
-                ser.write(b"STREAM OFF\n")
-                time.sleep(0.05)
-                ser.close()
-            except Exception:
-                pass
-
-    def _try_connect(self) -> serial.Serial | None:
-        if not self.port:
-            return None
         try:
-            ser = serial.Serial(
+            self._ser = serial.Serial(
                 port=self.port,
                 baudrate=self.baudrate,
-                timeout=0.1,
+                timeout=READ_TIMEOUT_S,
+                write_timeout=0.5,
             )
-            # Arduino resets on DTR - wait for READY event
-            start = time.time()
-            while time.time() - start < 5.0:
-                if not self._running:
-                    ser.close()
-                    return None
-                if ser.in_waiting > 0:
-                    raw = ser.readline().decode("utf-8", errors="replace").strip()
-                    if raw:
-                        try:
-                            msg = json.loads(raw)
-                            if msg.get("event") == "READY":
-                                data = msg.get("data", {})
-                                bl = data.get("baseline", 0)
-                                th = data.get("threshold", 0)
-                                self.ready.emit(bl, th)
-                                self.threshold_changed.emit(th)
-                                self.connection_changed.emit(True)
-                                return ser
-                        except json.JSONDecodeError:
-                            pass
-                time.sleep(0.05)
-            # Timeout waiting for READY - still return connection
-            self.connection_changed.emit(True)
-            return ser
         except (serial.SerialException, OSError) as e:
-            self.error_occurred.emit(f"No se pudo abrir {self.port}: {e}")
-            return None
+            self._ser = None
+            if self._state != STATE_BACKOFF:
+                self.error_occurred.emit(f"No se pudo abrir {self.port}: {e}")
+            self._schedule_retry()
+            return
 
-    def _process_line(self, line: str):
+        self._rx.clear()
+        self._device_clock.reset()
+        info = self._ports.get(self.port)
+        self._port_identity = info.identity if info else ""
+        # Arduino resets on DTR - wait for READY without blocking the loop
+        self._ready_deadline = time.monotonic() + READY_TIMEOUT_S
+        self._set_state(STATE_WAIT_READY)
+
+    def _step_io(self):
+        ser = self._ser
+        try:
+            # Drain command queue (held back until the firmware is up)
+            if self._state == STATE_STREAMING:
+                while True:
+                    try:
+                        cmd = self._cmd_queue.get_nowait()
+                    except queue.Empty:
+                        break
+                    if (self.protocol == PROTOCOL_LAPTIMER_V2
+                            and cmd.split(" ", 1)[0] in LASER_ONLY_COMMANDS):
+                        continue
+                    ser.write((cmd + "\n").encode("utf-8"))
+
+            # Blocks at most READ_TIMEOUT_S for the first byte
+            chunk = ser.read(max(1, ser.in_waiting))
+            t = time.perf_counter()  # arrival of the chunk's last line
+        except (serial.SerialException, OSError):
+            self.error_occurred.emit("Conexion perdida con Arduino")
+            self._close(notify=True)
+            self._schedule_retry()
+            return
+
+        if chunk:
+            self._rx += chunk
+            while True:
+                nl = self._rx.find(b"\n")
+                if nl < 0:
+                    break
+                raw = bytes(self._rx[:nl])
+                del self._rx[:nl + 1]
+                t0 = time.perf_counter()
+                self._process_line(raw.decode("utf-8", errors="replace").strip(), t)
+                _LINE.since(t0)
+
+        if self._state == STATE_WAIT_READY and time.monotonic() >= self._ready_deadline:
+            # Timeout waiting for READY (no DTR reset) - still use the connection
+            self._on_connected()
+
+    def _on_connected(self):
+        self._backoff_s = BACKOFF_MIN_S
+        self._set_state(STATE_STREAMING)
+        self.connection_changed.emit(True)
+
+    def _schedule_retry(self):
+        self._set_state(STATE_BACKOFF)
+        self._retry_at = time.monotonic() + self._backoff_s
+        self._backoff_s = min(self._backoff_s * 2, BACKOFF_MAX_S)
+
+    def _close(self, notify: bool):
+        ser, self._ser = self._ser, None
+        if ser is None:
+            return
+        try:
+            if ser.is_open and not notify:
+                ser.write(b"STREAM OFF\n")
+                ser.flush()
+            ser.close()
+        except Exception:
+            pass
+        if notify:
+            self.connection_changed.emit(False)
+
+    def _handle_port_events(self):
+        ports = None
+        while True:
+            try:
+                ports = self._port_events.get_nowait()
+            except queue.Empty:
+                break
+        if ports is None:
+            return
+
+        self._ports = ports
+        self.ports_changed.emit([(p.device, p.description) for p in sorted(
+            ports.values(), key=lambda p: p.device)])
+
+        if self.port in ports:
+            if self._state in (STATE_DISCONNECTED, STATE_BACKOFF):
+                self._retry_now()
+            return
+
+        if self._ser is not None and self._port_identity:
+            # Unplugged: drop the handle now instead of waiting for a read error
+            self.error_occurred.emit(f"{self.port} desconectado")
+            self._close(notify=True)
+            self._set_state(STATE_DISCONNECTED)
+
+        # USB re-enumeration: same device back under another name
+        new_port = None
+        if self._port_identity:
+            new_port = next((d for d, p in ports.items()
+                             if p.identity == self._port_identity), None)
+        if new_port is None and not self.port:
+            new_port = self.find_arduino(ports)
+        if new_port:
+            self.port = new_port
+            self.port_reassigned.emit(new_port)
+            self._retry_now()
+
+    def _retry_now(self):
+        self._backoff_s = BACKOFF_MIN_S
+        self._retry_at = 0.0
+
+    def _process_line(self, line: str, t: float):
         if not line:
             return
         try:
@@ -170,9 +398,45 @@ class ArduinoSource(QThread):
         event = msg.get("event", "")
         data = msg.get("data", {})
 
+        if event == "READY":
+            self._on_ready(data)
+        elif self.protocol == PROTOCOL_LAPTIMER_V2 or event in (
+                "START", "LAP", "CAR_REG", "CAL_SET", "STATUS"):
+            self._set_protocol(PROTOCOL_LAPTIMER_V2)
+            self._process_v2_event(event, data, t)
+        else:
+            device_ms = msg.get("ms")
+            if isinstance(device_ms, (int, float)):
+                t = self._device_clock.to_host(device_ms, t)
+            self._process_laser_event(event, data, t, device_ms)
+
+    def _on_ready(self, data: dict):
+        self._device_clock.reset()
+        # LapTimer v2 announces {"ldr_baseline": n}; LaserLapTimer {"baseline", "threshold"}
+        if "ldr_baseline" in data:
+            self._set_protocol(PROTOCOL_LAPTIMER_V2)
+            bl = data.get("ldr_baseline", 0)
+            th = V2_LDR_THRESHOLD
+            # Firmware forgets registrations on reset
+            self._send_registrations()
+        else:
+            self._set_protocol(PROTOCOL_LASER)
+            bl = data.get("baseline", 0)
+            th = data.get("threshold", 0)
+            # After a reboot (cable bumped) restore what the user had set
+            if self._threshold is not None and self._threshold != th:
+                self.send_command(f"THRESHOLD {self._threshold}")
+            if self._streaming:
+                self.send_command("STREAM ON")
+        self.ready.emit(bl, th)
+        self.threshold_changed.emit(th)
+        if self._state == STATE_WAIT_READY:
+            self._on_connected()
+
+    def _process_laser_event(self, event: str, data: dict, t: float, device_ms=None):
         if event == "LDR_CUT":
-            self.crossing_detected.emit(0)
             val = data.get("value", 0)
+            self.crossing_detected.emit(0, t, {"ldr": val, "device_ms": device_ms})
             self.ldr_value.emit(val)
 
         elif event == "LDR_STREAM":
@@ -184,12 +448,6 @@ class ArduinoSource(QThread):
         elif event == "THRESHOLD_SET":
             self.threshold_changed.emit(data.get("threshold", 0))
 
-        elif event == "READY":
-            bl = data.get("baseline", 0)
-            th = data.get("threshold", 0)
-            self.ready.emit(bl, th)
-            self.threshold_changed.emit(th)
-
         elif event == "TEST_RESULT":
             self.test_result.emit(
                 data.get("ldr_off", 0),
@@ -200,3 +458,43 @@ class ArduinoSource(QThread):
 
         elif event == "ERROR":
             self.error_occurred.emit(data.get("msg", "Error desconocido"))
+
+    def _process_v2_event(self, event: str, data: dict, t: float):
+        if event in ("START", "LAP"):
+            car_id = self._car_for_slot(data.get("id", -1))
+            if car_id is None:
+                self.error_occurred.emit(
+                    f"{event} de auto no identificado ({data.get('car', '?')})"
+                )
+                return
+            if event == "START":
+                self.device_start.emit(car_id, t)
+            else:
+                self.device_lap.emit(car_id, data.get("time", 0), t)
+
+        elif event == "LDR_CUT":
+            # v2 uses the laser only to refine the Hall trigger, never as a crossing
+            self.ldr_value.emit(data.get("ldr", 0))
+
+        elif event == "LDR_READ":
+            self.ldr_value.emit(data.get("value", 0))
+
+        elif event == "CAR_REG":
+            car_id = self._car_for_slot(data.get("slot", -1))
+            if car_id is not None:
+                self.car_registered.emit(car_id, data.get("name", ""))
+
+        elif event == "CAL_SET":
+            car_id = self._car_for_slot(data.get("slot", -1))
+            if car_id is not None:
+                self.car_calibrated.emit(
+                    car_id, data.get("r", 0), data.get("g", 0), data.get("b", 0)
+                )
+
+        elif event == "STATUS":
+            car_id = self._car_for_slot(data.get("slot", -1))
+            if car_id is not None:
+                self.status_received.emit(dict(data, car_id=car_id))
+
+        elif event == "ERROR":
+            self.error_occurred.emit(data.get("msg", "Error desconocido"))
@@ -1,97 +1,232 @@
+import queue
+import threading
 import time
+from dataclasses import dataclass, replace
 
 import cv2
 import numpy as np
-from PySide6.QtCore import QThread, Signal
-from PySide6.QtGui import QImage
 
 from ..models.car import CarColor
+from ..profiler import profiler
 from .finish_line import FinishLine
+from .reader import Hook, Reader
 
 DEFAULT_MIN_PIXEL_COUNT = 80
 CROSSING_COOLDOWN_S = 1.5  # seconds between detections per car
+FRAME_WIDTH, FRAME_HEIGHT = 640, 480
+
+_GRAB = profiler.stage("camera.grab")
+_RETRIEVE = profiler.stage("camera.retrieve")
+_HSV = profiler.stage("camera.hsv")
+_CLASSIFY = profiler.stage("camera.classify")
+_OVERLAY = profiler.stage("camera.overlay")
+
+
+@dataclass(frozen=True)
+class DetectionConfig:
+    """What one frame is checked against. Never mutated: setters build a new
+    one and swap it in, and the capture loop reads it once per frame."""
+    finish_line: FinishLine
+    cars: tuple[tuple[int, CarColor], ...] = ()
+    min_pixel_count: int = DEFAULT_MIN_PIXEL_COUNT
+    generation: int = 0  # bumped when cars or line change: cooldowns start over
+
+
+def open_capture(device_index: int, width: int = FRAME_WIDTH,
+                 height: int = FRAME_HEIGHT) -> cv2.VideoCapture | None:
+    cap = cv2.VideoCapture(device_index, cv2.CAP_DSHOW)
+    if not cap.isOpened():
+        cap = cv2.VideoCapture(device_index)
+    if not cap.isOpened():
+        return None
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, width)
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, height)
+    # Optimize for speed: lower exposure = less motion blur
+    cap.set(cv2.CAP_PROP_AUTO_EXPOSURE, 1)
+    return cap
+
+
+class CameraReader(Reader):
+    """Color detection on the finish line band, on its own thread (Qt-free;
+    the GUI wraps it in ``ui.sources.CameraSource``).
+
+    Settings can change from any thread while it runs: cars, line and
+    threshold through the ``DetectionConfig`` swap, the device through
+    ``switch_device``, which opens the new camera on a helper thread while
+    the current one keeps capturing.
+    """
+
+    thread_name = "perlap-camera"
+
+    def __init__(self, device_index: int = 0):
+        super().__init__()
+        # BGR frame with the detection overlay, perf_counter() when it was grabbed;
+        # only drawn while something is connected
+        self.frame_ready = Hook()
+        # car_id, perf_counter() when the frame was grabbed, {"frame": n, "pixels": count}
+        self.crossing_detected = Hook()
+        self.device_changed = Hook()  # device index, opened
+        self.device_index = device_index
+        self.frame_size = (FRAME_WIDTH, FRAME_HEIGHT)  # asked of the device when opened
+        self._config = DetectionConfig(FinishLine())
+        self._config_lock = threading.Lock()  # writers only; the loop just reads
+        self._last_detection_time: dict[int, float] = {}  # capture thread only
+        self._frame_index = 0
+        self._show_detection = True
+        self._wanted_device = device_index
+        self._opened: queue.Queue[tuple[int, cv2.VideoCapture]] = queue.Queue()
 
+    # ── Public API (called from any thread) ──
 
-class CameraSource(QThread):
-    frame_ready = Signal(QImage)
-    crossing_detected = Signal(int)  # car_id
+    @property
+    def config(self) -> DetectionConfig:
+        return self._config
 
-    def __init__(self, device_index: int = 0, parent=None):
-        super().__init__(parent)
-        self.device_index = device_index
-        self._running = False
-        self._car_entries: list[tuple[int, CarColor]] = []
-        self._finish_line = FinishLine()
-        self._last_detection_time: dict[int, float] = {}
-        self._show_detection = True
-        self.min_pixel_count = DEFAULT_MIN_PIXEL_COUNT
+    @property
+    def min_pixel_count(self) -> int:
+        return self._config.min_pixel_count
+
+    @min_pixel_count.setter
+    def min_pixel_count(self, value: int):
+        self._update(min_pixel_count=value)
 
     def set_cars(self, cars: list[tuple[int, CarColor]]):
-        self._car_entries = [(cid, c) for cid, c in cars if c.active]
-        self._last_detection_time.clear()
+        self._update(cars=tuple((cid, c) for cid, c in cars if c.active), new_generation=True)
 
     def set_finish_line(self, fl: FinishLine):
-        self._finish_line = fl
-        self._last_detection_time.clear()
+        self._update(finish_line=fl, new_generation=True)
+
+    def _update(self, new_generation: bool = False, **changes):
+        with self._config_lock:
+            if new_generation:
+                changes["generation"] = self._config.generation + 1
+            self._config = replace(self._config, **changes)
+
+    def switch_device(self, device_index: int):
+        """Capture from ``device_index`` from now on, without stopping.
+
+        Not running: it is simply the device ``start`` opens. Running: the
+        current device keeps going until the new one is open, then they swap;
+        ``device_changed`` reports the outcome either way.
+        """
+        self._wanted_device = device_index
+        if not self.is_running:
+            self.device_index = device_index
+            return
+        threading.Thread(target=self._open_next, args=(device_index,),
+                         name=f"{self.thread_name}-open", daemon=True).start()
+
+    def _open_next(self, device_index: int):
+        cap = open_capture(device_index, *self.frame_size)
+        if cap is None:
+            if device_index == self._wanted_device:
+                self.device_changed.emit(device_index, False)
+            return
+        self._opened.put((device_index, cap))
+
+    # ── Capture thread ──
 
     def run(self):
-        cap = cv2.VideoCapture(self.device_index, cv2.CAP_DSHOW)
-        if not cap.isOpened():
-            cap = cv2.VideoCapture(self.device_index)
-        if not cap.isOpened():
+        cap = open_capture(self.device_index, *self.frame_size)
+        if cap is None:
+            self.device_changed.emit(self.device_index, False)
             return
 
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
-        # Optimize for speed: lower exposure = less motion blur
-        cap.set(cv2.CAP_PROP_AUTO_EXPOSURE, 1)
-
-        self._running = True
+        generation = -1
         while self._running:
-            ret, frame = cap.read()
+            if not self._opened.empty():
+                cap = self._take_opened(cap)
+            t0 = time.perf_counter()
+            if not cap.grab():
+                continue
+            # Frame time: taken before decoding, and long before the UI sees it
+            t = time.perf_counter()
+            _GRAB.record(t0, t - t0)
+            ret, frame = cap.retrieve()
             if not ret:
                 continue
-
+            _RETRIEVE.since(t)
+            self._frame_index += 1
+            config = self._config
+            if config.generation != generation:
+                generation = config.generation
+                self._last_detection_time.clear()
+
+            hits = self._detect(frame, t, config)
+            if not self.frame_ready.connected:
+                continue  # headless: nothing to draw
+            t0 = time.perf_counter()
             display = frame.copy()
-            self._detect(frame, display)
-            self._draw_overlay(display)
-
-            h, w, ch = display.shape
-            img = QImage(display.data, w, h, ch * w, QImage.Format.Format_BGR888)
-            self.frame_ready.emit(img.copy())
+            self._draw_overlay(display, config, hits)
+            _OVERLAY.since(t0)
+            self.frame_ready.emit(display, t)
 
         cap.release()
+        # Opened after the loop stopped looking: nobody will use them
+        while not self._opened.empty():
+            self._opened.get_nowait()[1].release()
+
+    def _take_opened(self, cap: cv2.VideoCapture) -> cv2.VideoCapture:
+        """Swap to the newest device opened by ``switch_device``; stale ones are closed."""
+        while True:
+            try:
+                index, new = self._opened.get_nowait()
+            except queue.Empty:
+                return cap
+            if index != self._wanted_device:
+                new.release()  # superseded by a later switch
+                continue
+            cap.release()
+            cap = new
+            self.device_index = index
+            self._last_detection_time.clear()
+            self.device_changed.emit(index, True)
 
-    def stop(self):
-        self._running = False
-        self.wait(2000)
-
-    def _detect(self, frame: np.ndarray, display: np.ndarray):
-        if not self._finish_line.defined or not self._car_entries:
-            return
+    def _detect(self, frame: np.ndarray, t: float, config: DetectionConfig) -> list:
+        """Check the band for every car; returns (car, mask) of those with pixels."""
+        if not config.finish_line.defined or not config.cars:
+            return []
 
         h, w = frame.shape[:2]
-        now = time.monotonic()
 
         # Detection band (the zone that triggers crossings)
-        bx1, by1, bx2, by2 = self._finish_line.get_detection_band(h, w)
+        bx1, by1, bx2, by2 = config.finish_line.get_detection_band(h, w)
         band = frame[by1:by2, bx1:bx2]
         if band.size == 0:
-            return
+            return []
+        t0 = time.perf_counter()
         hsv_band = cv2.cvtColor(band, cv2.COLOR_BGR2HSV)
+        t1 = time.perf_counter()
+        _HSV.record(t0, t1 - t0)
 
-        for car_id, car in self._car_entries:
+        hits = []
+        for car_id, car in config.cars:
             # Color mask on the detection band
             mask = cv2.inRange(hsv_band, car.hsv_lower, car.hsv_upper)
             # Aggressive dilate to merge motion-blurred fragments
             mask = cv2.dilate(mask, np.ones((5, 5), np.uint8), iterations=2)
 
             pixel_count = cv2.countNonZero(mask)
+            if pixel_count > 0:
+                hits.append((car, mask, pixel_count))
 
-            # Draw overlay: show detected pixels
-            if self._show_detection and pixel_count > 0:
-                color_mask_bgr = cv2.cvtColor(mask, cv2.COLOR_GRAY2BGR)
-                band_display = display[by1:by2, bx1:bx2]
+            # Trigger if enough color pixels in the band
+            if pixel_count >= config.min_pixel_count:
+                last = self._last_detection_time.get(car_id)
+                if last is None or (t - last) >= CROSSING_COOLDOWN_S:
+                    self._last_detection_time[car_id] = t
+                    self.crossing_detected.emit(
+                        car_id, t, {"frame": self._frame_index, "pixels": pixel_count})
+        _CLASSIFY.since(t1)
+        return hits
+
+    def _draw_overlay(self, display: np.ndarray, config: DetectionConfig, hits: list):
+        fl = config.finish_line
+        if self._show_detection and hits:
+            h, w = display.shape[:2]
+            bx1, by1, bx2, by2 = fl.get_detection_band(h, w)
+            band_display = display[by1:by2, bx1:bx2]
+            for car, mask, pixel_count in hits:
                 # Tint detected pixels with car color
                 tint = np.zeros_like(band_display)
                 tint[:] = car.display_color
@@ -103,21 +238,13 @@ class CameraSource(QThread):
                             (bx1 + 4, by1 + 14),
                             cv2.FONT_HERSHEY_SIMPLEX, 0.4, car.display_color, 1)
 
-            # Trigger if enough color pixels in the band
-            if pixel_count >= self.min_pixel_count:
-                last = self._last_detection_time.get(car_id, 0)
-                if (now - last) >= CROSSING_COOLDOWN_S:
-                    self._last_detection_time[car_id] = now
-                    self.crossing_detected.emit(car_id)
-
-    def _draw_overlay(self, display: np.ndarray):
-        if self._finish_line.defined:
-            p1 = tuple(self._finish_line.p1.astype(int))
-            p2 = tuple(self._finish_line.p2.astype(int))
+        if fl.defined:
+            p1 = tuple(fl.p1.astype(int))
+            p2 = tuple(fl.p2.astype(int))
             cv2.line(display, p1, p2, (0, 0, 255), 2)
 
             h, w = display.shape[:2]
 
             # Draw detection band border
-            bx1, by1, bx2, by2 = self._finish_line.get_detection_band(h, w)
+            bx1, by1, bx2, by2 = fl.get_detection_band(h, w)
             cv2.rectangle(display, (bx1, by1), (bx2, by2), (0, 180, 0), 1)
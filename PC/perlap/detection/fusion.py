@@ -0,0 +1,104 @@
+from bisect import bisect_left
+from collections import deque
+from dataclasses import dataclass, field
+
+DEFAULT_FUSION_WINDOW_MS = 250
+CAMERA_BUFFER_SIZE = 64
+
+FUSED = "FUSED"              # laser time + camera car id
+LASER_ONLY = "LASER_ONLY"    # beam cut with no camera detection in the window
+CAMERA_ONLY = "CAMERA_ONLY"  # camera detection that no beam cut claimed
+
+
+@dataclass
+class FusionResult:
+    kind: str
+    car_id: int          # -1 for LASER_ONLY
+    t: float             # seconds, laser time when there is one
+    offset_ms: int = 0   # camera time - laser time (FUSED only)
+    meta: dict = field(default_factory=dict)  # source details of the cut and/or detection
+
+
+class CrossingFuser:
+    """Pairs laser beam cuts (precise time, no identity) with camera color
+    detections (car identity, frame-rate time).
+
+    Each cut takes the unclaimed camera detection nearest in time within
+    ``window_ms``. A cut is decided as soon as a detection at or after it has
+    arrived (later ones can only be farther away) or once its window expires.
+    All times are seconds on the same clock. Not thread-safe: feed and poll
+    from one thread.
+    """
+
+    def __init__(self, window_ms: int = DEFAULT_FUSION_WINDOW_MS):
+        self.window_ms = window_ms
+        # Time-indexed camera detections, ascending t: [t, car_id, claimed, meta]
+        self._camera: deque[list] = deque()
+        self._pending_cuts: deque[tuple[float, dict]] = deque()
+        self._overflow: list[FusionResult] = []
+
+    @property
+    def window_s(self) -> float:
+        return self.window_ms / 1000
+
+    def reset(self):
+        self._camera.clear()
+        self._pending_cuts.clear()
+        self._overflow.clear()
+
+    def add_camera(self, car_id: int, t: float, meta: dict | None = None):
+        det = [t, car_id, False, meta or {}]
+        if self._camera and t < self._camera[-1][0]:
+            # Keep the buffer sorted even if a detection arrives late
+            idx = bisect_left(self._camera, t, key=lambda d: d[0])
+            self._camera.insert(idx, det)
+        else:
+            self._camera.append(det)
+        if len(self._camera) > CAMERA_BUFFER_SIZE:
+            old_t, old_id, claimed, old_meta = self._camera.popleft()
+            if not claimed:
+                self._overflow.append(FusionResult(CAMERA_ONLY, old_id, old_t, meta=old_meta))
+
+    def add_laser(self, t: float, meta: dict | None = None):
+        self._pending_cuts.append((t, meta or {}))
+
+    def poll(self, now: float) -> list[FusionResult]:
+        results = self._overflow
+        self._overflow = []
+        window = self.window_s
+
+        while self._pending_cuts:
+            cut, cut_meta = self._pending_cuts[0]
+            latest = self._camera[-1][0] if self._camera else None
+            if now < cut + window and (latest is None or latest < cut):
+                break  # a closer detection may still arrive
+            self._pending_cuts.popleft()
+            results.append(self._match(cut, cut_meta))
+
+        # Detections too old to be claimed by any future cut
+        horizon = now - 2 * window
+        while self._camera and self._camera[0][0] < horizon:
+            t, car_id, claimed, meta = self._camera.popleft()
+            if not claimed and not any(abs(c - t) <= window for c, _ in self._pending_cuts):
+                results.append(FusionResult(CAMERA_ONLY, car_id, t, meta=meta))
+
+        return results
+
+    def _match(self, cut: float, cut_meta: dict) -> FusionResult:
+        window = self.window_s
+        lo = bisect_left(self._camera, cut - window, key=lambda d: d[0])
+        best = None
+        for i in range(lo, len(self._camera)):
+            det = self._camera[i]
+            if det[0] > cut + window:
+                break
+            if det[2]:
+                continue
+            if best is None or abs(det[0] - cut) < abs(best[0] - cut):
+                best = det
+        if best is None:
+            return FusionResult(LASER_ONLY, -1, cut, meta=cut_meta)
+        best[2] = True
+        offset = int(round((best[0] - cut) * 1000))
+        return FusionResult(FUSED, best[1], cut, offset,
+                            {**best[3], **cut_meta, "offset_ms": offset})
@@ -0,0 +1,223 @@
+import json
+import selectors
+import sys
+import threading
+import time
+from dataclasses import dataclass
+
+import serial
+
+from ..profiler import profiler
+from .arduino import BACKOFF_MIN_S, BACKOFF_MAX_S
+from .reader import Hook, Reader
+
+FINISH_GATE = 0          # gate index of the finish line; sector gates are 1..MAX_SECTOR_GATES
+MAX_SECTOR_GATES = 3     # up to 4 sectors per lap
+SELECT_TIMEOUT_S = 0.05
+POLL_INTERVAL_S = 0.002  # Windows: serial handles can't be select()ed, poll in_waiting
+
+_SELECTABLE = sys.platform != "win32"
+_LINE = profiler.stage("gates.line")  # decode + parse + dispatch of one line
+
+
+@dataclass(frozen=True)
+class GateConfig:
+    port: str
+    gate: int  # FINISH_GATE or sector gate number
+
+    @property
+    def label(self) -> str:
+        return "Meta" if self.gate == FINISH_GATE else f"S{self.gate}"
+
+    def to_dict(self) -> dict:
+        return {"port": self.port, "gate": self.gate}
+
+    @staticmethod
+    def from_dict(d: dict) -> "GateConfig":
+        return GateConfig(d["port"], int(d.get("gate", FINISH_GATE)))
+
+
+class _GateLink:
+    def __init__(self, cfg: GateConfig):
+        self.cfg = cfg
+        self.ser: serial.Serial | None = None
+        self.rx = bytearray()
+        self.retry_at = 0.0
+        self.backoff_s = BACKOFF_MIN_S
+        self.reported_error = False
+
+
+class GateReader(Reader):
+    """Reads every timing gate (LaserLapTimer firmware, one per serial port) from
+    a single thread. Ports are multiplexed with a selector; each gate reconnects
+    on its own with backoff without stalling the others.
+
+    A beam cut carries no car identity: crossings are emitted with car_id -1 and
+    ``RaceManager`` assigns them by passing order. Qt-free; the GUI wraps it in
+    ``ui.sources.GateSource``.
+    """
+
+    thread_name = "perlap-gates"
+
+    def __init__(self):
+        super().__init__()
+        self.gate_crossing = Hook()    # gate, car_id (-1), perf_counter time
+        self.gate_connection = Hook()  # gate, connected
+        self.error_occurred = Hook()   # message
+        self.baudrate = 115200
+        self._lock = threading.Lock()
+        self._pending: list[GateConfig] | None = None
+        self._gates: list[GateConfig] = []
+        self._links: dict[str, _GateLink] = {}
+        self._sel: selectors.BaseSelector | None = None
+
+    # ── Public API (called from main thread) ──
+
+    @property
+    def gates(self) -> list[GateConfig]:
+        return list(self._gates)
+
+    def set_gates(self, gates: list[GateConfig]):
+        """Replace the gate list; applied by the reader thread on its next loop."""
+        with self._lock:
+            self._gates = list(gates)
+            self._pending = list(gates)
+
+    @property
+    def sector_gate_count(self) -> int:
+        return sum(1 for g in self._gates if g.gate != FINISH_GATE)
+
+    # ── Thread run loop ──
+
+    def run(self):
+        self._sel = selectors.DefaultSelector() if _SELECTABLE else None
+        with self._lock:
+            self._pending = list(self._gates)
+        try:
+            while self._running:
+                self._apply_config()
+                self._connect_due()
+                if self._sel is not None:
+                    if self._sel.get_map():
+                        for key, _ in self._sel.select(SELECT_TIMEOUT_S):
+                            self._read(key.data)
+                    else:
+                        time.sleep(SELECT_TIMEOUT_S)
+                else:
+                    for link in list(self._links.values()):
+                        if link.ser is not None:
+                            self._read(link)
+                    time.sleep(POLL_INTERVAL_S)
+        finally:
+            for link in list(self._links.values()):
+                self._close(link, notify=False)
+            self._links.clear()
+            if self._sel is not None:
+                self._sel.close()
+                self._sel = None
+
+    def _apply_config(self):
+        with self._lock:
+            gates, self._pending = self._pending, None
+        if gates is None:
+            return
+        wanted = {g.port: g for g in gates if g.port}
+        for port in list(self._links):
+            link = self._links[port]
+            if port not in wanted:
+                self._close(link, notify=True)
+                del self._links[port]
+            elif wanted[port].gate != link.cfg.gate:
+                # Same device, new role: report the old gate as gone
+                if link.ser is not None:
+                    self.gate_connection.emit(link.cfg.gate, False)
+                    self.gate_connection.emit(wanted[port].gate, True)
+                link.cfg = wanted[port]
+        for port, cfg in wanted.items():
+            if port not in self._links:
+                self._links[port] = _GateLink(cfg)
+
+    def _connect_due(self):
+        now = time.monotonic()
+        for link in self._links.values():
+            if link.ser is not None or now < link.retry_at:
+                continue
+            try:
+                ser = serial.Serial(port=link.cfg.port, baudrate=self.baudrate,
+                                    timeout=0, write_timeout=0.5)
+            except (serial.SerialException, OSError) as e:
+                if not link.reported_error:
+                    link.reported_error = True
+                    self.error_occurred.emit(
+                        f"Puerta {link.cfg.label}: no se pudo abrir {link.cfg.port}: {e}")
+                self._schedule_retry(link)
+                continue
+            link.ser = ser
+            link.rx.clear()
+            link.backoff_s = BACKOFF_MIN_S
+            link.reported_error = False
+            if self._sel is not None:
+                self._sel.register(ser.fileno(), selectors.EVENT_READ, link)
+            self.gate_connection.emit(link.cfg.gate, True)
+
+    def _schedule_retry(self, link: _GateLink):
+        link.retry_at = time.monotonic() + link.backoff_s
+        link.backoff_s = min(link.backoff_s * 2, BACKOFF_MAX_S)
+
+    def _close(self, link: _GateLink, notify: bool):
+        ser, link.ser = link.ser, None
+        if ser is None:
+            return
+        if self._sel is not None:
+            try:
+                self._sel.unregister(ser.fileno())
+            except (KeyError, ValueError, OSError):
+                pass
+        try:
+            ser.close()
+        except Exception:
+            pass
+        if notify:
+            self.gate_connection.emit(link.cfg.gate, False)
+
+    def _read(self, link: _GateLink):
+        # Timestamp at wake-up, before parsing: this is the crossing time
+        t = time.perf_counter()
+        ser = link.ser
+        if ser is None:
+            return
+        try:
+            waiting = ser.in_waiting
+            if not waiting and self._sel is None:
+                return
+            chunk = ser.read(max(1, waiting))
+        except (serial.SerialException, OSError):
+            self.error_occurred.emit(f"Puerta {link.cfg.label}: conexion perdida")
+            self._close(link, notify=True)
+            self._schedule_retry(link)
+            return
+
+        link.rx += chunk
+        while True:
+            nl = link.rx.find(b"\n")
+            if nl < 0:
+                break
+            raw = bytes(link.rx[:nl])
+            del link.rx[:nl + 1]
+            t0 = time.perf_counter()
+            self._process_line(link, raw.decode("utf-8", errors="replace").strip(), t)
+            _LINE.since(t0)
+
+    def _process_line(self, link: _GateLink, line: str, t: float):
+        if not line:
+            return
+        try:
+            msg = json.loads(line)
+        except json.JSONDecodeError:
+            return
+        event = msg.get("event", "")
+        if event == "LDR_CUT":
+            self.gate_crossing.emit(link.cfg.gate, -1, t)
+        elif event == "ERROR":
+            self.error_occurred.emit(
+                f"Puerta {link.cfg.label}: {msg.get('data', {}).get('msg', 'Error desconocido')}")
@@ -0,0 +1,339 @@
+"""Several cameras, each captured and analysed in its own process.
+
+One ``CameraReader`` per worker process, so detection on two or three
+streams runs on as many cores instead of sharing one under the GIL. Workers
+write their overlay frames into a ``FrameRing`` (shared memory) and send
+crossings and stats through a queue; the main process only shows frames
+and puts crossings on the bus.
+
+Crossing times stay ``perf_counter()`` values taken in the worker: the
+clock is system-wide (CLOCK_MONOTONIC / QueryPerformanceCounter), so they
+compare directly with every other source.
+
+OpenCV is only imported in the workers.
+"""
+import multiprocessing as mp
+import os
+import queue
+import time
+from dataclasses import dataclass
+from multiprocessing import shared_memory
+from typing import Optional
+
+import numpy as np
+
+from ..profiler import profiler
+from .finish_line import FinishLine
+from .reader import Hook, Reader
+
+RING_SLOTS = 4           # frames kept per camera; the reader only wants the latest
+STATS_INTERVAL_S = 1.0
+CONTROL_POLL_S = 0.2
+LATENCY_SAMPLES = 256
+WORKER_JOIN_S = 3.0
+
+_RING_WRITE = profiler.stage("camera.ring_write")
+
+# Worker -> main messages: (kind, camera, ...)
+MSG_CROSSING = "crossing"  # car_id, t, meta
+MSG_DEVICE = "device"      # opened
+MSG_STATS = "stats"        # {"fps", "cpu", "latency_ms", "latency_max_ms", "pid", "stages"}
+
+
+@dataclass
+class CameraSpec:
+    device_index: int
+    name: str = ""
+    gate: int = 0       # 0: finish line; N: intermediate gate N (e.g. pit lane)
+    finish_line: Optional[FinishLine] = None
+    width: int = 640    # asked of the camera and size of its ring (720p: 1280 x 720)
+    height: int = 480
+
+    @property
+    def label(self) -> str:
+        return self.name or f"Camara {self.device_index}"
+
+    def to_dict(self) -> dict:
+        return {"device_index": self.device_index, "name": self.name, "gate": self.gate,
+                "finish_line": self.finish_line.to_dict() if self.finish_line else None,
+                "width": self.width, "height": self.height}
+
+    @classmethod
+    def from_dict(cls, d: dict) -> "CameraSpec":
+        return cls(int(d["device_index"]), d.get("name") or "", int(d.get("gate") or 0),
+                   FinishLine.from_dict(d["finish_line"]) if d.get("finish_line") else None,
+                   int(d.get("width") or 640), int(d.get("height") or 480))
+
+
+class FrameRing:
+    """The last ``slots`` frames of one camera in shared memory.
+
+    One writer (the camera process), any number of readers. A slot's
+    sequence number is written after its pixels, so a reader that finds it
+    changed after copying knows the frame was overwritten meanwhile.
+    """
+
+    def __init__(self, shape: tuple[int, int, int], slots: int = RING_SLOTS,
+                 name: Optional[str] = None):
+        self.shape = shape
+        self.slots = slots
+        frame_bytes = int(np.prod(shape))
+        # Header: latest sequence, then per slot its sequence and grab time
+        header = 8 * (1 + 2 * slots)
+        if name is None:
+            self.shm = shared_memory.SharedMemory(create=True, size=header + slots * frame_bytes)
+            self._owner = True
+        else:
+            # Attached (worker): spawned processes share the creator's resource
+            # tracker, which forgets the segment when the creator unlinks it
+            self.shm = shared_memory.SharedMemory(name=name)
+            self._owner = False
+        buf = self.shm.buf
+        self._latest = np.ndarray((1,), np.int64, buf, 0)
+        self._seq = np.ndarray((slots,), np.int64, buf, 8)
+        self._t = np.ndarray((slots,), np.float64, buf, 8 + 8 * slots)
+        self._frames = np.ndarray((slots,) + shape, np.uint8, buf, header)
+        if self._owner:
+            self._latest[0] = 0
+            self._seq[:] = 0
+
+    @property
+    def name(self) -> str:
+        return self.shm.name
+
+    def write(self, frame: np.ndarray, t: float):
+        seq = int(self._latest[0]) + 1
+        slot = seq % self.slots
+        self._seq[slot] = 0  # being written
+        self._frames[slot] = frame
+        self._t[slot] = t
+        self._seq[slot] = seq
+        self._latest[0] = seq
+
+    @property
+    def latest(self) -> int:
+        """Sequence number of the newest frame (0 = none yet)."""
+        return int(self._latest[0])
+
+    def read_latest(self) -> Optional[tuple[int, np.ndarray, float]]:
+        """(sequence, copy of the frame, grab time) of the newest frame, or None."""
+        seq = self.latest
+        if not seq:
+            return None
+        slot = seq % self.slots
+        frame = self._frames[slot].copy()
+        t = float(self._t[slot])
+        if self._seq[slot] != seq:
+            return None  # overwritten while copying: the next poll gets a newer one
+        return seq, frame, t
+
+    def close(self):
+        # Views first: the buffer cannot be released while arrays point into it
+        self._latest = self._seq = self._t = self._frames = None
+        self.shm.close()
+        if self._owner:
+            self.shm.unlink()
+
+
+def _camera_process(camera: int, spec: CameraSpec, ring_name: str, cars: list,
+                    min_pixel_count: Optional[int], results, control, stop):
+    """Worker process: one camera captured and analysed, results sent back."""
+    import cv2
+    from .camera import CameraReader
+
+    ring = FrameRing((spec.height, spec.width, 3), name=ring_name)
+    reader = CameraReader(spec.device_index)
+    reader.frame_size = (spec.width, spec.height)
+    reader.set_finish_line(spec.finish_line or FinishLine())
+    reader.set_cars(cars)
+    if min_pixel_count is not None:
+        reader.min_pixel_count = min_pixel_count
+
+    # grab -> frame in the ring, last LATENCY_SAMPLES frames (written by the capture thread)
+    latencies = np.zeros(LATENCY_SAMPLES)
+    frames = 0
+    opened = False
+
+    def on_frame(display: np.ndarray, t: float):
+        nonlocal frames, opened
+        if display.shape != ring.shape:
+            display = cv2.resize(display, (spec.width, spec.height))
+        t0 = time.perf_counter()
+        ring.write(display, t)
+        _RING_WRITE.since(t0)
+        latencies[frames % LATENCY_SAMPLES] = time.perf_counter() - t
+        frames += 1
+        if not opened:
+            opened = True
+            results.put((MSG_DEVICE, camera, True))
+
+    reader.frame_ready.connect(on_frame)
+    reader.crossing_detected.connect(
+        lambda car_id, t, meta: results.put((MSG_CROSSING, camera, car_id, t, meta)))
+    reader.device_changed.connect(lambda _, ok: results.put((MSG_DEVICE, camera, ok)))
+    reader.start()
+
+    wall, cpu, counted = time.perf_counter(), time.process_time(), 0
+    while not stop.is_set() and reader.is_running:
+        try:
+            what, value = control.get(timeout=CONTROL_POLL_S)
+        except queue.Empty:
+            pass
+        else:
+            if what == "cars":
+                reader.set_cars(value)
+            elif what == "line":
+                reader.set_finish_line(value)
+            elif what == "min_px":
+                reader.min_pixel_count = value
+        now = time.perf_counter()
+        if now - wall >= STATS_INTERVAL_S:
+            used, total = time.process_time(), frames
+            # Newest frames only: the ring wraps every LATENCY_SAMPLES frames
+            newest = np.arange(max(counted, total - LATENCY_SAMPLES), total) % LATENCY_SAMPLES
+            lat = np.sort(latencies[newest])
+            results.put((MSG_STATS, camera, {
+                "fps": (total - counted) / (now - wall),
+                "cpu": 100.0 * (used - cpu) / (now - wall),
+                "latency_ms": 1000.0 * float(lat[len(lat) // 2]) if len(lat) else 0.0,
+                "latency_max_ms": 1000.0 * float(lat[-1]) if len(lat) else 0.0,
+                "pid": os.getpid(),
+                "stages": profiler.summary(),
+            }))
+            wall, cpu, counted = now, used, total
+    reader.stop()
+    ring.close()
+
+
+class MultiCameraReader(Reader):
+    """Several cameras, one worker process each (Qt-free; the GUI wraps it in
+    ``ui.sources.MultiCameraSource``).
+
+    Crossings from finish-line cameras (``gate`` 0) come out of
+    ``crossing_detected`` with ``meta["camera"]``; the others out of
+    ``gate_crossing`` as intermediate gates. This thread only collects what
+    the workers send; frames are read with ``latest_frame``.
+    """
+
+    thread_name = "perlap-multicam"
+
+    def __init__(self, cameras: list[CameraSpec]):
+        super().__init__()
+        self.crossing_detected = Hook()  # car_id, t, {"frame", "pixels", "camera"}
+        self.gate_crossing = Hook()      # gate, car_id, t
+        self.device_changed = Hook()     # camera, opened
+        self.stats_updated = Hook()      # camera, stats dict (see MSG_STATS)
+        self.cameras = list(cameras)
+        self.stats: list[dict] = [{} for _ in self.cameras]
+        self._cars: list = []
+        self._min_pixel_count: Optional[int] = None
+        self._rings: list[FrameRing] = []
+        self._procs: list = []
+        self._controls: list = []
+        self._results = None
+        self._stop_event = None
+
+    @property
+    def sector_gate_count(self) -> int:
+        return max((c.gate for c in self.cameras), default=0)
+
+    # ── Settings (any thread; forwarded to running workers) ──
+
+    @property
+    def min_pixel_count(self) -> Optional[int]:
+        return self._min_pixel_count
+
+    @min_pixel_count.setter
+    def min_pixel_count(self, value: int):
+        self._min_pixel_count = value
+        self._send_all("min_px", value)
+
+    def set_cars(self, cars: list):
+        self._cars = [(cid, c) for cid, c in cars if c.active]
+        self._send_all("cars", self._cars)
+
+    def set_finish_line(self, camera: int, fl: FinishLine):
+        self.cameras[camera].finish_line = fl
+        if camera < len(self._controls):
+            self._controls[camera].put(("line", fl))
+
+    def _send_all(self, what: str, value):
+        for control in self._controls:
+            control.put((what, value))
+
+    # ── Frames (main process) ──
+
+    def latest_frame(self, camera: int) -> Optional[tuple[int, np.ndarray, float]]:
+        """(sequence, frame, grab time) of ``camera``'s newest frame, or None."""
+        if camera >= len(self._rings):
+            return None
+        return self._rings[camera].read_latest()
+
+    # ── Lifecycle ──
+
+    def start(self):
+        if self.is_running:
+            return
+        # spawn: a forked child would inherit the GUI's threads and locks
+        ctx = mp.get_context("spawn")
+        self._results = ctx.Queue()
+        self._stop_event = ctx.Event()
+        self._rings = [FrameRing((c.height, c.width, 3)) for c in self.cameras]
+        self._controls = [ctx.Queue() for _ in self.cameras]
+        self._procs = [
+            ctx.Process(target=_camera_process, name=f"perlap-camera-{i}", daemon=True,
+                        args=(i, spec, self._rings[i].name, self._cars,
+                              self._min_pixel_count, self._results, self._controls[i],
+                              self._stop_event))
+            for i, spec in enumerate(self.cameras)
+        ]
+        for proc in self._procs:
+            proc.start()
+        super().start()
+
+    def stop(self, timeout: float = WORKER_JOIN_S):
+        if self._stop_event is not None:
+            self._stop_event.set()
+        deadline = time.monotonic() + timeout
+        for proc in self._procs:
+            proc.join(max(0.0, deadline - time.monotonic()))
+            if proc.is_alive():
+                proc.terminate()
+                proc.join()
+        super().stop(timeout)
+        for ring in self._rings:
+            ring.close()
+        for q in self._controls + ([self._results] if self._results is not None else []):
+            q.close()
+        self._procs, self._rings, self._controls = [], [], []
+        self._results = self._stop_event = None
+
+    def run(self):
+        results = self._results
+        while self._running:
+            try:
+                msg = results.get(timeout=CONTROL_POLL_S)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                return
+            kind, camera = msg[0], msg[1]
+            if kind == MSG_CROSSING:
+                _, _, car_id, t, meta = msg
+                spec = self.cameras[camera]
+                if spec.gate:
+                    self.gate_crossing.emit(spec.gate, car_id, t)
+                else:
+                    self.crossing_detected.emit(car_id, t, dict(meta, camera=spec.label))
+            elif kind == MSG_DEVICE:
+                self.device_changed.emit(camera, msg[2])
+            elif kind == MSG_STATS:
+                self.stats[camera] = msg[2]
+                self.stats_updated.emit(camera, msg[2])
+
+
+def format_camera_stats(spec: CameraSpec, stats: dict) -> str:
+    if not stats:
+        return f"{spec.label}: sin datos"
+    return (f"{spec.label}: {stats['fps']:.0f} fps, CPU {stats['cpu']:.0f}%, "
+            f"latencia {stats['latency_ms']:.1f} ms (max {stats['latency_max_ms']:.1f})")
@@ -0,0 +1,79 @@
+import threading
+from dataclasses import dataclass
+from typing import Callable
+
+import serial.tools.list_ports
+
+WATCH_INTERVAL_S = 0.2
+ARDUINO_KEYWORDS = ("ch340", "ch341", "arduino", "mega", "usb-serial")
+
+
+@dataclass(frozen=True)
+class PortInfo:
+    device: str
+    description: str
+    identity: str  # survives re-enumeration under a new device name
+
+    @property
+    def looks_like_arduino(self) -> bool:
+        low = self.description.lower()
+        return any(kw in low for kw in ARDUINO_KEYWORDS)
+
+
+def scan_ports() -> dict[str, PortInfo]:
+    ports = {}
+    for p in serial.tools.list_ports.comports():
+        if p.serial_number:
+            identity = f"SN:{p.serial_number}"
+        elif p.vid is not None:
+            # CH340 clones have no serial number: VID:PID plus physical USB location
+            identity = f"{p.vid:04X}:{p.pid:04X}@{p.location or ''}"
+        else:
+            identity = p.hwid or p.device
+        ports[p.device] = PortInfo(p.device, p.description, identity)
+    return ports
+
+
+class PortWatcher:
+    """Polls the serial port list in a daemon thread and reports every change.
+
+    ``on_change`` receives the full {device: PortInfo} snapshot and runs on the
+    watcher thread, so it should only hand the snapshot over (queue, flag).
+    """
+
+    def __init__(self, on_change: Callable[[dict[str, PortInfo]], None],
+                 interval_s: float = WATCH_INTERVAL_S):
+        self._on_change = on_change
+        self._interval_s = interval_s
+        self._stop = threading.Event()
+        self._thread: threading.Thread | None = None
+        self._ports: dict[str, PortInfo] = {}
+
+    @property
+    def ports(self) -> dict[str, PortInfo]:
+        return dict(self._ports)
+
+    def start(self):
+        if self._thread and self._thread.is_alive():
+            return
+        self._stop.clear()
+        self._ports = scan_ports()
+        self._on_change(dict(self._ports))
+        self._thread = threading.Thread(target=self._run, name="PortWatcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._stop.set()
+        if self._thread:
+            self._thread.join(1.0)
+            self._thread = None
+
+    def _run(self):
+        while not self._stop.wait(self._interval_s):
+            try:
+                ports = scan_ports()
+            except OSError:
+                continue
+            if ports != self._ports:
+                self._ports = ports
+                self._on_change(dict(ports))
@@ -0,0 +1,66 @@
+"""Qt-free plumbing shared by the detection readers (camera, Arduino, gates).
+
+Readers run their loop on a plain thread and report through ``Hook``s,
+which look like Qt signals to the caller: the GUI connects them to real
+signals (``ui.sources``), the headless engine straight to the event bus.
+"""
+import threading
+from typing import Callable, Optional
+
+
+class Hook:
+    """Callback list with a signal-like API. ``emit`` calls every connected
+    callable in the emitting thread (the reader's own)."""
+
+    __slots__ = ("_callbacks",)
+
+    def __init__(self):
+        self._callbacks: tuple[Callable, ...] = ()
+
+    def connect(self, fn: Callable):
+        # Replaced, not mutated: an emit running on the reader thread keeps its tuple
+        self._callbacks = self._callbacks + (fn,)
+
+    def disconnect(self, fn: Callable):
+        self._callbacks = tuple(cb for cb in self._callbacks if cb != fn)
+
+    @property
+    def connected(self) -> bool:
+        return bool(self._callbacks)
+
+    def emit(self, *args):
+        for fn in self._callbacks:
+            fn(*args)
+
+
+class Reader:
+    """Runs ``run`` on a new daemon thread per ``start`` (restartable, like a QThread).
+
+    ``run`` loops while ``self._running``; ``stop`` clears it and joins.
+    """
+
+    thread_name = "perlap-reader"
+
+    def __init__(self):
+        self._running = False
+        self._thread: Optional[threading.Thread] = None
+
+    def start(self):
+        if self.is_running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self.run, name=self.thread_name, daemon=True)
+        self._thread.start()
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self, timeout: float = 3.0):
+        self._running = False
+        thread = self._thread
+        if thread is not None and thread is not threading.current_thread():
+            thread.join(timeout)
+
+    def run(self):
+        raise NotImplementedError
@@ -0,0 +1,221 @@
+from bisect import bisect_right
+from itertools import accumulate
+
+from PySide6.QtCore import QObject, QTimer, Signal
+
+from ..models.car import UNSAMPLED_HSV_LOWER, UNSAMPLED_HSV_UPPER
+from ..models.clock import Clock, SYSTEM_CLOCK
+from ..models.events import EventType, LapEvent
+from ..models.race import RaceManager
+
+SPEED_MAX = 0.0          # as fast as the UI keeps up
+SPEEDS = [("1x", 1.0), ("10x", 10.0), ("Máx", SPEED_MAX)]
+CHECKPOINT_EVERY = 500   # events between RaceManager snapshots
+TICK_MS = 10
+MAX_BATCH_S = 0.02       # max speed: replay this long per tick, then let Qt paint
+
+_REPLAYED = (EventType.START.value, EventType.LAP.value, EventType.SECTOR.value)
+
+
+def replay_events(race: dict) -> list[dict]:
+    """START/LAP/SECTOR events of a race summary, in the order they were processed.
+
+    That order is kept even where timestamps go slightly back (a fused or
+    gate crossing logged after a later one), so the replay takes the same
+    decisions. Summaries without an event list (old JSON) are rebuilt from
+    the per-car laps, with each car's START one lap time before its first lap.
+    """
+    events = [e for e in race.get("events", []) if e.get("event") in _REPLAYED]
+    if not events:
+        for car in race.get("cars", []):
+            name, t = car.get("name", ""), 0
+            for i, lap in enumerate(car.get("laps", [])):
+                t = lap.get("timestamp_ms") or t + lap["time_ms"]
+                if i == 0:
+                    events.append({"event": EventType.START.value, "car_id": car["id"],
+                                   "car": name, "timestamp_ms": t - lap["time_ms"],
+                                   "source": ""})
+                events.append({"event": EventType.LAP.value, "car_id": car["id"],
+                               "car": name, "timestamp_ms": t, "lap": lap["lap"],
+                               "time_ms": lap["time_ms"],
+                               "sectors_ms": lap.get("sectors_ms", []), "source": ""})
+        events.sort(key=lambda e: e["timestamp_ms"])
+    return events
+
+
+class ReplaySource(QObject):
+    """Feeds a saved race back through the live timing path.
+
+    Events are emitted as crossings at their original race time, so the
+    receiver runs them through ``RaceManager.process_crossing`` /
+    ``process_sector`` exactly like a detector would. Pacing follows
+    ``clock`` (injectable, see ``models.clock``) scaled by
+    ``speed``; ``SPEED_MAX`` replays as fast as the receiver keeps up.
+
+    The ``RaceManager`` passed in is the one the receiver updates: the race's
+    cars are registered on it and a snapshot is kept every
+    ``CHECKPOINT_EVERY`` events, so ``seek`` restores the nearest one and
+    only processes the events after it. Checkpoints taken while playing
+    assume the receiver handles each signal before the next one is emitted
+    (direct connection, same thread).
+    """
+
+    crossing = Signal(int, str, float)           # car_id, source, perf_counter time
+    gate_crossing = Signal(int, int, str, float)  # gate, car_id, source, time
+    position_changed = Signal(int)               # events replayed so far
+    seeked = Signal(int)                         # state rebuilt up to this event
+    finished = Signal()
+
+    def __init__(self, race: dict, manager: RaceManager, speed: float = 1.0,
+                 clock: Clock = SYSTEM_CLOCK,
+                 colors: dict[str, tuple] | None = None, parent=None):
+        super().__init__(parent)
+        self.race_id = race.get("id", "")
+        self.events = replay_events(race)
+        # Pacing: event i is due once race time reaches the latest timestamp so far
+        self._ts = list(accumulate((e["timestamp_ms"] for e in self.events), max))
+        self._manager = manager
+        self._clock = clock
+        self._speed = speed
+        self._index = 0
+        self._anchor_ms = 0        # race time at _anchor_clock
+        self._anchor_clock = 0.0
+        self._timer = QTimer(self)
+        self._timer.timeout.connect(self.step)
+
+        colors = colors or {}
+        for car in race.get("cars", []):
+            name = car.get("name", "")
+            manager.register_car(car["id"], name, UNSAMPLED_HSV_LOWER, UNSAMPLED_HSV_UPPER,
+                                 colors.get(name, (255, 255, 255)))
+        gates = max((e.get("sector", 0) for e in self.events
+                     if e["event"] == EventType.SECTOR.value), default=0)
+        manager.set_sector_gates(gates)
+        manager.reset()
+        self._checkpoints = {0: manager.snapshot()}
+
+    # ── Position ──
+
+    def __len__(self):
+        return len(self.events)
+
+    @property
+    def index(self) -> int:
+        """Number of events already replayed."""
+        return self._index
+
+    @property
+    def running(self) -> bool:
+        return self._timer.isActive()
+
+    @property
+    def speed(self) -> float:
+        return self._speed
+
+    @property
+    def duration_ms(self) -> int:
+        return self._ts[-1] if self._ts else 0
+
+    def lap_events(self, index: int) -> list[LapEvent]:
+        """LAP events among the first ``index``, to redraw the lap history after a seek."""
+        return [LapEvent.from_dict(e) for e in self.events[:index]
+                if e["event"] == EventType.LAP.value]
+
+    def race_time_ms(self) -> int:
+        """Race time the replay is at."""
+        if not self.running or self._speed == SPEED_MAX:
+            return self._anchor_ms
+        return self._anchor_ms + int((self._clock() - self._anchor_clock) * 1000 * self._speed)
+
+    # ── Control ──
+
+    def start(self):
+        if self._index >= len(self.events):
+            return
+        self._anchor(self._anchor_ms)
+        self._timer.start(TICK_MS)
+
+    def pause(self):
+        self._anchor_ms = self.race_time_ms()
+        self._timer.stop()
+
+    def set_speed(self, speed: float):
+        now = self.race_time_ms()
+        self._speed = speed
+        self._anchor(now)
+
+    def seek(self, index: int):
+        """Rebuild the race state as it was after ``index`` events.
+
+        Restores the nearest checkpoint at or before ``index`` and processes
+        the events in between directly on the manager (nothing is emitted);
+        ``seeked`` then tells the receiver to redraw from the manager.
+        """
+        index = min(max(index, 0), len(self.events))
+        base = (index // CHECKPOINT_EVERY) * CHECKPOINT_EVERY
+        while base not in self._checkpoints:
+            base -= CHECKPOINT_EVERY
+        self._manager.load_snapshot(self._checkpoints[base])
+        for i in range(base, index):
+            self._apply(i)
+            self._checkpoint(i + 1)
+        self._index = index
+        self._anchor(self._ts[index - 1] if index else 0)
+        self.seeked.emit(index)
+        self.position_changed.emit(index)
+
+    def seek_ms(self, race_ms: int):
+        """Seek to the first event after race time ``race_ms``."""
+        self.seek(bisect_right(self._ts, race_ms))
+
+    def step(self):
+        """Emit every event due by now (one batch at max speed)."""
+        n = len(self.events)
+        first = self._index
+        if self._speed == SPEED_MAX:
+            deadline = self._clock() + MAX_BATCH_S
+            while self._index < n and self._clock() < deadline:
+                self._emit_next()
+            if self._index:
+                self._anchor(self._ts[self._index - 1])
+        else:
+            due = bisect_right(self._ts, self.race_time_ms())
+            while self._index < min(due, n):
+                self._emit_next()
+
+        if self._index != first:
+            self.position_changed.emit(self._index)
+        if self._index >= n:
+            self._timer.stop()
+            self.finished.emit()
+
+    # ── Internals ──
+
+    def _anchor(self, race_ms: int):
+        self._anchor_ms = race_ms
+        self._anchor_clock = self._clock()
+
+    def _at(self, e: dict) -> float:
+        return self._manager.start_time + e["timestamp_ms"] / 1000
+
+    def _emit_next(self):
+        e = self.events[self._index]
+        if e["event"] == EventType.SECTOR.value:
+            self.gate_crossing.emit(e["sector"], e["car_id"], e.get("source", ""), self._at(e))
+        else:
+            self.crossing.emit(e["car_id"], e.get("source", ""), self._at(e))
+        self._index += 1
+        self._checkpoint(self._index)
+
+    def _apply(self, i: int):
+        e = self.events[i]
+        if e["event"] == EventType.SECTOR.value:
+            self._manager.process_sector(e["sector"], e["car_id"], e.get("source", ""),
+                                         self._at(e))
+        else:
+            self._manager.process_crossing(e["car_id"], e.get("source", ""), self._at(e))
+
+    def _checkpoint(self, index: int):
+        if index % CHECKPOINT_EVERY == 0 and index not in self._checkpoints:
+            self._checkpoints[index] = self._manager.snapshot()
+
@@ -0,0 +1,175 @@
+"""Qt-free timing engine: readers -> event bus -> timing thread -> race log.
+
+What the GUI does around a race, without widgets: used by ``perlap.headless``
+on a mini-PC with no screen. The camera reader (and OpenCV) is only imported
+when the camera is used.
+"""
+from functools import partial
+from typing import Callable, Optional
+
+from .config import Config
+from .detection.arduino import ArduinoReader
+from .detection.gates import GateReader, FINISH_GATE
+from .detection.multicam import MultiCameraReader
+from .models.car import CarColor, UNSAMPLED_HSV_LOWER, UNSAMPLED_HSV_UPPER
+from .models.event_bus import (EventBus, DetectionSink, SOURCE_CAMERA, SOURCE_ARDUINO,
+                               SOURCE_FUSION, SOURCE_GATES)
+from .models.race import RaceManager, MAX_CARS
+from .models.race_log import RaceLog
+from .models.time_trial import TimeTrial
+from .models.timing_thread import TimingThread, TimingBatch
+
+SOURCE_NONE = "NONE"  # no local readers: crossings only from timing nodes (net.nodes)
+SOURCES = (SOURCE_CAMERA, SOURCE_ARDUINO, SOURCE_FUSION, SOURCE_GATES, SOURCE_NONE)
+
+
+def config_cars(config: Config) -> list[tuple[int, CarColor]]:
+    """(slot, car) registered in the GUI; a single "AUTO" car if there are none."""
+    cars = list(config.cars)
+    if not cars:
+        # A single laser timing one car: nothing registered in the GUI
+        cars.append((0, CarColor("AUTO", UNSAMPLED_HSV_LOWER, UNSAMPLED_HSV_UPPER,
+                                 (255, 255, 255), active=True)))
+    return cars
+
+
+def build_readers(config: Config, source: str, sink: DetectionSink,
+                  cars: list[tuple[int, CarColor]], port: str = "",
+                  on_message: Callable[[str], None] = print) -> list:
+    """Readers for ``source``, configured from ``config`` and reporting to ``sink``."""
+    if source not in SOURCES:
+        raise ValueError(f"Fuente desconocida: {source}")
+    readers = []
+    if source in (SOURCE_CAMERA, SOURCE_FUSION):
+        if config.cameras:
+            readers.append(_multicam_reader(config, sink, cars, on_message))
+        else:
+            readers.append(_camera_reader(config, sink, cars, on_message))
+    if source in (SOURCE_ARDUINO, SOURCE_FUSION):
+        readers.append(_arduino_reader(config, sink, cars, port, on_message))
+    if source == SOURCE_GATES:
+        readers.append(_gate_reader(config, sink, on_message))
+    return readers
+
+
+def _camera_reader(config: Config, sink: DetectionSink, cars, on_message):
+    from .detection.camera import CameraReader
+    from .detection.color_id import ColorCalibrator
+
+    if config.sensitivity:
+        ColorCalibrator.set_sensitivity(config.sensitivity)
+    reader = CameraReader(config.camera_index)
+    if config.min_pixel_count is not None:
+        reader.min_pixel_count = config.min_pixel_count
+    if config.finish_line is not None:
+        reader.set_finish_line(config.finish_line)
+    else:
+        on_message("Sin linea de meta en la configuracion: la camara no detectara")
+    reader.set_cars(cars)
+    reader.crossing_detected.connect(partial(sink.crossing, SOURCE_CAMERA))
+    return reader
+
+
+def _multicam_reader(config: Config, sink: DetectionSink, cars, on_message):
+    reader = MultiCameraReader(config.cameras)
+    if config.min_pixel_count is not None:
+        reader.min_pixel_count = config.min_pixel_count
+    for spec in config.cameras:
+        if spec.finish_line is None:
+            on_message(f"{spec.label}: sin linea en la configuracion, no detectara")
+    reader.set_cars(cars)
+    reader.crossing_detected.connect(partial(sink.crossing, SOURCE_CAMERA))
+    reader.gate_crossing.connect(partial(sink.gate_crossing, SOURCE_CAMERA))
+    reader.device_changed.connect(
+        lambda cam, ok: on_message(f"{config.cameras[cam].label} "
+                                   f"{'abierta' if ok else 'no se pudo abrir'}"))
+    return reader
+
+
+def _arduino_reader(config: Config, sink: DetectionSink, cars, port: str, on_message):
+    reader = ArduinoReader()
+    reader.port = port or config.arduino_port or ArduinoReader.find_arduino() or ""
+    if config.arduino_threshold is not None:
+        reader.set_threshold(config.arduino_threshold)
+    reader.set_streaming(True)
+    reader.set_cars([(i, c.name) for i, c in cars])
+    reader.crossing_detected.connect(partial(sink.crossing, SOURCE_ARDUINO))
+    reader.device_start.connect(partial(sink.device_start, SOURCE_ARDUINO))
+    reader.device_lap.connect(partial(sink.device_lap, SOURCE_ARDUINO))
+    reader.connection_changed.connect(
+        lambda ok: on_message(f"Arduino {'conectado' if ok else 'desconectado'} ({reader.port})"))
+    reader.port_reassigned.connect(lambda p: on_message(f"Arduino en {p}"))
+    reader.error_occurred.connect(lambda msg: on_message(f"Arduino: {msg}"))
+    return reader
+
+
+def _gate_reader(config: Config, sink: DetectionSink, on_message):
+    reader = GateReader()
+    reader.set_gates(config.gates)
+    reader.gate_crossing.connect(partial(sink.gate_crossing, SOURCE_GATES))
+    reader.gate_connection.connect(
+        lambda gate, ok: on_message(
+            f"Puerta {'Meta' if gate == FINISH_GATE else f'S{gate}'} "
+            f"{'conectada' if ok else 'desconectada'}"))
+    reader.error_occurred.connect(on_message)
+    return reader
+
+
+class TimingEngine:
+    """Race timing from the settings saved by the GUI (``config.json``).
+
+    Readers report on their own threads straight onto the bus; results are
+    collected with ``take`` at whatever rate the caller likes. Messages
+    (connection state, reader errors) go to ``on_message``. Detections from
+    remote timing nodes can be put on ``bus`` too (``net.nodes.NodeServer``).
+    """
+
+    def __init__(self, config: Config, source: Optional[str] = None, port: str = "",
+                 on_message: Callable[[str], None] = print):
+        self.source = source or config.detection_source
+        self.on_message = on_message
+        self.race = RaceManager(MAX_CARS)
+        self.race_log = RaceLog()
+        self.bus = EventBus()
+        self.timing = TimingThread(self.race, TimeTrial(), self.race_log, self.bus)
+        self.timing.fusion = self.source == SOURCE_FUSION
+        self.timing.fuser.window_ms = config.fusion_window_ms
+
+        for slot, car in config_cars(config):
+            self.race.register_car(slot, car.name, car.hsv_lower, car.hsv_upper,
+                                   car.display_color)
+        self.readers = build_readers(config, self.source, self.bus,
+                                     self.race.get_active_cars(), port, on_message)
+        for reader in self.readers:
+            if isinstance(reader, (GateReader, MultiCameraReader)):
+                self.race.set_sector_gates(reader.sector_gate_count)
+
+    def _cars(self) -> list[tuple[int, CarColor]]:
+        return self.race.get_active_cars()
+
+    # ── Race ──
+
+    def start(self, resume: Optional[str] = None):
+        """Start timing and logging a new race, or continue the race log ``resume``."""
+        if resume:
+            events = self.race_log.resume(resume)
+            self.race.restore(events, RaceLog.elapsed_ms(resume))
+        else:
+            self.race.reset()
+            self.race_log.start_race({i: c.name for i, c in self._cars()})
+        self.timing.start()
+        for reader in self.readers:
+            reader.start()
+
+    def take(self) -> Optional[TimingBatch]:
+        return self.timing.take()
+
+    def stop(self) -> Optional[str]:
+        """Stop the readers, process what they queued and save the race; returns its file."""
+        for reader in self.readers:
+            reader.stop()
+        self.timing.stop()
+        return self.race_log.end_race()
+
+    def standings(self) -> list[dict]:
+        return self.timing.standings()
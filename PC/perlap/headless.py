@@ -0,0 +1,218 @@
+"""PerLap without a window: time races and log them, for a mini-PC with no screen.
+
+Uses the settings saved by the GUI (cars, finish line, ports, gates); the
+race is saved in races/ like one run from the GUI and can be replayed or
+exported there.
+
+    python -m perlap.headless                          # source from config.json
+    python -m perlap.headless --source arduino --port /dev/ttyUSB0
+    python -m perlap.headless --duration 600 --quiet
+    python -m perlap.headless --resume                 # continue a race cut by a power loss
+    python -m perlap.headless --live 8765              # scoreboards: ws://host:8765/ws
+    python -m perlap.headless --trace traza.json       # per-stage timing, for chrome://tracing
+
+Several machines on one track: the central one times the race with the
+crossings of its timing nodes, which only run their camera/laser:
+
+    python -m perlap.headless --nodes --source ninguna     # central, port 8770
+    python -m perlap.headless --node central-pc --source camera --node-id meta
+"""
+import argparse
+import signal
+import threading
+import time
+
+from .config import CONFIG_PATH, Config, load_config
+from .detection.multicam import MultiCameraReader, format_camera_stats
+from .engine import TimingEngine, SOURCES, SOURCE_NONE, build_readers, config_cars
+from .models.race_log import RaceLog
+from .net.live_server import LiveServer
+from .net.nodes import NodeServer, TimingNode, DEFAULT_NODE_PORT, parse_address
+from .profiler import profiler, format_summary
+from .timefmt import format_event, format_time
+
+REFRESH_S = 0.2
+STANDINGS_EVERY_S = 10.0
+SOURCE_CHOICES = {s.lower(): s for s in SOURCES if s != SOURCE_NONE} | {"ninguna": SOURCE_NONE}
+
+
+def print_standings(standings: list[dict]):
+    for pos, s in enumerate(standings, 1):
+        if s["started"]:
+            print(f"  {pos:>2}. {s['name']:<12} {s['laps']:>4} vueltas  "
+                  f"mejor {format_time(s['best_ms']):>8}  ultima {format_time(s['last_ms']):>8}")
+
+
+def run_until_stopped(duration: float, tick, report=None):
+    """Call ``tick`` every ``REFRESH_S`` (and ``report`` every ``STANDINGS_EVERY_S``)
+    until Ctrl+C, SIGTERM or ``duration`` seconds (0 = no limit)."""
+    done = threading.Event()
+    signal.signal(signal.SIGTERM, lambda *_: done.set())
+    deadline = time.monotonic() + duration if duration else None
+    next_report = time.monotonic() + STANDINGS_EVERY_S
+    try:
+        while not done.wait(REFRESH_S):
+            tick()
+            now = time.monotonic()
+            if report is not None and now >= next_report:
+                report()
+                next_report = now + STANDINGS_EVERY_S
+            if deadline is not None and now >= deadline:
+                break
+    except KeyboardInterrupt:
+        pass
+
+
+def save_trace(path: str, readers: list):
+    for line in format_summary(profiler.summary(), "  "):
+        print(line)
+    for reader in readers:
+        if isinstance(reader, MultiCameraReader):
+            # Measured in the camera processes: summary only, no spans in the trace
+            for spec, stats in zip(reader.cameras, reader.stats):
+                for line in format_summary(stats.get("stages", []), f"  {spec.label}: "):
+                    print(line)
+    try:
+        spans = profiler.export_chrome_trace(path)
+    except OSError as e:
+        print(f"No se pudo guardar la traza: {e}")
+        return
+    print(f"Traza guardada: {path} ({spans} mediciones)")
+
+
+def run_node(args, config: Config) -> int:
+    """Timing node: local readers, crossings sent to the central machine."""
+    host, port = parse_address(args.node)
+    source = SOURCE_CHOICES[args.source] if args.source else config.detection_source
+    node = TimingNode(host, port, args.node_id)
+    node.connection_changed.connect(
+        lambda ok: print(f"Servidor {host}:{port} {'conectado' if ok else 'desconectado'}"))
+    node.error_occurred.connect(print)
+    readers = build_readers(config, source, node, config_cars(config), args.port)
+    node.start()
+    for reader in readers:
+        reader.start()
+    print(f"Nodo {node.node_id}: fuente {source}, enviando a {host}:{port}")
+
+    def report():
+        print(f"  desfase de reloj {node.sync.offset * 1000:+.3f} ms "
+              f"(ida y vuelta {node.sync.delay * 1000:.2f} ms), sin confirmar {node.backlog}")
+
+    run_until_stopped(args.duration, lambda: None, None if args.quiet else report)
+    for reader in readers:
+        reader.stop()
+    node.stop()
+    if node.backlog:
+        print(f"{node.backlog} cruces no llegaron al servidor")
+    if args.trace:
+        save_trace(args.trace, readers)
+    return 0
+
+
+def main(argv=None):
+    t0 = time.perf_counter()
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--config", default=CONFIG_PATH)
+    parser.add_argument("--source", choices=list(SOURCE_CHOICES),
+                        help="fuente de deteccion (por defecto la guardada en la configuracion)")
+    parser.add_argument("--port", default="", help="puerto del Arduino")
+    parser.add_argument("--duration", type=float, default=0,
+                        help="terminar la carrera a los N segundos (por defecto con Ctrl+C)")
+    parser.add_argument("--resume", action="store_true",
+                        help="continuar la ultima carrera sin terminar en vez de guardarla")
+    parser.add_argument("--quiet", action="store_true", help="no mostrar cada vuelta")
+    parser.add_argument("--live", type=int, default=None, metavar="PUERTO",
+                        help="transmitir en vivo (WebSocket/SSE) en este puerto, 0 = no")
+    parser.add_argument("--multicast", default=None, metavar="GRUPO:PUERTO",
+                        help="ademas, cada mensaje por UDP multicast")
+    parser.add_argument("--nodes", type=int, nargs="?", const=DEFAULT_NODE_PORT, default=None,
+                        metavar="PUERTO", help="recibir cruces de nodos de cronometraje")
+    parser.add_argument("--node", metavar="EQUIPO[:PUERTO]",
+                        help="ser un nodo: enviar los cruces a este equipo en vez de cronometrar")
+    parser.add_argument("--node-id", default=None,
+                        help="nombre del nodo (por defecto el del equipo)")
+    parser.add_argument("--trace", metavar="ARCHIVO",
+                        help="al terminar, guardar el tiempo de cada etapa (Chrome trace JSON)")
+    args = parser.parse_args(argv)
+
+    config = load_config(args.config)
+    if args.node:
+        return run_node(args, config)
+
+    # Unfinished races (crash, power cut): the latest can be continued
+    incomplete = RaceLog.find_incomplete()
+    resume = incomplete.pop() if args.resume and incomplete else None
+    for path in incomplete:
+        print(f"Carrera recuperada: {RaceLog.finalize(path)}")
+
+    engine = TimingEngine(config, SOURCE_CHOICES[args.source] if args.source else None,
+                          args.port)
+    live = None
+    live_port = config.live_port if args.live is None else args.live
+    if live_port:
+        multicast = config.live_multicast if args.multicast is None else args.multicast
+        try:
+            live = LiveServer(port=live_port, multicast=multicast)
+            live.start()
+        except (OSError, ValueError) as e:
+            print(f"No se pudo abrir el puerto {live_port}: {e}")
+            live = None
+        else:
+            print(f"En vivo: ws://<este equipo>:{live.port}/ws y "
+                  f"http://<este equipo>:{live.port}/events")
+    nodes = None
+    node_port = config.node_port if args.nodes is None else args.nodes
+    if node_port:
+        nodes = NodeServer(engine.bus, port=node_port)
+        nodes.node_connection.connect(
+            lambda n, ok: print(f"Nodo {n} {'conectado' if ok else 'desconectado'}"))
+        try:
+            nodes.start()
+        except OSError as e:
+            print(f"No se pudo abrir el puerto {node_port}: {e}")
+            nodes = None
+        else:
+            print(f"Nodos de cronometraje: puerto {nodes.port}")
+    engine.start(resume)
+    if live is not None:
+        live.reset(engine.standings())
+    cars = ", ".join(c.name for _, c in engine.race.get_active_cars())
+    print(f"PerLap sin interfaz: fuente {engine.source}, autos {cars} "
+          f"({'reanudada' if resume else 'carrera iniciada'}; "
+          f"listo en {(time.perf_counter() - t0) * 1000:.0f} ms)")
+
+    def tick():
+        batch = engine.take()
+        if batch is None:
+            return
+        if live is not None:
+            live.publish(batch.race_events, batch.standings)
+        if not args.quiet:
+            for event in batch.race_events:
+                print(format_event(event))
+
+    def report():
+        print_standings(engine.standings())
+        for reader in engine.readers:
+            if isinstance(reader, MultiCameraReader):
+                for spec, stats in zip(reader.cameras, reader.stats):
+                    print(f"  {format_camera_stats(spec, stats)}")
+
+    run_until_stopped(args.duration, tick, None if args.quiet else report)
+
+    if nodes is not None:
+        nodes.stop()
+    path = engine.stop()
+    tick()  # laps the timing thread processed while stopping
+    if live is not None:
+        live.stop()
+    print_standings(engine.race.get_standings())
+    if path:
+        print(f"Carrera guardada: {path}")
+    if args.trace:
+        save_trace(args.trace, engine.readers)
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -2,6 +2,11 @@ from dataclasses import dataclass, field
 
 import numpy as np
 
+# HSV range that cv2.inRange never matches (lower > upper): cars registered
+# on timing hardware without a camera color sample
+UNSAMPLED_HSV_LOWER = np.array([180, 255, 255])
+UNSAMPLED_HSV_UPPER = np.array([0, 0, 0])
+
 
 @dataclass
 class CarColor:
@@ -11,6 +16,10 @@ class CarColor:
     display_color: tuple = (255, 255, 255)  # BGR for UI
     active: bool = False
 
+    @property
+    def sampled(self) -> bool:
+        return bool((self.hsv_lower <= self.hsv_upper).all())
+
     def to_dict(self) -> dict:
         return {
             "name": self.name,
@@ -30,18 +39,3 @@ class CarColor:
             active=d["active"],
         )
 
-
-@dataclass
-class CarState:
-    last_lap_time_ms: int = 0
-    lap_count: int = 0
-    started: bool = False
-    best_lap_ms: int = 999999
-    lap_times: list = field(default_factory=list)
-
-    def reset(self):
-        self.last_lap_time_ms = 0
-        self.lap_count = 0
-        self.started = False
-        self.best_lap_ms = 999999
-        self.lap_times.clear()
@@ -0,0 +1,29 @@
+"""Time source of the timing models.
+
+A clock is any callable returning monotonic seconds. Live timing uses
+``time.perf_counter`` (the same clock the detection sources stamp their
+crossings with); simulations and tests use ``ManualClock`` so races run as
+fast as the CPU allows and give the same result every time.
+"""
+import time
+from typing import Callable
+
+Clock = Callable[[], float]
+
+SYSTEM_CLOCK: Clock = time.perf_counter
+
+
+class ManualClock:
+    """Clock that only moves when told to."""
+
+    def __init__(self, start: float = 0.0):
+        self.t = start
+
+    def __call__(self) -> float:
+        return self.t
+
+    def set(self, t: float):
+        self.t = t
+
+    def advance(self, seconds: float):
+        self.t += seconds
@@ -0,0 +1,95 @@
+import threading
+from collections import deque
+from dataclasses import dataclass
+from typing import Optional
+
+# Detection sources, as stamped on the events they produce
+SOURCE_CAMERA = "CAMERA"
+SOURCE_ARDUINO = "ARDUINO"
+SOURCE_FUSION = "FUSION"  # laser for timing, camera for identity
+SOURCE_GATES = "GATES"    # one laser gate per port: finish + sector splits
+
+# Detection kinds
+CROSSING = "CROSSING"            # finish line
+SECTOR = "SECTOR"                # intermediate gate ``gate``
+DEVICE_START = "DEVICE_START"    # LapTimer v2: START decided on the device
+DEVICE_LAP = "DEVICE_LAP"        # LapTimer v2: lap timed on the device
+
+
+@dataclass(slots=True)
+class Detection:
+    kind: str
+    source: str
+    car_id: int                  # -1 if the source cannot identify the car
+    t: float                     # clock time stamped by the source
+    meta: Optional[dict] = None
+    gate: int = 0
+    lap_time_ms: int = 0
+
+
+class DetectionSink:
+    """Where readers report: producer helpers shaped like the reader hooks.
+
+    Subclasses implement ``put``, which must be safe from any thread and
+    never block (the local ``EventBus``, or ``net.nodes.TimingNode`` sending
+    to a central race server).
+    """
+
+    def put(self, detection: Detection):
+        raise NotImplementedError
+
+    def crossing(self, source: str, car_id: int, t: float, meta: Optional[dict] = None):
+        self.put(Detection(CROSSING, source, car_id, t, meta))
+
+    def gate_crossing(self, source: str, gate: int, car_id: int, t: float):
+        """Timing gate ``gate``; gate 0 is the finish line."""
+        self.put(Detection(SECTOR if gate else CROSSING, source, car_id, t, gate=gate))
+
+    def device_start(self, source: str, car_id: int, t: float):
+        self.put(Detection(DEVICE_START, source, car_id, t))
+
+    def device_lap(self, source: str, car_id: int, lap_time_ms: int, t: float):
+        self.put(Detection(DEVICE_LAP, source, car_id, t, lap_time_ms=lap_time_ms))
+
+
+class EventBus(DetectionSink):
+    """Queue of detections from every source to the timing thread.
+
+    ``put`` is safe from any thread and never blocks: readers call it from
+    their own threads (their hooks are connected to the helpers of
+    ``DetectionSink``), and deque append/popleft are atomic, so producers
+    never wait on each other or on the consumer. A single consumer ``wait``s
+    and then ``drain``s.
+    """
+
+    def __init__(self):
+        self._queue: deque[Detection] = deque()
+        self._wake = threading.Event()
+
+    def __len__(self):
+        return len(self._queue)
+
+    def put(self, detection: Detection):
+        self._queue.append(detection)
+        self._wake.set()
+
+    # ── Consumer ──
+
+    def wait(self, timeout: float) -> bool:
+        """Block until something was put (or ``wake``) or ``timeout`` seconds pass."""
+        woken = self._wake.wait(timeout)
+        self._wake.clear()
+        return woken
+
+    def wake(self):
+        self._wake.set()
+
+    def drain(self) -> list[Detection]:
+        """Everything queued so far, oldest first."""
+        items = []
+        pop = self._queue.popleft
+        try:
+            while True:
+                items.append(pop())
+        except IndexError:
+            return items
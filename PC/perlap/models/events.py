@@ -1,14 +1,16 @@
 from enum import Enum
-from dataclasses import dataclass
+from dataclasses import dataclass, field
 
 
 class EventType(Enum):
     READY = "READY"
     START = "START"
     LAP = "LAP"
+    SECTOR = "SECTOR"        # intermediate gate: lap_time_ms is the split
     RESET = "RESET"
     STATUS = "STATUS"
     ERROR = "ERROR"
+    UNMATCHED = "UNMATCHED"  # fusion audit: laser cut or camera detection left unpaired
 
 
 @dataclass
@@ -21,9 +23,16 @@ class LapEvent:
     lap_time_ms: int = 0
     best_lap_ms: int = 0
     source: str = "CAMERA"
+    sector: int = 0                                    # SECTOR: gate index (1-based)
+    sectors_ms: list = field(default_factory=list)     # LAP: splits when all gates seen
+    gap_to_leader_ms: int = 0   # LAP: behind the first car to complete this lap number
+    interval_ms: int = 0        # LAP: behind the car that completed it just before
+    position: int = 0           # LAP: classification after this lap
+    position_changes: list = field(default_factory=list)  # LAP: [PositionChange]
+    meta: dict = field(default_factory=dict)  # detection details (frame, pixels, ldr...)
 
     def to_dict(self) -> dict:
-        return {
+        d = {
             "event": self.event.value,
             "timestamp_ms": self.timestamp_ms,
             "car": self.car_name,
@@ -32,4 +41,31 @@ class LapEvent:
             "time_ms": self.lap_time_ms,
             "best_ms": self.best_lap_ms,
             "source": self.source,
+            "sector": self.sector,
+            "sectors_ms": list(self.sectors_ms),
+            "gap_to_leader_ms": self.gap_to_leader_ms,
+            "interval_ms": self.interval_ms,
+            "position": self.position,
         }
+        if self.meta:
+            d["meta"] = dict(self.meta)
+        return d
+
+    @staticmethod
+    def from_dict(d: dict) -> "LapEvent":
+        return LapEvent(
+            event=EventType(d["event"]),
+            timestamp_ms=d.get("timestamp_ms", 0),
+            car_id=d.get("car_id", -1),
+            car_name=d.get("car", ""),
+            lap_number=d.get("lap", 0),
+            lap_time_ms=d.get("time_ms", 0),
+            best_lap_ms=d.get("best_ms", 0),
+            source=d.get("source", ""),
+            sector=d.get("sector", 0),
+            sectors_ms=list(d.get("sectors_ms", [])),
+            gap_to_leader_ms=d.get("gap_to_leader_ms", 0),
+            interval_ms=d.get("interval_ms", 0),
+            position=d.get("position", 0),
+            meta=dict(d.get("meta", {})),
+        )
@@ -1,26 +1,64 @@
-import time
 from typing import Optional
 
-from .car import CarColor, CarState
+import numpy as np
+
+from .car import CarColor
+from .clock import Clock, SYSTEM_CLOCK
 from .events import LapEvent, EventType
+from .standings import StandingsModel
 
-MAX_CARS = 6
+MAX_CARS = 40
 MIN_LAP_MS = 2000
+MIN_SECTOR_MS = 500
 
 
 class RaceManager:
+    """Race timing for up to ``max_cars`` slots.
+
+    Per-car timing state lives in preallocated NumPy arrays indexed by slot
+    (lap statistics in ``self.standings``); ``cars`` keeps the registration
+    (name, color) of each slot. Times come from ``clock`` (see ``models.clock``)
+    unless the caller passes the crossing time as ``at``.
+    """
+
+    def __init__(self, max_cars: int = MAX_CARS, clock: Clock = SYSTEM_CLOCK):
+        self.max_cars = max_cars
+        self.clock = clock
+        self.cars: list[CarColor] = [CarColor() for _ in range(max_cars)]
+        self._active = np.zeros(max_cars, dtype=bool)
+        self._started = np.zeros(max_cars, dtype=bool)
+        self._last_ms = np.zeros(max_cars, dtype=np.int64)       # last finish crossing
+        # Sector timing (intermediate gates): 0 = finish line is the next gate
+        self._next_sector = np.zeros(max_cars, dtype=np.int16)
+        self._sector_start_ms = np.zeros(max_cars, dtype=np.int64)
+        self._lap_sectors = np.zeros((max_cars, 0), dtype=np.int64)
+        self._start_time: float = clock()
+        self.sector_count = 1  # finish-to-finish only
+        # Indexed by lap_number - 1: first and latest crossing that completed it
+        self._lap_leader_ts: list[int] = []
+        self._lap_last_ts: list[int] = []
+        self.standings = StandingsModel(max_cars)
+
+    def set_sector_gates(self, count: int):
+        """Number of intermediate timing gates; the lap is split into count + 1 sectors."""
+        self.sector_count = max(0, count) + 1
+        self._lap_sectors = np.zeros((self.max_cars, self.sector_count - 1), dtype=np.int64)
+        self._reset_states()
 
-    def __init__(self):
-        self.cars: list[CarColor] = [CarColor() for _ in range(MAX_CARS)]
-        self.states: list[CarState] = [CarState() for _ in range(MAX_CARS)]
-        self._start_time: float = time.perf_counter()
+    @property
+    def start_time(self) -> float:
+        """Clock value of race time 0."""
+        return self._start_time
 
-    def _now_ms(self) -> int:
-        return int((time.perf_counter() - self._start_time) * 1000)
+    def _now_ms(self, at: Optional[float] = None) -> int:
+        # at: clock value captured by the source, if any. Rounded, not truncated:
+        # a time rebuilt from logged ms (replay, simulation) maps back to the same ms
+        t = self.clock() if at is None else at
+        return round((t - self._start_time) * 1000)
 
     def register_car(self, slot: int, name: str, hsv_lower, hsv_upper,
                      display_color: tuple) -> Optional[LapEvent]:
-        if not 0 <= slot < MAX_CARS:
+        if not 0 <= slot < self.max_cars:
             return None
         self.cars[slot] = CarColor(
             name=name,
@@ -29,56 +67,208 @@ class RaceManager:
             display_color=display_color,
             active=True,
         )
-        self.states[slot].reset()
+        self._active[slot] = True
+        self._started[slot] = False
+        self._last_ms[slot] = 0
+        self._next_sector[slot] = 0
+        self.standings.add_car(slot)
         return None
 
-    def process_crossing(self, car_id: int, source: str = "CAMERA") -> Optional[LapEvent]:
-        if not 0 <= car_id < MAX_CARS:
+    def lap_count(self, car_id: int) -> int:
+        return int(self.standings.laps[car_id])
+
+    def is_started(self, car_id: int) -> bool:
+        return bool(self._started[car_id])
+
+    def process_crossing(self, car_id: int, source: str = "CAMERA",
+                         at: Optional[float] = None,
+                         meta: Optional[dict] = None) -> Optional[LapEvent]:
+        """Finish line crossing detected at ``at`` (clock time stamped by the
+        source; now if None). ``meta`` is kept on the event for the log."""
+        if car_id < 0:
+            car_id = self._expected_car(0)
+        if car_id is None or not self._is_registered(car_id):
+            return None
+
+        now = self._now_ms(at)
+
+        if not self._started[car_id]:
+            event = self._start_car(car_id, now, source)
+        else:
+            elapsed = now - int(self._last_ms[car_id])
+            if elapsed < MIN_LAP_MS:
+                return None
+            event = self._complete_lap(car_id, now, elapsed, source)
+        if meta:
+            event.meta = meta
+        return event
+
+    def process_device_start(self, car_id: int, source: str = "ARDUINO",
+                             at: Optional[float] = None) -> Optional[LapEvent]:
+        """START reported by a timing device that keeps its own per-car state."""
+        if not self._is_registered(car_id):
             return None
-        if not self.cars[car_id].active:
+        if self._started[car_id]:
             return None
+        return self._start_car(car_id, self._now_ms(at), source)
 
-        car = self.cars[car_id]
-        cs = self.states[car_id]
-        now = self._now_ms()
-
-        if not cs.started:
-            cs.started = True
-            cs.last_lap_time_ms = now
-            cs.lap_count = 0
-            return LapEvent(
-                event=EventType.START,
-                timestamp_ms=now,
-                car_id=car_id,
-                car_name=car.name,
-                source=source,
-            )
-
-        elapsed = now - cs.last_lap_time_ms
-        if elapsed < MIN_LAP_MS:
+    def process_device_lap(self, car_id: int, lap_time_ms: int, source: str = "ARDUINO",
+                           at: Optional[float] = None) -> Optional[LapEvent]:
+        """LAP reported by a timing device: the device lap time is used as-is."""
+        if not self._is_registered(car_id):
             return None
 
-        cs.lap_count += 1
-        cs.last_lap_time_ms = now
-        cs.lap_times.append(elapsed)
-        if elapsed < cs.best_lap_ms:
-            cs.best_lap_ms = elapsed
+        if not self._started[car_id]:
+            # Device was already running when the race started: first lap seen
+            # here becomes this car's start
+            return self._start_car(car_id, self._now_ms(at), source)
+        if lap_time_ms <= 0:
+            return None
+
+        # Chain device lap times so gaps keep the device's precision
+        now = int(self._last_ms[car_id]) + lap_time_ms
+        return self._complete_lap(car_id, now, lap_time_ms, source)
+
+    def process_unmatched(self, car_id: int, source: str,
+                          at: Optional[float] = None) -> LapEvent:
+        """Audit record for a crossing that could not be paired/identified (car_id -1 if unknown)."""
+        name = self.cars[car_id].name if self._is_registered(car_id) else ""
+        return LapEvent(
+            event=EventType.UNMATCHED,
+            timestamp_ms=self._now_ms(at),
+            car_id=car_id,
+            car_name=name,
+            source=source,
+        )
+
+    def process_sector(self, gate: int, car_id: int = -1, source: str = "GATE",
+                       at: Optional[float] = None) -> Optional[LapEvent]:
+        """Crossing at intermediate gate ``gate`` (1-based).
+
+        Gates without car identification (car_id -1) credit the car expected
+        there next that left its previous gate first (passing order).
+        """
+        if not 1 <= gate < self.sector_count:
+            return None
+        if car_id < 0:
+            car_id = self._expected_car(gate)
+        if car_id is None or not self._is_registered(car_id):
+            return None
+
+        if not self._started[car_id] or self._next_sector[car_id] != gate:
+            return None  # not on track yet, or an earlier gate was missed this lap
+        now = self._now_ms(at)
+        split = now - int(self._sector_start_ms[car_id])
+        if split < MIN_SECTOR_MS:
+            return None
+
+        self._lap_sectors[car_id, gate - 1] = split
+        self._sector_start_ms[car_id] = now
+        self._next_sector[car_id] = (gate + 1) % self.sector_count
+        best = self.standings.add_sector(car_id, gate - 1, split)
+
+        return LapEvent(
+            event=EventType.SECTOR,
+            timestamp_ms=now,
+            car_id=car_id,
+            car_name=self.cars[car_id].name,
+            lap_number=self.lap_count(car_id) + 1,
+            lap_time_ms=split,
+            best_lap_ms=best,
+            source=source,
+            sector=gate,
+        )
+
+    def _expected_car(self, gate: int) -> Optional[int]:
+        active = np.flatnonzero(self._active)
+        if len(active) == 1:
+            return int(active[0])
+        if gate == 0:
+            # Still on the grid: they take the line in slot order before anyone laps
+            grid = np.flatnonzero(self._active & ~self._started)
+            if len(grid):
+                return int(grid[0])
+        waiting = np.flatnonzero(self._active & self._started & (self._next_sector == gate))
+        if not len(waiting):
+            return None
+        return int(waiting[np.argmin(self._sector_start_ms[waiting])])
+
+    def _is_registered(self, car_id: int) -> bool:
+        return 0 <= car_id < self.max_cars and bool(self._active[car_id])
+
+    def _start_car(self, car_id: int, now: int, source: str) -> LapEvent:
+        self._started[car_id] = True
+        self._last_ms[car_id] = now
+        self._sector_start_ms[car_id] = now
+        self._next_sector[car_id] = 1 % self.sector_count
+        self.standings.start(car_id)
+        return LapEvent(
+            event=EventType.START,
+            timestamp_ms=now,
+            car_id=car_id,
+            car_name=self.cars[car_id].name,
+            source=source,
+        )
+
+    def _complete_lap(self, car_id: int, now: int, elapsed: int, source: str) -> LapEvent:
+        self._last_ms[car_id] = now
+
+        sectors = []
+        if self.sector_count > 1 and self._next_sector[car_id] == 0:
+            # Every intermediate gate seen this lap: last sector ends here
+            last = now - int(self._sector_start_ms[car_id])
+            self.standings.add_sector(car_id, self.sector_count - 1, last)
+            sectors = self._lap_sectors[car_id].tolist() + [last]
+        self._sector_start_ms[car_id] = now
+        self._next_sector[car_id] = 1 % self.sector_count
+
+        changes = self.standings.add_lap(car_id, elapsed)
+        lap = self.lap_count(car_id)
+        gap, interval = self._update_lap_order(lap, now)
 
         return LapEvent(
             event=EventType.LAP,
             timestamp_ms=now,
             car_id=car_id,
-            car_name=car.name,
-            lap_number=cs.lap_count,
+            car_name=self.cars[car_id].name,
+            lap_number=lap,
             lap_time_ms=elapsed,
-            best_lap_ms=cs.best_lap_ms,
+            best_lap_ms=int(self.standings.best_ms[car_id]),
             source=source,
+            sectors_ms=sectors,
+            gap_to_leader_ms=gap,
+            interval_ms=interval,
+            position=self.standings.position(car_id),
+            position_changes=changes,
         )
 
+    def _update_lap_order(self, lap: int, now: int) -> tuple[int, int]:
+        """Gap to leader and interval to the car ahead for a lap completed at ``now``."""
+        idx = lap - 1
+        if idx >= len(self._lap_leader_ts):
+            # First car to complete this lap: leads it
+            while len(self._lap_leader_ts) <= idx:
+                self._lap_leader_ts.append(now)
+                self._lap_last_ts.append(now)
+            return 0, 0
+        gap = now - self._lap_leader_ts[idx]
+        interval = now - self._lap_last_ts[idx]
+        self._lap_last_ts[idx] = now
+        return gap, interval
+
+    def _reset_states(self):
+        self._started.fill(False)
+        self._last_ms.fill(0)
+        self._next_sector.fill(0)
+        self._sector_start_ms.fill(0)
+        self._lap_sectors.fill(0)
+        self._lap_leader_ts.clear()
+        self._lap_last_ts.clear()
+        self.standings.reset(np.flatnonzero(self._active).tolist())
+
     def reset(self) -> LapEvent:
-        for s in self.states:
-            s.reset()
-        self._start_time = time.perf_counter()
+        self._reset_states()
+        self._start_time = self.clock()
         return LapEvent(
             event=EventType.RESET,
             timestamp_ms=0,
@@ -86,27 +276,78 @@ class RaceManager:
             car_name="",
         )
 
-    def get_standings(self) -> list[dict]:
-        standings = []
-        for i in range(MAX_CARS):
-            if not self.cars[i].active:
+    def restore(self, events: list[dict], now_ms: int):
+        """Rebuild car states from logged events (crash recovery).
+
+        ``now_ms`` is the current race time, so laps in progress keep counting
+        from their logged start.
+        """
+        self.reset()
+        self._start_time = self.clock() - now_ms / 1000
+        for e in events:
+            car_id = e.get("car_id", -1)
+            if not self._is_registered(car_id):
                 continue
-            cs = self.states[i]
-            avg = 0
-            if cs.lap_times:
-                avg = sum(cs.lap_times) // len(cs.lap_times)
-            standings.append({
-                "id": i,
-                "name": self.cars[i].name,
-                "laps": cs.lap_count,
-                "best_ms": cs.best_lap_ms if cs.best_lap_ms < 999999 else 0,
-                "last_ms": cs.lap_times[-1] if cs.lap_times else 0,
-                "avg_ms": avg,
-                "started": cs.started,
-                "color": self.cars[i].display_color,
-            })
-        standings.sort(key=lambda x: (-x["laps"], x["best_ms"]))
-        return standings
+            if e["event"] == EventType.START.value:
+                self._start_car(car_id, e["timestamp_ms"], e.get("source", ""))
+            elif e["event"] == EventType.LAP.value and self._started[car_id]:
+                self._complete_lap(car_id, e["timestamp_ms"], e["time_ms"], e.get("source", ""))
+
+    def snapshot(self) -> dict:
+        """Timing state after the events processed so far (see ``load_snapshot``)."""
+        return {
+            "arrays": [arr.copy() for arr in self._timing_arrays()],
+            "lap_leader_ts": list(self._lap_leader_ts),
+            "lap_last_ts": list(self._lap_last_ts),
+            "standings": self.standings.snapshot(),
+        }
+
+    def load_snapshot(self, snap: dict):
+        """Go back (or forward) to a ``snapshot`` taken on this race.
+
+        Registrations and sector gates must not have changed in between.
+        """
+        for arr, saved in zip(self._timing_arrays(), snap["arrays"]):
+            arr[:] = saved
+        self._lap_leader_ts = list(snap["lap_leader_ts"])
+        self._lap_last_ts = list(snap["lap_last_ts"])
+        self.standings.load_snapshot(snap["standings"])
+
+    def _timing_arrays(self) -> tuple:
+        return (self._started, self._last_ms, self._next_sector, self._sector_start_ms,
+                self._lap_sectors)
+
+    def get_standings(self) -> list[dict]:
+        st = self.standings
+        order = st.order
+        if not order:
+            return []
+        idx = np.asarray(order)
+        # Whole-field statistics in one vectorized pass, then one dict per car
+        cols = zip(
+            idx.tolist(),
+            st.laps[idx].tolist(),
+            st.best_ms[idx].tolist(),
+            st.last_ms[idx].tolist(),
+            st.avg_ms()[idx].tolist(),
+            st.stddev_ms()[idx].tolist(),
+            st.last_n_avg_ms()[idx].tolist(),
+            st.theoretical_best_ms()[idx].tolist(),
+            st.started[idx].tolist(),
+        )
+        return [{
+            "id": i,
+            "name": self.cars[i].name,
+            "laps": laps,
+            "best_ms": best,
+            "last_ms": last,
+            "avg_ms": avg,
+            "stddev_ms": sd,
+            "last_n_avg_ms": last_n,
+            "theoretical_best_ms": theo,
+            "started": started,
+            "color": self.cars[i].display_color,
+        } for i, laps, best, last, avg, sd, last_n, theo, started in cols]
 
     def get_active_cars(self) -> list[tuple[int, CarColor]]:
-        return [(i, c) for i, c in enumerate(self.cars) if c.active]
+        return [(int(i), self.cars[i]) for i in np.flatnonzero(self._active)]
@@ -1,111 +1,221 @@
 import json
 import os
+import time
 from datetime import datetime
-from typing import Optional
+from typing import Iterator, Optional
 
-from .events import LapEvent, EventType
+from .events import LapEvent
+from ..archive import columnar
 
 RACES_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))), "races")
 
+WAL_EXT = ".jsonl"       # write-ahead log while the race runs
+FSYNC_INTERVAL_S = 1.0   # max time an event can sit in the OS cache
+FSYNC_BATCH = 50         # ...or this many events, whichever comes first
+
+
+class LogReader:
+    """An open race log: ``header``, then iterate for the logged records.
+
+    Use as a context manager; the file stays open until ``close``, however
+    far the records were read.
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        self._f = open(path, "r", encoding="utf-8")
+        try:
+            self.header: dict = json.loads(self._f.readline())
+        except json.JSONDecodeError:
+            self._f.close()
+            raise ValueError(f"Registro de carrera invalido: {path}")
+
+    def __iter__(self) -> Iterator[dict]:
+        for line in self._f:
+            try:
+                yield json.loads(line)
+            except json.JSONDecodeError:
+                return  # torn last line after a power cut
+
+    def close(self):
+        self._f.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
 
 class RaceLog:
+    """Race recorder backed by an append-only JSONL write-ahead log.
+
+    Each event is written (and flushed to the OS) as it happens; fsync is
+    batched. ``end_race`` builds ``races/<id>.plr`` by streaming over the log
+    and then removes it, so a log left in ``races/`` is a race that never
+    finished: see ``find_incomplete`` / ``resume`` / ``finalize``.
+    """
 
     def __init__(self):
         self._active = False
         self._race_id: str = ""
         self._start_time: str = ""
-        self._events: list[dict] = []
-        self._car_laps: dict[int, list[dict]] = {}
         self._car_names: dict[int, str] = {}
-        self._last_crossing_ms: dict[int, int] = {}
+        self._wal = None
+        self._unsynced = 0
+        self._last_sync = 0.0
 
     @property
     def active(self) -> bool:
         return self._active
 
+    @property
+    def wal_path(self) -> str:
+        return os.path.join(RACES_DIR, f"{self._race_id}{WAL_EXT}")
+
     def start_race(self, car_names: dict[int, str]):
         now = datetime.now()
         self._race_id = now.strftime("%Y-%m-%d_%H-%M-%S")
         self._start_time = now.isoformat()
-        self._events = []
-        self._car_laps = {}
         self._car_names = dict(car_names)
-        self._last_crossing_ms = {}
-        self._active = True
 
-        for car_id in car_names:
-            self._car_laps[car_id] = []
+        os.makedirs(RACES_DIR, exist_ok=True)
+        self._wal = open(self.wal_path, "a", encoding="utf-8")
+        self._append({
+            "race": self._race_id,
+            "date": self._start_time,
+            "t0": time.time(),
+            "cars": {str(k): v for k, v in self._car_names.items()},
+        })
+        self.sync()
+        self._active = True
 
     def record_event(self, event: LapEvent):
         if not self._active:
             return
 
-        self._events.append(event.to_dict())
-
-        if event.event == EventType.LAP:
-            leader_ts = self._find_leader_timestamp(event.lap_number)
-            gap = event.timestamp_ms - leader_ts if leader_ts > 0 else 0
-
-            self._car_laps.setdefault(event.car_id, []).append({
-                "lap": event.lap_number,
-                "time_ms": event.lap_time_ms,
-                "timestamp_ms": event.timestamp_ms,
-                "gap_to_leader_ms": gap,
-            })
-            self._last_crossing_ms[event.car_id] = event.timestamp_ms
-
-    def _find_leader_timestamp(self, lap_number: int) -> int:
-        earliest = 0
-        for car_id, laps in self._car_laps.items():
-            for lap in laps:
-                if lap["lap"] == lap_number:
-                    if earliest == 0 or lap["timestamp_ms"] < earliest:
-                        earliest = lap["timestamp_ms"]
-                    break
-        return earliest
+        self._append(event.to_dict())
+        if (self._unsynced >= FSYNC_BATCH
+                or time.monotonic() - self._last_sync >= FSYNC_INTERVAL_S):
+            self.sync()
+
+    def sync(self):
+        """Force logged events to disk (call periodically while idle)."""
+        if self._wal is None or self._unsynced == 0:
+            return
+        self._wal.flush()
+        os.fsync(self._wal.fileno())
+        self._unsynced = 0
+        self._last_sync = time.monotonic()
+
+    def _append(self, record: dict):
+        # One line per record, flushed so a crash of the app loses nothing
+        self._wal.write(json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n")
+        self._wal.flush()
+        self._unsynced += 1
 
     def end_race(self) -> Optional[str]:
         if not self._active:
             return None
         self._active = False
+        self._append({"end": True})
+        self.sync()
+        self._wal.close()
+        self._wal = None
+        return self.finalize(self.wal_path)
 
-        last_event_ms = max((e["timestamp_ms"] for e in self._events), default=0)
-
-        cars_data = []
-        for car_id, laps in self._car_laps.items():
-            times = [l["time_ms"] for l in laps]
-            cars_data.append({
-                "id": car_id,
-                "name": self._car_names.get(car_id, f"Auto {car_id}"),
-                "laps": laps,
-                "total_laps": len(laps),
-                "best_lap_ms": min(times) if times else 0,
-                "avg_lap_ms": sum(times) // len(times) if times else 0,
-            })
-
-        race_data = {
-            "id": self._race_id,
-            "date": self._start_time,
-            "duration_ms": last_event_ms,
-            "cars": cars_data,
-            "events": self._events,
-        }
+    # ── Write-ahead log reading / crash recovery ──
 
-        os.makedirs(RACES_DIR, exist_ok=True)
-        path = os.path.join(RACES_DIR, f"{self._race_id}.json")
-        with open(path, "w", encoding="utf-8") as f:
-            json.dump(race_data, f, indent=2, ensure_ascii=False)
+    @staticmethod
+    def read_log(path: str) -> LogReader:
+        """The race log at ``path``, opened for reading (``with RaceLog.read_log(p) as log``)."""
+        return LogReader(path)
+
+    @staticmethod
+    def read_header(path: str) -> dict:
+        with LogReader(path) as log:
+            return log.header
+
+    @staticmethod
+    def find_incomplete() -> list[str]:
+        """Race logs left behind by a crash (no summary JSON written)."""
+        if not os.path.isdir(RACES_DIR):
+            return []
+        paths = []
+        for name in sorted(os.listdir(RACES_DIR)):
+            if name.endswith(WAL_EXT):
+                paths.append(os.path.join(RACES_DIR, name))
+        return paths
+
+    def resume(self, path: str) -> list[dict]:
+        """Continue recording into an interrupted race log.
+
+        Returns the logged events so ``RaceManager.restore`` can rebuild the
+        car states from them.
+        """
+        with self.read_log(path) as log:
+            header = log.header
+            events = [r for r in log if "event" in r]
+        self._race_id = header["race"]
+        self._start_time = header["date"]
+        self._car_names = {int(k): v for k, v in header.get("cars", {}).items()}
+
+        self._truncate_torn_tail(path)
+        self._wal = open(path, "a", encoding="utf-8")
+        self._append({"resumed": time.time()})
+        self.sync()
+        self._active = True
+        return events
+
+    @staticmethod
+    def elapsed_ms(path: str) -> int:
+        """Race time now for a logged race (wall clock since its start)."""
+        header = RaceLog.read_header(path)
+        return int((time.time() - header.get("t0", time.time())) * 1000)
 
-        return path
+    @staticmethod
+    def _truncate_torn_tail(path: str):
+        with open(path, "rb+") as f:
+            data = f.read()
+            end = data.rfind(b"\n") + 1
+            if end < len(data):
+                f.truncate(end)
+
+    @staticmethod
+    def finalize(path: str) -> str:
+        """Write the race file (columnar ``.plr``) from a race log and remove the log.
+
+        The log is streamed once into columns; the summary JSON is still
+        available as an export (``python -m perlap.archive export``).
+        """
+        from ..archive.catalog import index_race_quietly
+
+        with RaceLog.read_log(path) as log:
+            header = log.header
+            names = {int(k): v for k, v in header.get("cars", {}).items()}
+            builder = columnar.ColumnBuilder()
+            for r in log:
+                if "event" in r:
+                    builder.append(r)
+
+        out = os.path.join(os.path.dirname(path), f"{header['race']}{columnar.RACE_EXT}")
+        columnar.write_race(out, header["race"], header["date"], names,
+                            builder.arrays(), builder.sources)
+        os.remove(path)
+
+        with columnar.RaceFile(out) as race:
+            index_race_quietly(race.to_summary(with_events=False), out)
+        return out
 
     @staticmethod
     def load_race(path: str) -> dict:
-        with open(path, "r", encoding="utf-8") as f:
-            return json.load(f)
+        """Race summary from a ``.plr`` race file or an exported/legacy JSON."""
+        return columnar.load_summary(path)
 
     @staticmethod
     def list_races() -> list[str]:
+        """Saved race files, newest first (through the archive catalog)."""
+        from ..archive.catalog import browse_races
+
         os.makedirs(RACES_DIR, exist_ok=True)
-        files = [f for f in os.listdir(RACES_DIR) if f.endswith(".json")]
-        files.sort(reverse=True)
-        return [os.path.join(RACES_DIR, f) for f in files]
+        return [r["path"] for r in browse_races(RACES_DIR)]
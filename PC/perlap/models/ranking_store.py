@@ -0,0 +1,257 @@
+import json
+import os
+import sqlite3
+import threading
+from bisect import bisect_left, insort
+from concurrent.futures import Future, ThreadPoolExecutor
+from datetime import datetime
+from typing import Optional
+
+BASE_DIR = os.path.dirname(os.path.dirname(os.path.dirname(__file__)))
+RANKING_DB_PATH = os.path.join(BASE_DIR, "ranking.sqlite3")
+LEGACY_RANKING_PATH = os.path.join(BASE_DIR, "ranking.json")
+
+DEFAULT_TRACK = ""
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS runs (
+    id           INTEGER PRIMARY KEY AUTOINCREMENT,
+    laps         INTEGER NOT NULL,
+    track        TEXT NOT NULL,
+    player       TEXT NOT NULL,
+    total_ms     INTEGER NOT NULL,
+    best_lap_ms  INTEGER NOT NULL,
+    lap_times_ms TEXT NOT NULL,
+    date         TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS runs_rank ON runs(laps, track, total_ms, id);
+CREATE INDEX IF NOT EXISTS runs_player ON runs(laps, track, player, total_ms);
+
+CREATE TABLE IF NOT EXISTS personal_bests (
+    laps     INTEGER NOT NULL,
+    track    TEXT NOT NULL,
+    player   TEXT NOT NULL,
+    run_id   INTEGER NOT NULL,
+    total_ms INTEGER NOT NULL,
+    PRIMARY KEY (laps, track, player)
+);
+"""
+
+Partition = tuple[int, str]  # (lap count, track config)
+
+
+def _contains(index: list, key: tuple) -> bool:
+    i = bisect_left(index, key)
+    return i < len(index) and index[i] == key
+
+
+class RankingStore:
+    """Time-trial ranking in SQLite, partitioned by lap count and track.
+
+    Each partition also has an in-memory index sorted by (total_ms, id), so
+    top-K and rank-of-entry are O(log n) lookups. Writes run on a single
+    worker thread (``submit``/``delete``/``clear`` return Futures); each is
+    one SQLite transaction, so the file is never left half-written. Reads can
+    come from any thread, each with its own connection.
+    """
+
+    def __init__(self, path: str = RANKING_DB_PATH,
+                 legacy_json: Optional[str] = LEGACY_RANKING_PATH):
+        self.path = path
+        self._local = threading.local()
+        self._conns: list[sqlite3.Connection] = []
+        self._lock = threading.RLock()
+        self._index: dict[Partition, list[tuple[int, int]]] = {}
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="RankingStore")
+
+        db = self._conn()
+        with db:
+            db.executescript(_SCHEMA)
+        if legacy_json and os.path.exists(legacy_json):
+            self._import_legacy(legacy_json)
+
+    def close(self):
+        self._writer.shutdown(wait=True)
+        with self._lock:
+            for conn in self._conns:
+                conn.close()
+            self._conns.clear()
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, check_same_thread=False)
+            conn.row_factory = sqlite3.Row
+            conn.execute("PRAGMA journal_mode=WAL")
+            self._local.conn = conn
+            with self._lock:
+                self._conns.append(conn)
+        return conn
+
+    # ── Writes (worker thread) ──
+
+    def submit(self, entry: dict) -> Future:
+        """Store a run; the Future resolves to the entry with ``id``, ``position``
+        and ``personal_best`` (True if it improves the player's best)."""
+        return self._writer.submit(self._insert, dict(entry))
+
+    def delete(self, run_id: int) -> Future:
+        return self._writer.submit(self._delete, run_id)
+
+    def clear(self, laps: int, track: str = DEFAULT_TRACK) -> Future:
+        return self._writer.submit(self._clear, laps, track)
+
+    def _insert(self, entry: dict) -> dict:
+        db = self._conn()
+        part = (int(entry["laps"]), entry.get("track", DEFAULT_TRACK))
+        entry.setdefault("date", datetime.now().isoformat())
+        with db:
+            cur = db.execute(
+                "INSERT INTO runs (laps, track, player, total_ms, best_lap_ms, "
+                "lap_times_ms, date) VALUES (?, ?, ?, ?, ?, ?, ?)",
+                (part[0], part[1], entry["player"], entry["total_ms"],
+                 entry.get("best_lap_ms", 0), json.dumps(entry.get("lap_times_ms", [])),
+                 entry["date"]),
+            )
+            run_id = cur.lastrowid
+            pb = db.execute(
+                "SELECT total_ms FROM personal_bests WHERE laps = ? AND track = ? "
+                "AND player = ?", (part[0], part[1], entry["player"])).fetchone()
+            is_pb = pb is None or entry["total_ms"] < pb["total_ms"]
+            if is_pb:
+                db.execute("INSERT OR REPLACE INTO personal_bests VALUES (?, ?, ?, ?, ?)",
+                           (part[0], part[1], entry["player"], run_id, entry["total_ms"]))
+
+        key = (entry["total_ms"], run_id)
+        with self._lock:
+            index = self._index.get(part)
+            # A reader may have loaded the index after the commit, row included
+            if index is not None and not _contains(index, key):
+                insort(index, key)
+        entry.update(id=run_id, track=part[1], personal_best=is_pb,
+                     position=self._rank(part, key))
+        return entry
+
+    def _delete(self, run_id: int):
+        db = self._conn()
+        row = db.execute("SELECT laps, track, player, total_ms FROM runs WHERE id = ?",
+                         (run_id,)).fetchone()
+        if row is None:
+            return
+        part = (row["laps"], row["track"])
+        with db:
+            db.execute("DELETE FROM runs WHERE id = ?", (run_id,))
+            self._refresh_personal_best(db, part, row["player"])
+        with self._lock:
+            index = self._index.get(part)
+            key = (row["total_ms"], run_id)
+            if index is not None and _contains(index, key):
+                del index[bisect_left(index, key)]
+
+    def _clear(self, laps: int, track: str):
+        db = self._conn()
+        with db:
+            db.execute("DELETE FROM runs WHERE laps = ? AND track = ?", (laps, track))
+            db.execute("DELETE FROM personal_bests WHERE laps = ? AND track = ?",
+                       (laps, track))
+        with self._lock:
+            self._index.pop((laps, track), None)
+
+    @staticmethod
+    def _refresh_personal_best(db: sqlite3.Connection, part: Partition, player: str):
+        best = db.execute(
+            "SELECT id, total_ms FROM runs WHERE laps = ? AND track = ? AND player = ? "
+            "ORDER BY total_ms, id LIMIT 1", (part[0], part[1], player)).fetchone()
+        if best is None:
+            db.execute("DELETE FROM personal_bests WHERE laps = ? AND track = ? "
+                       "AND player = ?", (part[0], part[1], player))
+        else:
+            db.execute("INSERT OR REPLACE INTO personal_bests VALUES (?, ?, ?, ?, ?)",
+                       (part[0], part[1], player, best["id"], best["total_ms"]))
+
+    def _import_legacy(self, path: str):
+        """One-time import of the old ranking.json (renamed afterwards)."""
+        try:
+            with open(path, "r", encoding="utf-8") as f:
+                entries = json.load(f)
+        except (json.JSONDecodeError, OSError):
+            return
+        for e in entries:
+            if "player" in e and "total_ms" in e:
+                self._insert({**e, "laps": e.get("laps", len(e.get("lap_times_ms", [])))})
+        os.replace(path, path + ".migrated")
+
+    # ── Reads (any thread) ──
+
+    def _partition_index(self, part: Partition) -> list[tuple[int, int]]:
+        # Loaded under the lock so a concurrent write either sees the index
+        # (and updates it) or has already committed (and is in the query)
+        with self._lock:
+            index = self._index.get(part)
+            if index is None:
+                rows = self._conn().execute(
+                    "SELECT total_ms, id FROM runs WHERE laps = ? AND track = ? "
+                    "ORDER BY total_ms, id", part).fetchall()
+                index = self._index[part] = [(r[0], r[1]) for r in rows]
+        return index
+
+    def _rank(self, part: Partition, key: tuple[int, int]) -> int:
+        index = self._partition_index(part)
+        with self._lock:
+            return bisect_left(index, key) + 1
+
+    def count(self, laps: int, track: str = DEFAULT_TRACK) -> int:
+        index = self._partition_index((laps, track))
+        with self._lock:
+            return len(index)
+
+    def top(self, laps: int, track: str = DEFAULT_TRACK, k: int = 10,
+            offset: int = 0) -> list[dict]:
+        """Runs ranked offset+1 .. offset+k, each with its ``position``."""
+        index = self._partition_index((laps, track))
+        with self._lock:
+            ids = [run_id for _, run_id in index[offset:offset + k]]
+        rows = self._fetch(ids)
+        return [dict(rows[run_id], position=offset + i + 1)
+                for i, run_id in enumerate(ids) if run_id in rows]
+
+    def rank_of(self, run_id: int) -> int:
+        """1-based position of a run in its partition, 0 if it does not exist."""
+        row = self._conn().execute("SELECT laps, track, total_ms FROM runs WHERE id = ?",
+                                   (run_id,)).fetchone()
+        if row is None:
+            return 0
+        return self._rank((row["laps"], row["track"]), (row["total_ms"], run_id))
+
+    def personal_best(self, player: str, laps: int,
+                      track: str = DEFAULT_TRACK) -> Optional[dict]:
+        row = self._conn().execute(
+            "SELECT run_id FROM personal_bests WHERE laps = ? AND track = ? AND player = ?",
+            (laps, track, player)).fetchone()
+        if row is None:
+            return None
+        entry = self._fetch([row["run_id"]]).get(row["run_id"])
+        if entry:
+            entry["position"] = self.rank_of(entry["id"])
+        return entry
+
+    def partitions(self) -> list[Partition]:
+        return [(r[0], r[1]) for r in self._conn().execute(
+            "SELECT DISTINCT laps, track FROM runs ORDER BY laps, track")]
+
+    def tracks(self) -> list[str]:
+        return [r[0] for r in self._conn().execute(
+            "SELECT DISTINCT track FROM runs ORDER BY track")]
+
+    def _fetch(self, ids: list[int]) -> dict[int, dict]:
+        if not ids:
+            return {}
+        marks = ",".join("?" * len(ids))
+        rows = self._conn().execute(f"SELECT * FROM runs WHERE id IN ({marks})", ids)
+        out = {}
+        for r in rows:
+            d = dict(r)
+            d["lap_times_ms"] = json.loads(d["lap_times_ms"])
+            out[d["id"]] = d
+        return out
@@ -0,0 +1,189 @@
+from bisect import bisect_left, insort
+from dataclasses import dataclass
+
+import numpy as np
+
+LAST_N_LAPS = 5
+INITIAL_LAP_CAPACITY = 64  # lap matrix columns; doubled when a car fills them
+
+
+@dataclass(frozen=True)
+class PositionChange:
+    car_id: int
+    old: int  # 1-based position, 0 = not classified before
+    new: int
+
+
+class StandingsModel:
+    """Per-car running statistics in preallocated NumPy arrays plus the
+    classification kept in order.
+
+    Each lap updates one row in O(1) (running sums, Welford variance, last-N
+    window sum from the lap matrix). Statistics for the whole field are
+    computed vectorized on demand. Positions are held in a sorted key list
+    (laps desc, best lap asc) and only the car that completed a lap moves, so
+    each update returns the position changes it caused.
+    """
+
+    def __init__(self, capacity: int, last_n: int = LAST_N_LAPS):
+        self.capacity = capacity
+        self.last_n = last_n
+        self.started = np.zeros(capacity, dtype=bool)
+        self.laps = np.zeros(capacity, dtype=np.int32)
+        self.total_ms = np.zeros(capacity, dtype=np.int64)
+        self.best_ms = np.zeros(capacity, dtype=np.int64)   # 0 = no lap yet
+        self.last_ms = np.zeros(capacity, dtype=np.int64)
+        self._mean = np.zeros(capacity, dtype=np.float64)   # Welford
+        self._m2 = np.zeros(capacity, dtype=np.float64)
+        self._recent_sum = np.zeros(capacity, dtype=np.int64)
+        self._lap_ms = np.zeros((capacity, INITIAL_LAP_CAPACITY), dtype=np.int32)
+        self.best_sectors = np.zeros((capacity, 0), dtype=np.int64)  # 0 = not timed
+        self._keys: dict[int, tuple] = {}
+        self._order: list[tuple] = []  # sorted keys; key[-1] is the car id
+
+    def reset(self, car_ids=()):
+        self._keys.clear()
+        self._order.clear()
+        for arr in (self.started, self.laps, self.total_ms, self.best_ms, self.last_ms,
+                    self._mean, self._m2, self._recent_sum):
+            arr.fill(0)
+        self.best_sectors = np.zeros((self.capacity, 0), dtype=np.int64)
+        for car_id in car_ids:
+            self.add_car(car_id)
+
+    def add_car(self, car_id: int):
+        self.remove_car(car_id)
+        self._clear_row(car_id)
+        self._insert(car_id)
+
+    def remove_car(self, car_id: int):
+        if car_id in self._keys:
+            self._remove(car_id)
+
+    def start(self, car_id: int):
+        self.started[car_id] = True
+
+    def add_lap(self, car_id: int, lap_ms: int) -> list[PositionChange]:
+        if car_id not in self._keys:
+            return []
+        old = self._remove(car_id)
+
+        n = int(self.laps[car_id])
+        if n >= self._lap_ms.shape[1]:
+            self._lap_ms = np.concatenate([self._lap_ms, np.zeros_like(self._lap_ms)], axis=1)
+        self._lap_ms[car_id, n] = lap_ms
+        n += 1
+        self.laps[car_id] = n
+        self.started[car_id] = True
+        self.total_ms[car_id] += lap_ms
+        self.last_ms[car_id] = lap_ms
+        if self.best_ms[car_id] == 0 or lap_ms < self.best_ms[car_id]:
+            self.best_ms[car_id] = lap_ms
+
+        mean = self._mean[car_id]
+        delta = lap_ms - mean
+        mean += delta / n
+        self._mean[car_id] = mean
+        self._m2[car_id] += delta * (lap_ms - mean)
+
+        self._recent_sum[car_id] += lap_ms
+        if n > self.last_n:
+            self._recent_sum[car_id] -= self._lap_ms[car_id, n - 1 - self.last_n]
+
+        new = self._insert(car_id)
+        if new == old:
+            return []
+        # The car moved from old to new; everyone in between shifts by one
+        step = 1 if new < old else -1
+        changes = [PositionChange(car_id, old + 1, new + 1)]
+        for idx in range(new + step, old + step, step):
+            other = self._order[idx][-1]
+            changes.append(PositionChange(other, idx - step + 1, idx + 1))
+        return changes
+
+    def add_sector(self, car_id: int, idx: int, split_ms: int) -> int:
+        """Record a sector split (0-based sector index); returns that sector's best."""
+        if idx >= self.best_sectors.shape[1]:
+            grow = idx + 1 - self.best_sectors.shape[1]
+            self.best_sectors = np.pad(self.best_sectors, ((0, 0), (0, grow)))
+        best = self.best_sectors[car_id, idx]
+        if best == 0 or split_ms < best:
+            self.best_sectors[car_id, idx] = best = split_ms
+        return int(best)
+
+    def snapshot(self) -> dict:
+        """Copy of the running state, for ``load_snapshot``.
+
+        The lap matrix is append-only and is shared rather than copied, so a
+        snapshot can only be loaded back while replaying the same event
+        sequence it was taken from (replay seeking).
+        """
+        return {
+            "arrays": [arr.copy() for arr in self._state_arrays()],
+            "best_sectors": self.best_sectors.copy(),
+            "keys": dict(self._keys),
+            "order": list(self._order),
+        }
+
+    def load_snapshot(self, snap: dict):
+        for arr, saved in zip(self._state_arrays(), snap["arrays"]):
+            arr[:] = saved
+        self.best_sectors = snap["best_sectors"].copy()
+        self._keys = dict(snap["keys"])
+        self._order = list(snap["order"])
+
+    def _state_arrays(self) -> tuple:
+        return (self.started, self.laps, self.total_ms, self.best_ms, self.last_ms,
+                self._mean, self._m2, self._recent_sum)
+
+    def lap_times(self, car_id: int) -> np.ndarray:
+        return self._lap_ms[car_id, :self.laps[car_id]]
+
+    def position(self, car_id: int) -> int:
+        key = self._keys.get(car_id)
+        return bisect_left(self._order, key) + 1 if key is not None else 0
+
+    @property
+    def order(self) -> list[int]:
+        return [key[-1] for key in self._order]
+
+    # ── Vectorized statistics (one value per car slot) ──
+
+    def avg_ms(self) -> np.ndarray:
+        return np.where(self.laps > 0, self.total_ms // np.maximum(self.laps, 1), 0)
+
+    def stddev_ms(self) -> np.ndarray:
+        """Consistency: sample standard deviation of each car's lap times."""
+        var = np.where(self.laps > 1, self._m2 / np.maximum(self.laps - 1, 1), 0.0)
+        return np.sqrt(var).astype(np.int64)
+
+    def last_n_avg_ms(self) -> np.ndarray:
+        window = np.minimum(self.laps, self.last_n)
+        return np.where(window > 0, self._recent_sum // np.maximum(window, 1), 0)
+
+    def theoretical_best_ms(self) -> np.ndarray:
+        """Sum of best sectors; the best lap when not every sector was timed."""
+        if self.best_sectors.shape[1] == 0:
+            return self.best_ms.copy()
+        complete = (self.best_sectors > 0).all(axis=1)
+        return np.where(complete, self.best_sectors.sum(axis=1), self.best_ms)
+
+    def _clear_row(self, car_id: int):
+        for arr in (self.started, self.laps, self.total_ms, self.best_ms, self.last_ms,
+                    self._mean, self._m2, self._recent_sum, self.best_sectors):
+            arr[car_id] = 0
+
+    def _key(self, car_id: int) -> tuple:
+        return (-int(self.laps[car_id]), int(self.best_ms[car_id]), car_id)
+
+    def _insert(self, car_id: int) -> int:
+        key = self._key(car_id)
+        self._keys[car_id] = key
+        insort(self._order, key)
+        return bisect_left(self._order, key)
+
+    def _remove(self, car_id: int) -> int:
+        key = self._keys.pop(car_id)
+        idx = bisect_left(self._order, key)
+        del self._order[idx]
+        return idx
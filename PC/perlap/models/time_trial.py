@@ -1,15 +1,10 @@
-import json
-import os
-import time
+from concurrent.futures import Future
 from datetime import datetime
 from typing import Optional
 
+from .clock import Clock, SYSTEM_CLOCK
 from .events import LapEvent, EventType
-
-RANKING_PATH = os.path.join(
-    os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-    "ranking.json"
-)
+from .ranking_store import RankingStore, DEFAULT_TRACK
 
 DEFAULT_TOTAL_LAPS = 5
 MIN_LAP_MS = 2000
@@ -17,8 +12,13 @@ MIN_LAP_MS = 2000
 
 class TimeTrial:
 
-    def __init__(self, total_laps: int = DEFAULT_TOTAL_LAPS):
+    def __init__(self, total_laps: int = DEFAULT_TOTAL_LAPS,
+                 ranking: Optional[RankingStore] = None, track: str = DEFAULT_TRACK,
+                 clock: Clock = SYSTEM_CLOCK):
         self.total_laps = total_laps
+        self.clock = clock
+        self.ranking = ranking
+        self.track = track
         self._start_time: float = 0
         self._last_crossing_ms: int = 0
         self._lap_times: list[int] = []
@@ -50,38 +50,77 @@ class TimeTrial:
     def best_lap_ms(self) -> int:
         return self._best_lap_ms if self._best_lap_ms < 999999 else 0
 
-    def _now_ms(self) -> int:
-        return int((time.perf_counter() - self._start_time) * 1000)
+    def _now_ms(self, at: Optional[float] = None) -> int:
+        t = self.clock() if at is None else at
+        return round((t - self._start_time) * 1000)
 
     def reset(self):
-        self._start_time = time.perf_counter()
+        self._start_time = self.clock()
         self._last_crossing_ms = 0
         self._lap_times.clear()
         self._started = False
         self._finished = False
         self._best_lap_ms = 999999
 
-    def process_crossing(self, car_id: int = 0, source: str = "CAMERA") -> Optional[LapEvent]:
+    def process_crossing(self, car_id: int = 0, source: str = "CAMERA",
+                         at: Optional[float] = None,
+                         meta: Optional[dict] = None) -> Optional[LapEvent]:
         if self._finished:
             return None
 
-        now = self._now_ms()
+        now = self._now_ms(at)
+
+        if not self._started:
+            event = self._start(now, car_id, source)
+        else:
+            elapsed = now - self._last_crossing_ms
+            if elapsed < MIN_LAP_MS:
+                return None
+            event = self._complete_lap(now, elapsed, car_id, source)
+        if meta:
+            event.meta = meta
+        return event
+
+    def process_device_start(self, car_id: int = 0, source: str = "ARDUINO",
+                             at: Optional[float] = None) -> Optional[LapEvent]:
+        if self._finished or self._started:
+            return None
+        return self._start(self._now_ms(at), car_id, source)
 
+    def process_device_lap(self, lap_time_ms: int, car_id: int = 0, source: str = "ARDUINO",
+                           at: Optional[float] = None) -> Optional[LapEvent]:
+        if self._finished:
+            return None
         if not self._started:
-            self._started = True
-            self._last_crossing_ms = now
-            return LapEvent(
-                event=EventType.START,
-                timestamp_ms=now,
-                car_id=car_id,
-                car_name="",
-                source=source,
-            )
-
-        elapsed = now - self._last_crossing_ms
-        if elapsed < MIN_LAP_MS:
+            return self._start(self._now_ms(at), car_id, source)
+        if lap_time_ms <= 0:
             return None
+        now = self._last_crossing_ms + lap_time_ms
+        return self._complete_lap(now, lap_time_ms, car_id, source)
+
+    def process_unmatched(self, car_id: int, source: str,
+                          at: Optional[float] = None) -> LapEvent:
+        """Unpaired fusion crossing during the run: shown, never timed."""
+        return LapEvent(
+            event=EventType.UNMATCHED,
+            timestamp_ms=self._now_ms(at),
+            car_id=car_id,
+            car_name="",
+            source=source,
+        )
 
+    def _start(self, now: int, car_id: int, source: str) -> LapEvent:
+        self._started = True
+        self._last_crossing_ms = now
+        return LapEvent(
+            event=EventType.START,
+            timestamp_ms=now,
+            car_id=car_id,
+            car_name="",
+            source=source,
+        )
+
+    def _complete_lap(self, now: int, elapsed: int, car_id: int, source: str) -> LapEvent:
         self._lap_times.append(elapsed)
         self._last_crossing_ms = now
         if elapsed < self._best_lap_ms:
@@ -105,36 +144,17 @@ class TimeTrial:
 
     # --- Ranking ---
 
-    @staticmethod
-    def load_ranking() -> list[dict]:
-        if not os.path.exists(RANKING_PATH):
-            return []
-        try:
-            with open(RANKING_PATH, "r", encoding="utf-8") as f:
-                return json.load(f)
-        except (json.JSONDecodeError, OSError):
-            return []
-
-    @staticmethod
-    def save_ranking(ranking: list[dict]):
-        with open(RANKING_PATH, "w", encoding="utf-8") as f:
-            json.dump(ranking, f, indent=2, ensure_ascii=False)
-
-    def submit_to_ranking(self, player_name: str) -> dict:
-        entry = {
+    def submit_to_ranking(self, player_name: str) -> Future:
+        """Queue the run in the ranking store; the Future resolves to the saved
+        entry with its ``position``."""
+        if self.ranking is None:
+            self.ranking = RankingStore()
+        return self.ranking.submit({
             "player": player_name,
             "total_ms": self.total_time_ms,
             "laps": self.total_laps,
+            "track": self.track,
             "lap_times_ms": list(self._lap_times),
             "best_lap_ms": self.best_lap_ms,
             "date": datetime.now().isoformat(),
-        }
-
-        ranking = self.load_ranking()
-        ranking.append(entry)
-        ranking.sort(key=lambda x: x["total_ms"])
-        self.save_ranking(ranking)
-
-        position = next(i for i, r in enumerate(ranking) if r is entry) + 1
-        entry["position"] = position
-        return entry
+        })
@@ -0,0 +1,176 @@
+import threading
+import time
+from dataclasses import dataclass, field
+from typing import Optional
+
+from .event_bus import (EventBus, Detection, CROSSING, SECTOR, DEVICE_START, DEVICE_LAP,
+                        SOURCE_CAMERA, SOURCE_ARDUINO, SOURCE_FUSION)
+from .events import LapEvent
+from .race import RaceManager
+from .race_log import RaceLog
+from .time_trial import TimeTrial
+from ..detection.fusion import CrossingFuser, FUSED, LASER_ONLY
+from ..profiler import profiler
+
+FUSION_POLL_S = 0.02   # fusion decides pending laser cuts this often
+IDLE_WAKE_S = 0.5      # otherwise wake up at least this often (log fsync)
+
+_LATENCY = profiler.stage("timing.latency")           # source time stamp -> timing thread
+_CROSSING = profiler.stage("timing.process_crossing")
+
+
+@dataclass
+class TimingBatch:
+    """What the timing thread produced since the last ``take``."""
+
+    race_events: list[LapEvent] = field(default_factory=list)    # incl. UNMATCHED
+    trial_events: list[LapEvent] = field(default_factory=list)
+    standings: list[dict] = field(default_factory=list)          # after race_events
+    trial_total_ms: int = 0
+    trial_best_ms: int = 0
+    trial_finished: bool = False
+
+
+class TimingThread(threading.Thread):
+    """Model thread: processes the detections queued on ``bus`` in order.
+
+    Owns ``race``, ``time_trial``, ``race_log`` and the camera/laser
+    ``fuser``; any other thread must hold ``lock`` to touch them. The lock is
+    only ever held for timing work, never while painting. Results pile up
+    until the UI ``take``s them at its own refresh rate, so a burst of
+    crossings costs one UI update.
+    """
+
+    def __init__(self, race: RaceManager, time_trial: TimeTrial, race_log: RaceLog,
+                 bus: Optional[EventBus] = None, fuser: Optional[CrossingFuser] = None):
+        super().__init__(name="perlap-timing", daemon=True)
+        self.bus = bus if bus is not None else EventBus()
+        self.race = race
+        self.time_trial = time_trial
+        self.race_log = race_log
+        self.fuser = fuser if fuser is not None else CrossingFuser()
+        self.lock = threading.RLock()
+        # Plain flags set by the UI thread; read once per detection
+        self.time_trial_mode = False
+        self.fusion = False         # camera + laser detections go through the fuser
+        self.enabled = True         # False while a replay is on screen: detections dropped
+        self._pending = TimingBatch()
+        self._changed = False
+        self._stopping = threading.Event()
+
+    def stop(self):
+        self._stopping.set()
+        self.bus.wake()
+        if self.is_alive():
+            self.join()
+
+    def run(self):
+        while not self._stopping.is_set():
+            self.bus.wait(FUSION_POLL_S if self.fusion else IDLE_WAKE_S)
+            self._run_once()
+        self._run_once()  # whatever was queued before ``stop``
+
+    def _run_once(self):
+        detections = self.bus.drain()
+        if not self.enabled:
+            return
+        with self.lock:
+            now = time.perf_counter()
+            for d in detections:
+                _LATENCY.record(d.t, now - d.t)
+                self.process(d)
+            if self.fusion:
+                self._poll_fusion(time.perf_counter())
+            if not detections:
+                self.race_log.sync()
+
+    # ── Processing (timing thread, or any thread holding ``lock``) ──
+
+    def process(self, d: Detection):
+        if d.kind == CROSSING and self.fusion and d.source in (SOURCE_CAMERA, SOURCE_ARDUINO):
+            if d.source == SOURCE_CAMERA:
+                self.fuser.add_camera(d.car_id, d.t, d.meta)
+            else:
+                self.fuser.add_laser(d.t, d.meta)
+            return
+
+        if self.time_trial_mode:
+            tt = self.time_trial
+            if d.kind == CROSSING:
+                t0 = time.perf_counter()
+                self._trial_event(tt.process_crossing(d.car_id, d.source, d.t, d.meta))
+                _CROSSING.since(t0)
+            elif d.kind == DEVICE_START:
+                self._trial_event(tt.process_device_start(d.car_id, d.source, d.t))
+            elif d.kind == DEVICE_LAP:
+                self._trial_event(tt.process_device_lap(d.lap_time_ms, d.car_id, d.source, d.t))
+            return
+
+        race = self.race
+        if d.kind == CROSSING:
+            t0 = time.perf_counter()
+            self._race_event(race.process_crossing(d.car_id, d.source, d.t, d.meta))
+            _CROSSING.since(t0)
+        elif d.kind == SECTOR:
+            self._race_event(race.process_sector(d.gate, d.car_id, d.source, d.t))
+        elif d.kind == DEVICE_START:
+            self._race_event(race.process_device_start(d.car_id, d.source, d.t))
+        elif d.kind == DEVICE_LAP:
+            self._race_event(race.process_device_lap(d.car_id, d.lap_time_ms, d.source, d.t))
+
+    def _poll_fusion(self, now: float):
+        for res in self.fuser.poll(now):
+            if res.kind == FUSED:
+                self.process(Detection(CROSSING, SOURCE_FUSION, res.car_id, res.t, res.meta))
+                continue
+            source = "LASER" if res.kind == LASER_ONLY else SOURCE_CAMERA
+            # Audit records belong to the mode that was timing, like the FUSED ones
+            if self.time_trial_mode:
+                event = self.time_trial.process_unmatched(res.car_id, source, res.t)
+                event.meta = res.meta
+                self._trial_event(event)
+            else:
+                event = self.race.process_unmatched(res.car_id, source, res.t)
+                event.meta = res.meta
+                self._race_event(event)
+
+    def _race_event(self, event: Optional[LapEvent]):
+        if event is None:
+            return
+        if self.race_log.active:
+            self.race_log.record_event(event)
+        self._pending.race_events.append(event)
+        self._changed = True
+
+    def _trial_event(self, event: Optional[LapEvent]):
+        if event is None:
+            return
+        self._pending.trial_events.append(event)
+        self._changed = True
+
+    # ── UI side ──
+
+    def take(self) -> Optional[TimingBatch]:
+        """Results since the last call, with the standings they lead to (None if nothing new)."""
+        with self.lock:
+            if not self._changed:
+                return None
+            batch = self._pending
+            batch.standings = self.race.get_standings()
+            tt = self.time_trial
+            batch.trial_total_ms = tt.total_time_ms
+            batch.trial_best_ms = tt.best_lap_ms
+            batch.trial_finished = tt.finished
+            self._pending = TimingBatch()
+            self._changed = False
+        return batch
+
+    def discard(self):
+        """Drop results not taken yet (the UI is about to redraw from scratch)."""
+        with self.lock:
+            self._pending = TimingBatch()
+            self._changed = False
+
+    def standings(self) -> list[dict]:
+        with self.lock:
+            return self.race.get_standings()
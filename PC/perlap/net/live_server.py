@@ -0,0 +1,260 @@
+"""Live timing for scoreboards and stream overlays, on the local network.
+
+An asyncio server on its own thread publishes what the timing produces:
+
+    GET /ws        WebSocket (text frames)
+    GET /events    Server-Sent Events
+    GET /          the current snapshot, as plain JSON
+
+and, optionally, every message as one UDP multicast datagram for LAN
+displays that just listen. Every message is one JSON object:
+
+    {"type": "snapshot", "standings": [...], "events": [...]}  on connect
+    {"type": "event", "event": LapEvent.to_dict()}
+    {"type": "standings", "standings": [...]}                  after each batch
+    {"type": "reset", "standings": [...]}                      new race / counters reset
+
+Standard library only: the WebSocket side speaks just what a browser needs
+(no extensions, no fragmented client messages).
+"""
+import asyncio
+import base64
+import hashlib
+import json
+import socket
+import struct
+from collections import deque
+from typing import Optional
+
+from .server import AsyncServer
+
+DEFAULT_LIVE_PORT = 8765
+DEFAULT_MULTICAST = "239.255.42.99:8766"
+CLIENT_QUEUE_MAX = 256   # messages a client may fall behind before it is dropped
+RECENT_EVENTS = 50       # events replayed in the snapshot for late joiners
+KEEPALIVE_S = 15.0
+MAX_REQUEST_BYTES = 8192
+
+_WS_GUID = b"258EAFA5-E914-47DA-95CA-C5AB0DC11B65"
+_OP_TEXT, _OP_CLOSE, _OP_PING, _OP_PONG = 0x1, 0x8, 0x9, 0xA
+
+
+def parse_group(spec: str) -> tuple[str, int]:
+    """``"239.255.42.99:8766"`` -> ``("239.255.42.99", 8766)``."""
+    host, _, port = spec.rpartition(":")
+    return host, int(port)
+
+
+def _ws_frame(opcode: int, payload: bytes) -> bytes:
+    n = len(payload)
+    if n < 126:
+        header = struct.pack("!BB", 0x80 | opcode, n)
+    elif n < 1 << 16:
+        header = struct.pack("!BBH", 0x80 | opcode, 126, n)
+    else:
+        header = struct.pack("!BBQ", 0x80 | opcode, 127, n)
+    return header + payload
+
+
+async def _read_ws_frame(reader: asyncio.StreamReader) -> tuple[int, bytes]:
+    b0, b1 = await reader.readexactly(2)
+    n = b1 & 0x7F
+    if n == 126:
+        n = struct.unpack("!H", await reader.readexactly(2))[0]
+    elif n == 127:
+        n = struct.unpack("!Q", await reader.readexactly(8))[0]
+    mask = await reader.readexactly(4) if b1 & 0x80 else b""
+    payload = await reader.readexactly(n)
+    if mask:
+        payload = bytes(b ^ mask[i & 3] for i, b in enumerate(payload))
+    return b0 & 0x0F, payload
+
+
+class _Client:
+    __slots__ = ("writer", "queue", "task")
+
+    def __init__(self, writer: asyncio.StreamWriter):
+        self.writer = writer
+        self.queue: asyncio.Queue[bytes] = asyncio.Queue(CLIENT_QUEUE_MAX)
+        self.task: Optional[asyncio.Task] = None
+
+
+class LiveServer(AsyncServer):
+    """Publishes timing results to WebSocket/SSE clients and UDP multicast.
+
+    ``publish``/``reset`` are called from the thread that takes timing
+    batches and never block: messages are encoded there and handed to the
+    server loop, which queues them per client. A client whose queue fills
+    up (a stalled browser, a dead Wi-Fi link) is disconnected rather than
+    slowing anybody else down.
+    """
+
+    thread_name = "perlap-live"
+    stream_limit = MAX_REQUEST_BYTES
+
+    def __init__(self, host: str = "0.0.0.0", port: int = DEFAULT_LIVE_PORT,
+                 multicast: str = ""):
+        super().__init__(host, port)
+        self.multicast = parse_group(multicast) if multicast else None
+        self._clients: set[_Client] = set()
+        self._udp: Optional[socket.socket] = None
+        # Snapshot for late joiners; only touched on the server loop
+        self._standings = b"[]"
+        self._recent: deque[bytes] = deque(maxlen=RECENT_EVENTS)
+        self.dropped = 0  # clients disconnected for falling behind
+
+    @property
+    def client_count(self) -> int:
+        return len(self._clients)
+
+    def _setup(self):
+        if self.multicast:
+            self._udp = socket.socket(socket.AF_INET, socket.SOCK_DGRAM)
+            self._udp.setsockopt(socket.IPPROTO_IP, socket.IP_MULTICAST_TTL, 1)
+            self._udp.setblocking(False)
+
+    def _shutdown(self):
+        for client in list(self._clients):
+            self._drop(client)
+        if self._udp is not None:
+            self._udp.close()
+
+    # ── Publishing (any thread) ──
+
+    def publish(self, events, standings: list[dict]):
+        """Race events (``LapEvent``) and the standings they lead to."""
+        if not self.is_running:
+            return
+        encoded = [json.dumps(e.to_dict()).encode() for e in events]
+        self.call_soon(self._fanout, encoded, json.dumps(standings).encode(), False)
+
+    def reset(self, standings: list[dict]):
+        """A new race (or reset counters): late joiners no longer get the old laps."""
+        if self.is_running:
+            self.call_soon(self._fanout, [], json.dumps(standings).encode(), True)
+
+    def _fanout(self, events: list[bytes], standings: bytes, reset: bool):
+        if reset:
+            self._recent.clear()
+        self._recent.extend(events)
+        self._standings = standings
+        messages = [b'{"type": "event", "event": ' + e + b"}" for e in events]
+        kind = b"reset" if reset else b"standings"
+        messages.append(b'{"type": "' + kind + b'", "standings": ' + standings + b"}")
+        for client in list(self._clients):
+            try:
+                for msg in messages:
+                    client.queue.put_nowait(msg)
+            except asyncio.QueueFull:
+                self.dropped += 1
+                self._drop(client)
+        if self._udp is not None:
+            for msg in messages:
+                try:
+                    self._udp.sendto(msg, self.multicast)
+                except OSError:
+                    pass  # no route / buffer full: UDP displays just miss it
+
+    def _snapshot(self) -> bytes:
+        return (b'{"type": "snapshot", "standings": ' + self._standings
+                + b', "events": [' + b", ".join(self._recent) + b"]}")
+
+    # ── Connections (server loop) ──
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        try:
+            head = await reader.readuntil(b"\r\n\r\n")
+        except (asyncio.IncompleteReadError, asyncio.LimitOverrunError, ConnectionError):
+            writer.close()
+            return
+        lines = head.decode("latin-1").split("\r\n")
+        parts = lines[0].split(" ")
+        path = parts[1].split("?")[0] if len(parts) > 1 else "/"
+        headers = {}
+        for line in lines[1:]:
+            name, sep, value = line.partition(":")
+            if sep:
+                headers[name.strip().lower()] = value.strip()
+
+        if headers.get("upgrade", "").lower() == "websocket":
+            await self._websocket(reader, writer, headers.get("sec-websocket-key", ""))
+        elif path == "/events":
+            await self._sse(writer)
+        elif path == "/":
+            body = self._snapshot()
+            writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/json\r\n"
+                         b"Access-Control-Allow-Origin: *\r\n"
+                         b"Content-Length: " + str(len(body)).encode() +
+                         b"\r\nConnection: close\r\n\r\n" + body)
+            await self._close(writer)
+        else:
+            writer.write(b"HTTP/1.1 404 Not Found\r\nContent-Length: 0\r\n"
+                         b"Connection: close\r\n\r\n")
+            await self._close(writer)
+
+    async def _websocket(self, reader, writer, key: str):
+        accept = base64.b64encode(hashlib.sha1(key.encode() + _WS_GUID).digest())
+        writer.write(b"HTTP/1.1 101 Switching Protocols\r\nUpgrade: websocket\r\n"
+                     b"Connection: Upgrade\r\nSec-WebSocket-Accept: " + accept + b"\r\n\r\n")
+        client = self._add(writer)
+        sender = asyncio.create_task(
+            self._send_loop(client, lambda m: _ws_frame(_OP_TEXT, m),
+                            _ws_frame(_OP_PING, b"")))
+        client.task = sender
+        try:
+            # Only control frames are expected from a scoreboard
+            while not sender.done():
+                opcode, payload = await _read_ws_frame(reader)
+                if opcode == _OP_CLOSE:
+                    writer.write(_ws_frame(_OP_CLOSE, payload[:2]))
+                    break
+                if opcode == _OP_PING:
+                    writer.write(_ws_frame(_OP_PONG, payload))
+        except (asyncio.IncompleteReadError, ConnectionError, asyncio.CancelledError):
+            pass
+        self._drop(client)
+
+    async def _sse(self, writer):
+        writer.write(b"HTTP/1.1 200 OK\r\nContent-Type: text/event-stream\r\n"
+                     b"Cache-Control: no-cache\r\nAccess-Control-Allow-Origin: *\r\n"
+                     b"Connection: keep-alive\r\n\r\n")
+        client = self._add(writer)
+        client.task = asyncio.current_task()
+        await self._send_loop(client, lambda m: b"data: " + m + b"\n\n", b": ping\n\n")
+        self._drop(client)
+
+    def _add(self, writer) -> _Client:
+        client = _Client(writer)
+        client.queue.put_nowait(self._snapshot())
+        self._clients.add(client)
+        return client
+
+    async def _send_loop(self, client: _Client, encode, keepalive: bytes):
+        writer = client.writer
+        try:
+            while True:
+                try:
+                    msg = await asyncio.wait_for(client.queue.get(), KEEPALIVE_S)
+                except asyncio.TimeoutError:
+                    writer.write(keepalive)
+                else:
+                    writer.write(encode(msg))
+                await writer.drain()
+        except (ConnectionError, asyncio.CancelledError):
+            pass
+
+    def _drop(self, client: _Client):
+        if client not in self._clients:
+            return
+        self._clients.discard(client)
+        if client.task is not None and client.task is not asyncio.current_task():
+            client.task.cancel()
+        client.writer.transport.abort()
+
+    @staticmethod
+    async def _close(writer):
+        try:
+            await writer.drain()
+        except ConnectionError:
+            pass
+        writer.close()
@@ -0,0 +1,352 @@
+"""Distributed timing: detection nodes reporting to a central race server.
+
+A node (the camera PC at the finish line, a laser at the far end of the
+track) runs only the readers and sends their crossings over TCP; the
+central machine times the race as if they were its own sources: each
+detection is put on its ``EventBus``. Crossing times travel already on the
+server's clock: every node estimates the offset of its clock NTP-style and
+converts before sending.
+
+A node keeps what the server has not acknowledged and sends it again after
+reconnecting; detections are numbered per node run (``node``, ``boot``,
+``seq``) so the server drops the ones it already processed.
+
+One JSON object per line:
+
+    node -> server                              server -> node
+    {"type": "hello", "node", "boot"}           {"type": "welcome", "last_seq"}
+    {"type": "sync", "t0"}                      {"type": "sync", "t0", "t1", "t2"}
+    {"type": "status", "offset_ms", "delay_ms"}
+    {"type": "detection", "seq", "kind", ...}   {"type": "ack", "seq"}
+"""
+import asyncio
+import json
+import select
+import socket
+import threading
+import time
+import uuid
+from collections import deque
+from typing import Optional
+
+from ..detection.reader import Hook, Reader
+from ..models.clock import Clock, SYSTEM_CLOCK
+from ..models.event_bus import Detection, DetectionSink
+from .server import AsyncServer
+
+DEFAULT_NODE_PORT = 8770
+SYNC_ROUNDS = 8          # clock exchanges on connecting, before any detection is sent
+SYNC_INTERVAL_S = 5.0    # then one every so often, to follow the drift
+SYNC_WINDOW = 16         # offset of the fastest of the last N exchanges
+BUFFER_MAX = 10000       # detections kept while the server is unreachable
+POLL_S = 0.05            # node: acks are read at least this often
+IO_TIMEOUT_S = 3.0
+RECONNECT_MIN_S = 0.5
+RECONNECT_MAX_S = 5.0
+
+
+def _line(msg: dict) -> bytes:
+    return json.dumps(msg).encode() + b"\n"
+
+
+def parse_address(spec: str, default_port: int = DEFAULT_NODE_PORT) -> tuple[str, int]:
+    """``"host"`` or ``"host:port"``."""
+    host, sep, port = spec.rpartition(":")
+    return (host, int(port)) if sep else (spec, default_port)
+
+
+class ClockSync:
+    """NTP-style estimate of ``server clock - node clock``.
+
+    Each exchange gives ``t0`` (node sends), ``t1`` (server receives),
+    ``t2`` (server replies) and ``t3`` (node receives). The exchange with the
+    shortest round trip is the one least skewed by queuing, so its offset is
+    used.
+    """
+
+    def __init__(self, window: int = SYNC_WINDOW):
+        self._samples: deque[tuple[float, float]] = deque(maxlen=window)
+
+    def add(self, t0: float, t1: float, t2: float, t3: float):
+        delay = (t3 - t0) - (t2 - t1)
+        offset = ((t1 - t0) + (t2 - t3)) / 2
+        self._samples.append((delay, offset))
+
+    @property
+    def synced(self) -> bool:
+        return bool(self._samples)
+
+    @property
+    def offset(self) -> float:
+        return min(self._samples)[1] if self._samples else 0.0
+
+    @property
+    def delay(self) -> float:
+        return min(self._samples)[0] if self._samples else 0.0
+
+    def to_server(self, t: float) -> float:
+        return t + self.offset
+
+
+class TimingNode(Reader, DetectionSink):
+    """Sends the detections of local readers to a ``NodeServer``.
+
+    Connect reader hooks to it like to an ``EventBus``; ``put`` never blocks.
+    While the server is unreachable detections are buffered (up to
+    ``BUFFER_MAX``, oldest dropped first) and sent once it is back.
+    """
+
+    thread_name = "perlap-node"
+
+    def __init__(self, host: str, port: int = DEFAULT_NODE_PORT,
+                 node_id: Optional[str] = None, clock: Clock = SYSTEM_CLOCK):
+        super().__init__()
+        self.host = host
+        self.port = port
+        self.node_id = node_id or socket.gethostname()
+        self.boot = uuid.uuid4().hex[:12]  # sequence numbers restart with each run
+        self.clock = clock
+        self.sync = ClockSync()
+        self.connected = False
+        self.dropped = 0                  # detections lost to a full buffer
+        self.connection_changed = Hook()  # bool
+        self.error_occurred = Hook()      # str
+        self._lock = threading.Lock()
+        self._wake = threading.Event()
+        self._seq = 0
+        self._pending: deque[tuple[int, Detection]] = deque()  # not sent on this connection
+        self._unacked: deque[tuple[int, Detection]] = deque()  # sent, not acknowledged
+        self._sock: Optional[socket.socket] = None
+        self._rbuf = b""
+
+    # ── DetectionSink (reader threads) ──
+
+    def put(self, detection: Detection):
+        with self._lock:
+            self._seq += 1
+            self._pending.append((self._seq, detection))
+            if len(self._pending) + len(self._unacked) > BUFFER_MAX:
+                (self._unacked or self._pending).popleft()
+                self.dropped += 1
+        self._wake.set()
+
+    @property
+    def backlog(self) -> int:
+        """Detections the server has not acknowledged yet."""
+        with self._lock:
+            return len(self._pending) + len(self._unacked)
+
+    def stop(self, timeout: float = 3.0):
+        self._running = False
+        self._wake.set()
+        super().stop(timeout)
+
+    # ── Node thread ──
+
+    def run(self):
+        backoff = RECONNECT_MIN_S
+        while self._running:
+            try:
+                sock = socket.create_connection((self.host, self.port), timeout=IO_TIMEOUT_S)
+            except OSError:
+                self._sleep(backoff)
+                backoff = min(backoff * 2, RECONNECT_MAX_S)
+                continue
+            backoff = RECONNECT_MIN_S
+            try:
+                self._session(sock)
+            except (OSError, ValueError, KeyError) as e:
+                self.error_occurred.emit(f"Servidor {self.host}:{self.port}: {e}")
+            finally:
+                sock.close()
+                self._sock = None
+                if self.connected:
+                    self.connected = False
+                    self.connection_changed.emit(False)
+
+    def _sleep(self, seconds: float):
+        deadline = time.monotonic() + seconds
+        while self._running and time.monotonic() < deadline:
+            time.sleep(0.05)
+
+    def _session(self, sock: socket.socket):
+        sock.setsockopt(socket.IPPROTO_TCP, socket.TCP_NODELAY, 1)
+        sock.settimeout(IO_TIMEOUT_S)
+        self._sock = sock
+        self._rbuf = b""
+        self._send({"type": "hello", "node": self.node_id, "boot": self.boot})
+        welcome = self._recv("welcome")
+        with self._lock:
+            # Not acknowledged last time: send again, the server drops repeats
+            self._pending.extendleft(reversed(self._unacked))
+            self._unacked.clear()
+        self._acked(welcome["last_seq"])
+        for _ in range(SYNC_ROUNDS):
+            self._sync_once()
+        self.connected = True
+        self.connection_changed.emit(True)
+
+        next_sync = time.monotonic() + SYNC_INTERVAL_S
+        while self._running:
+            self._wake.wait(POLL_S)
+            self._wake.clear()
+            self._flush()
+            self._read_acks()
+            if time.monotonic() >= next_sync:
+                self._sync_once()
+                next_sync = time.monotonic() + SYNC_INTERVAL_S
+        # Stopping: send the rest and give the server a moment to acknowledge it
+        self._flush()
+        deadline = time.monotonic() + IO_TIMEOUT_S
+        while self.backlog and time.monotonic() < deadline:
+            time.sleep(POLL_S)
+            self._read_acks()
+
+    def _sync_once(self):
+        t0 = self.clock()
+        self._send({"type": "sync", "t0": t0})
+        reply = self._recv("sync", lambda m: m["t0"] == t0)
+        self.sync.add(t0, reply["t1"], reply["t2"], self.clock())
+        self._send({"type": "status", "offset_ms": round(self.sync.offset * 1000, 3),
+                    "delay_ms": round(self.sync.delay * 1000, 3)})
+
+    def _flush(self):
+        with self._lock:
+            batch = list(self._pending)
+            self._pending.clear()
+            self._unacked.extend(batch)
+        if not batch:
+            return
+        to_server = self.sync.to_server
+        self._sock.sendall(b"".join(_line({
+            "type": "detection", "seq": seq, "kind": d.kind, "source": d.source,
+            "car_id": d.car_id, "t": to_server(d.t), "meta": d.meta, "gate": d.gate,
+            "lap_time_ms": d.lap_time_ms,
+        }) for seq, d in batch))
+
+    def _acked(self, seq: int):
+        with self._lock:
+            for queue in (self._unacked, self._pending):
+                while queue and queue[0][0] <= seq:
+                    queue.popleft()
+
+    def _read_acks(self):
+        while select.select([self._sock], [], [], 0)[0]:
+            chunk = self._sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("conexion cerrada por el servidor")
+            self._rbuf += chunk
+            for msg in self._messages():
+                self._handle(msg)
+
+    def _messages(self) -> list[dict]:
+        *lines, self._rbuf = self._rbuf.split(b"\n")
+        return [json.loads(line) for line in lines if line]
+
+    def _handle(self, msg: dict):
+        if msg.get("type") == "ack":
+            self._acked(msg["seq"])
+
+    def _recv(self, kind: str, match=None) -> dict:
+        """Block until a ``kind`` message arrives, handling acks meanwhile."""
+        while True:
+            for msg in self._messages():
+                if msg.get("type") == kind and (match is None or match(msg)):
+                    # Lines after it stay buffered for the next call
+                    return msg
+                self._handle(msg)
+            chunk = self._sock.recv(65536)
+            if not chunk:
+                raise ConnectionError("conexion cerrada por el servidor")
+            self._rbuf += chunk
+
+    def _send(self, msg: dict):
+        self._sock.sendall(_line(msg))
+
+
+class NodeServer(AsyncServer):
+    """Central side: puts the detections of every ``TimingNode`` on ``sink``.
+
+    Detections carry ``meta["node"]``. Repeats (a node resending what was
+    not acknowledged before a disconnect) are acknowledged and dropped.
+    ``node_connection`` is emitted from the server thread.
+    """
+
+    thread_name = "perlap-nodes"
+
+    def __init__(self, sink: DetectionSink, host: str = "0.0.0.0",
+                 port: int = DEFAULT_NODE_PORT, clock: Clock = SYSTEM_CLOCK):
+        super().__init__(host, port)
+        self.sink = sink
+        self.clock = clock
+        self.node_connection = Hook()  # node id, connected
+        self._last_seq: dict[tuple[str, str], int] = {}
+        self._status: dict[str, dict] = {}
+        self._writers: set[asyncio.StreamWriter] = set()
+
+    def nodes(self) -> list[dict]:
+        """Per node: connected, offset_ms, delay_ms, received, duplicates."""
+        return [dict(s, node=n, connected=s["connected"] > 0)
+                for n, s in list(self._status.items())]
+
+    @property
+    def connected_count(self) -> int:
+        return sum(1 for s in list(self._status.values()) if s["connected"] > 0)
+
+    def _shutdown(self):
+        for writer in list(self._writers):
+            writer.transport.abort()
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        self._writers.add(writer)
+        node = key = status = None
+        try:
+            while True:
+                line = await reader.readline()
+                if not line:
+                    break
+                t1 = self.clock()
+                msg = json.loads(line)
+                kind = msg.get("type")
+                if kind == "sync":
+                    writer.write(_line({"type": "sync", "t0": msg["t0"], "t1": t1,
+                                        "t2": self.clock()}))
+                elif kind == "detection" and status is not None:
+                    self._detection(msg, node, key, status)
+                    writer.write(_line({"type": "ack", "seq": msg["seq"]}))
+                elif kind == "hello":
+                    node, key = msg["node"], (msg["node"], msg["boot"])
+                    status = self._status.setdefault(node, {
+                        "connected": 0, "offset_ms": 0.0, "delay_ms": 0.0,
+                        "received": 0, "duplicates": 0})
+                    # A count: the old connection of a node may close after its new one opens
+                    status["connected"] += 1
+                    writer.write(_line({"type": "welcome",
+                                        "last_seq": self._last_seq.get(key, 0)}))
+                    self.node_connection.emit(node, True)
+                elif kind == "status" and status is not None:
+                    status["offset_ms"] = msg["offset_ms"]
+                    status["delay_ms"] = msg["delay_ms"]
+                await writer.drain()
+        except (ConnectionError, ValueError, KeyError, TypeError,
+                asyncio.LimitOverrunError, asyncio.CancelledError):
+            pass
+        finally:
+            self._writers.discard(writer)
+            writer.close()
+            if status is not None:
+                status["connected"] -= 1
+                if not status["connected"]:
+                    self.node_connection.emit(node, False)
+
+    def _detection(self, msg: dict, node: str, key: tuple[str, str], status: dict):
+        seq = msg["seq"]
+        if seq <= self._last_seq.get(key, 0):
+            status["duplicates"] += 1
+            return
+        self._last_seq[key] = seq
+        meta = dict(msg["meta"] or {})
+        meta["node"] = node
+        self.sink.put(Detection(msg["kind"], msg["source"], msg["car_id"], msg["t"], meta,
+                                msg.get("gate", 0), msg.get("lap_time_ms", 0)))
+        status["received"] += 1
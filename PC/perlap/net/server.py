@@ -0,0 +1,90 @@
+import asyncio
+import threading
+from typing import Optional
+
+
+class AsyncServer:
+    """TCP server whose asyncio loop runs on its own daemon thread.
+
+    Subclasses implement ``_handle(reader, writer)`` and may override
+    ``_setup`` (on the loop, before accepting; may raise ``OSError``) and
+    ``_shutdown`` (on the loop, when stopping, before the loop ends).
+    Other threads reach the loop only through ``call_soon``.
+    """
+
+    thread_name = "perlap-net"
+    stream_limit = 64 * 1024  # longest line/header ``readuntil`` accepts
+
+    def __init__(self, host: str, port: int):
+        self.host = host
+        self.port = port
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._thread: Optional[threading.Thread] = None
+        self._closing: Optional[asyncio.Event] = None
+        self._ready = threading.Event()
+        self._error: Optional[BaseException] = None
+
+    def start(self, timeout: float = 3.0):
+        """Start serving; raises ``OSError`` if the port cannot be opened."""
+        if self.is_running:
+            return
+        self._ready.clear()
+        self._error = None
+        self._thread = threading.Thread(target=asyncio.run, args=(self._serve(),),
+                                        name=self.thread_name, daemon=True)
+        self._thread.start()
+        self._ready.wait(timeout)
+        if self._error is not None:
+            self._thread.join()
+            raise self._error
+
+    @property
+    def is_running(self) -> bool:
+        return self._thread is not None and self._thread.is_alive()
+
+    def stop(self, timeout: float = 3.0):
+        loop = self._loop
+        if loop is not None and self.is_running:
+            loop.call_soon_threadsafe(self._closing.set)
+            self._thread.join(timeout)
+
+    def call_soon(self, fn, *args) -> bool:
+        """Run ``fn(*args)`` on the server loop; False if it is not running."""
+        loop = self._loop
+        if loop is None or not self.is_running:
+            return False
+        loop.call_soon_threadsafe(fn, *args)
+        return True
+
+    async def _serve(self):
+        self._loop = asyncio.get_running_loop()
+        self._closing = asyncio.Event()
+        try:
+            server = await asyncio.start_server(self._handle, self.host, self.port,
+                                                limit=self.stream_limit)
+        except OSError as e:
+            self._error = e
+            self._ready.set()
+            return
+        try:
+            self._setup()
+        except OSError as e:
+            server.close()
+            self._error = e
+            self._ready.set()
+            return
+        # Port 0 picks a free port: report the real one
+        self.port = server.sockets[0].getsockname()[1]
+        self._ready.set()
+        async with server:
+            await self._closing.wait()
+            self._shutdown()
+
+    def _setup(self):
+        pass
+
+    def _shutdown(self):
+        pass
+
+    async def _handle(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        raise NotImplementedError
@@ -0,0 +1,145 @@
+"""Per-stage timing of the hot paths (camera frame, serial line, timing).
+
+Each stage keeps its last ``SAMPLES`` spans (start, duration, thread) in
+fixed numpy rings: recording is a few array writes, cheap enough to stay on
+all evening. ``summary`` gives p50/p95/p99 per stage for the diagnostics
+panel; ``export_chrome_trace`` writes the spans as Chrome trace JSON
+(chrome://tracing, ui.perfetto.dev) to look at a bad evening afterwards.
+
+    GRAB = profiler.stage("camera.grab")
+    t0 = time.perf_counter()
+    ...
+    GRAB.record(t0, time.perf_counter() - t0)
+
+Each process has its own ``profiler`` (multi-camera workers send their
+summary with their stats).
+"""
+import json
+import os
+import threading
+import time
+
+import numpy as np
+
+SAMPLES = 8192          # spans kept per stage (about 4 min of frames at 30 fps)
+HISTOGRAM_BINS = 24     # log-spaced, 10 us .. 1 s
+
+
+class Stage:
+    """Ring of the last ``SAMPLES`` spans of one stage.
+
+    Meant for one writing thread; a span recorded at the same time from
+    another thread may overwrite one sample, which statistics can afford.
+    """
+
+    __slots__ = ("name", "_start", "_dur", "_tid", "_n")
+
+    def __init__(self, name: str):
+        self.name = name
+        self._start = np.zeros(SAMPLES)
+        self._dur = np.zeros(SAMPLES)
+        self._tid = np.zeros(SAMPLES, np.int64)
+        self._n = 0
+
+    def record(self, start: float, duration: float):
+        """``start``: perf_counter() value; ``duration`` in seconds."""
+        i = self._n % SAMPLES
+        self._start[i] = start
+        self._dur[i] = duration
+        self._tid[i] = threading.get_ident()
+        self._n += 1
+
+    def since(self, start: float):
+        self.record(start, time.perf_counter() - start)
+
+    @property
+    def count(self) -> int:
+        return self._n
+
+    def durations(self) -> np.ndarray:
+        return self._dur[:min(self._n, SAMPLES)].copy()
+
+    def spans(self) -> tuple[np.ndarray, np.ndarray, np.ndarray]:
+        n = min(self._n, SAMPLES)
+        return self._start[:n].copy(), self._dur[:n].copy(), self._tid[:n].copy()
+
+    def reset(self):
+        self._n = 0
+
+
+class Profiler:
+    def __init__(self):
+        self._stages: dict[str, Stage] = {}
+        self._lock = threading.Lock()
+
+    def stage(self, name: str) -> Stage:
+        """The stage ``name``, created on first use (keep it in a module constant)."""
+        stage = self._stages.get(name)
+        if stage is None:
+            with self._lock:
+                stage = self._stages.setdefault(name, Stage(name))
+        return stage
+
+    def stages(self) -> list[Stage]:
+        return sorted(self._stages.values(), key=lambda s: s.name)
+
+    def reset(self):
+        for stage in self.stages():
+            stage.reset()
+
+    def summary(self) -> list[dict]:
+        """Per stage with samples: count and p50/p95/p99/max in milliseconds."""
+        rows = []
+        for stage in self.stages():
+            d = stage.durations()
+            if not len(d):
+                continue
+            p50, p95, p99 = np.percentile(d, (50, 95, 99)) * 1000.0
+            rows.append({"stage": stage.name, "count": stage.count, "p50_ms": float(p50),
+                         "p95_ms": float(p95), "p99_ms": float(p99),
+                         "max_ms": float(d.max() * 1000.0)})
+        return rows
+
+    def histogram(self, name: str) -> tuple[np.ndarray, np.ndarray]:
+        """(counts, bin edges in ms) of the kept durations of ``name``."""
+        edges = np.logspace(-5, 0, HISTOGRAM_BINS + 1)
+        stage = self._stages.get(name)
+        d = stage.durations() if stage is not None else np.zeros(0)
+        counts, _ = np.histogram(np.clip(d, edges[0], edges[-1]), edges)
+        return counts, edges * 1000.0
+
+    def chrome_trace(self) -> dict:
+        """Kept spans as Chrome trace events ("X"), one track per thread."""
+        names = {t.ident: t.name for t in threading.enumerate()}
+        pid = os.getpid()
+        events = []
+        tids = set()
+        for stage in self.stages():
+            starts, durs, ids = stage.spans()
+            for start, dur, tid in zip(starts.tolist(), durs.tolist(), ids.tolist()):
+                events.append({"name": stage.name, "ph": "X", "pid": pid, "tid": tid,
+                               "ts": start * 1e6, "dur": dur * 1e6})
+            tids.update(ids.tolist())
+        events.sort(key=lambda e: e["ts"])
+        for tid in sorted(tids):
+            events.append({"name": "thread_name", "ph": "M", "pid": pid, "tid": tid,
+                           "args": {"name": names.get(tid, f"hilo {tid}")}})
+        return {"traceEvents": events, "displayTimeUnit": "ms"}
+
+    def export_chrome_trace(self, path: str) -> int:
+        """Write ``chrome_trace`` to ``path``; returns the number of spans."""
+        trace = self.chrome_trace()
+        tmp = path + ".tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump(trace, f)
+        os.replace(tmp, path)
+        return sum(1 for e in trace["traceEvents"] if e["ph"] == "X")
+
+
+profiler = Profiler()
+
+
+def format_summary(rows: list[dict], prefix: str = "") -> list[str]:
+    return [f"{prefix}{r['stage']:<26} n={r['count']:<7} p50 {r['p50_ms']:7.3f}  "
+            f"p95 {r['p95_ms']:7.3f}  p99 {r['p99_ms']:7.3f}  max {r['max_ms']:8.3f} ms"
+            for r in rows]
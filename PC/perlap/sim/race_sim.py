@@ -0,0 +1,260 @@
+"""Deterministic multi-car race simulation for benchmarks and lap-logic tests.
+
+Generates the crossings a race would produce (per-car lap-time distributions,
+incidents, cars crossing in the same millisecond, spurious re-triggers inside
+MIN_LAP_MS, sector gates) together with the laps that should come out of
+them, then drives RaceManager (and optionally RaceLog) on a ManualClock.
+
+    python -m perlap.sim.race_sim --cars 20 --laps 5000
+    python -m perlap.sim.race_sim --cars 6 --laps 2000 --sectors 2 --log
+    python -m perlap.sim.race_sim --cars 4 --sectors 2 --anonymous
+"""
+import argparse
+import os
+import tempfile
+import time
+from dataclasses import dataclass
+
+import numpy as np
+
+from ..models import race_log
+from ..models.clock import ManualClock
+from ..models.race import RaceManager, MIN_LAP_MS, MIN_SECTOR_MS
+from ..models.race_log import RaceLog
+from ..models.car import UNSAMPLED_HSV_LOWER, UNSAMPLED_HSV_UPPER
+
+SIM_SOURCE = "SIM"
+SIMULTANEOUS_WINDOW_MS = 250  # crossings this close may be snapped to the same ms
+
+# Columns of SimRace.crossings
+KIND_LAP = 0        # genuine finish crossing (START for each car's first one)
+KIND_SECTOR = 1     # genuine intermediate gate crossing
+KIND_SPURIOUS = 2   # re-trigger inside MIN_LAP_MS: must be rejected
+
+
+@dataclass
+class SimConfig:
+    cars: int = 6
+    laps: int = 50                          # per car
+    seed: int = 1
+    pace_ms: tuple = (4000, 6000)           # range of the per-car mean lap time
+    spread: tuple = (0.01, 0.04)            # per-car lap-time sigma, fraction of the mean
+    incident_rate: float = 0.02             # laps with an off / crash...
+    incident_ms: float = 3000               # ...costing this much on average (exponential)
+    spurious_rate: float = 0.05             # finish crossings followed by a re-trigger
+    simultaneous_rate: float = 0.3          # close crossings snapped to the same ms
+    sectors: int = 0                        # intermediate gates
+    grid_ms: int = 1000                     # spread of the first (START) crossings
+    anonymous: bool = False                 # gates that cannot tell cars apart (car_id -1)
+
+
+@dataclass
+class SimRace:
+    """Generated race: what the detectors report and what the timing must say."""
+
+    names: list[str]
+    t_ms: np.ndarray         # every crossing, in delivery order
+    car: np.ndarray
+    gate: np.ndarray         # 0 = finish, 1.. = sector gate
+    kind: np.ndarray         # KIND_*
+    lap_ms: np.ndarray       # (cars, laps) expected lap times
+    sector_ms: np.ndarray    # (cars, laps, sectors + 1) expected splits; empty without gates
+    anonymous: bool = False  # crossings delivered without car_id
+
+    def __len__(self):
+        return len(self.t_ms)
+
+    @property
+    def simultaneous(self) -> int:
+        """Finish crossings sharing their millisecond with another car."""
+        fin = self.gate == 0
+        _, counts = np.unique(self.t_ms[fin & (self.kind == KIND_LAP)], return_counts=True)
+        return int(counts[counts > 1].sum())
+
+
+def generate(cfg: SimConfig) -> SimRace:
+    rng = np.random.default_rng(cfg.seed)
+    n, laps = cfg.cars, cfg.laps
+    mean = rng.uniform(*cfg.pace_ms, n)
+    sigma = mean * rng.uniform(*cfg.spread, n)
+    lap = rng.normal(mean[:, None], sigma[:, None], (n, laps))
+    incidents = rng.random((n, laps)) < cfg.incident_rate
+    lap += incidents * rng.exponential(cfg.incident_ms, (n, laps))
+    # Real laps are never under the debounce, even after a crossing is snapped
+    lap = np.maximum(lap, MIN_LAP_MS + 2 * SIMULTANEOUS_WINDOW_MS).astype(np.int64)
+
+    cross = np.zeros((n, laps + 1), dtype=np.int64)
+    if cfg.anonymous:
+        # Only a procession can be timed by passing order: the grid in slot order,
+        # every car on car 0's laps, so nobody overtakes
+        lap[:] = lap[0]
+        cross[:, 0] = np.arange(n) * max(cfg.grid_ms // max(n, 1), 1)
+    else:
+        cross[:, 0] = rng.integers(0, cfg.grid_ms, n)
+    cross[:, 1:] = cross[:, :1] + np.cumsum(lap, axis=1)
+
+    # Snap some crossings onto the closest crossing of another car on the same lap
+    if n > 1 and cfg.simultaneous_rate > 0 and not cfg.anonymous:
+        order = np.argsort(cross, axis=0)
+        srt = np.take_along_axis(cross, order, axis=0)
+        gap = np.diff(srt, axis=0)                       # to the car just ahead
+        snap = (gap <= SIMULTANEOUS_WINDOW_MS) & (rng.random(gap.shape) < cfg.simultaneous_rate)
+        snap[:, 0] = False                               # START grid stays as drawn
+        srt[1:][snap] = srt[:-1][snap]
+        np.put_along_axis(cross, order, srt, axis=0)
+        lap = np.diff(cross, axis=1)
+
+    parts = [(cross.ravel(), np.repeat(np.arange(n), laps + 1),
+              np.zeros(n * (laps + 1), dtype=np.int64), KIND_LAP)]
+
+    sector_ms = np.zeros((n, laps, 0), dtype=np.int64)
+    if cfg.sectors:
+        k = cfg.sectors + 1
+        share = rng.dirichlet(np.full(k, 20.0), n)       # per-car track profile
+        frac = share[:, None, :] * rng.normal(1, 0.02, (n, laps, k))
+        frac /= frac.sum(axis=2, keepdims=True)
+        if cfg.anonymous:
+            frac[:] = frac[0]
+        sector_ms = np.maximum((frac * lap[:, :, None]).astype(np.int64), MIN_SECTOR_MS)
+        sector_ms[:, :, -1] = lap - sector_ms[:, :, :-1].sum(axis=2)
+        gates_t = cross[:, :-1, None] + np.cumsum(sector_ms[:, :, :-1], axis=2)
+        parts.append((gates_t.ravel(), np.repeat(np.arange(n), laps * cfg.sectors),
+                      np.tile(np.arange(1, k), n * laps), KIND_SECTOR))
+
+    # Anonymous re-triggers cannot be told from the next car: none in a procession
+    bounce = rng.random((n, laps + 1)) < (0.0 if cfg.anonymous else cfg.spurious_rate)
+    car_b, lap_b = np.nonzero(bounce)
+    parts.append((cross[car_b, lap_b] + rng.integers(1, MIN_LAP_MS, len(car_b)), car_b,
+                  np.zeros(len(car_b), dtype=np.int64), KIND_SPURIOUS))
+
+    t = np.concatenate([p[0] for p in parts])
+    car = np.concatenate([p[1] for p in parts])
+    gate = np.concatenate([p[2] for p in parts])
+    kind = np.concatenate([np.full(len(p[0]), p[3], dtype=np.int8) for p in parts])
+    # Time order; a genuine crossing before any re-trigger in the same ms
+    idx = np.lexsort((kind, t))
+    return SimRace(
+        names=[f"SIM{i}" for i in range(n)],
+        t_ms=t[idx], car=car[idx], gate=gate[idx], kind=kind[idx],
+        lap_ms=lap, sector_ms=sector_ms, anonymous=cfg.anonymous,
+    )
+
+
+def setup(race: RaceManager, sim: SimRace, sectors: int = 0):
+    for i, name in enumerate(sim.names):
+        race.register_car(i, name, UNSAMPLED_HSV_LOWER, UNSAMPLED_HSV_UPPER, (255, 255, 255))
+    race.set_sector_gates(sectors)
+    race.reset()
+
+
+def drive(race: RaceManager, clock: ManualClock, sim: SimRace,
+          log: RaceLog | None = None) -> int:
+    """Feed every crossing at its time on ``clock``; returns the events produced.
+
+    ``race`` must be built on ``clock`` and ``setup`` for ``sim``. Anonymous
+    races are fed with car_id -1, as laser gates report them.
+    """
+    t0 = race.start_time
+    produced = 0
+    process_crossing, process_sector = race.process_crossing, race.process_sector
+    cars = np.full(len(sim), -1) if sim.anonymous else sim.car
+    for t, car, gate in zip((t0 + sim.t_ms / 1000).tolist(), cars.tolist(),
+                            sim.gate.tolist()):
+        clock.t = t
+        if gate:
+            ev = process_sector(gate, car, SIM_SOURCE)
+        else:
+            ev = process_crossing(car, SIM_SOURCE)
+        if ev is not None:
+            produced += 1
+            if log is not None:
+                log.record_event(ev)
+    return produced
+
+
+def check(race: RaceManager, sim: SimRace) -> list[str]:
+    """Differences between the timing state and the expected laps (empty = correct)."""
+    problems = []
+    for car in range(len(sim.names)):
+        got = race.standings.lap_times(car)
+        want = sim.lap_ms[car]
+        if len(got) != len(want):
+            problems.append(f"{sim.names[car]}: {len(got)} vueltas, esperadas {len(want)}")
+        elif not np.array_equal(got, want):
+            lap = int(np.flatnonzero(got != want)[0])
+            problems.append(f"{sim.names[car]} vuelta {lap + 1}: {got[lap]} ms, "
+                            f"esperado {want[lap]} ms")
+        if sim.sector_ms.shape[2]:
+            best = race.standings.best_sectors[car]
+            if not np.array_equal(best, sim.sector_ms[car].min(axis=0)):
+                problems.append(f"{sim.names[car]}: mejores sectores {best.tolist()}, "
+                                f"esperados {sim.sector_ms[car].min(axis=0).tolist()}")
+    # Classification: laps desc, best lap asc, slot asc
+    want_order = sorted(range(len(sim.names)),
+                        key=lambda c: (-sim.lap_ms.shape[1], int(sim.lap_ms[c].min()), c))
+    if race.standings.order != want_order:
+        problems.append(f"orden {race.standings.order}, esperado {want_order}")
+    return problems
+
+
+def simulate(cfg: SimConfig, log: RaceLog | None = None,
+             sim: SimRace | None = None) -> tuple[RaceManager, SimRace, int]:
+    """Run a race (generated from ``cfg`` unless given); returns the manager,
+    the generated race and events produced."""
+    if sim is None:
+        sim = generate(cfg)
+    clock = ManualClock()
+    race = RaceManager(max_cars=max(cfg.cars, 1), clock=clock)
+    setup(race, sim, cfg.sectors)
+    if log is not None:
+        log.start_race(dict(enumerate(sim.names)))
+    produced = drive(race, clock, sim, log)
+    if log is not None:
+        log.end_race()
+    return race, sim, produced
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--cars", type=int, default=6)
+    parser.add_argument("--laps", type=int, default=1000, help="vueltas por auto")
+    parser.add_argument("--sectors", type=int, default=0, help="puertas intermedias")
+    parser.add_argument("--seed", type=int, default=1)
+    parser.add_argument("--spurious", type=float, default=SimConfig.spurious_rate)
+    parser.add_argument("--anonymous", action="store_true",
+                        help="cruces sin identificar el auto (puertas laser)")
+    parser.add_argument("--log", action="store_true",
+                        help="grabar tambien con RaceLog (en un directorio temporal)")
+    args = parser.parse_args(argv)
+    cfg = SimConfig(cars=args.cars, laps=args.laps, sectors=args.sectors, seed=args.seed,
+                    spurious_rate=args.spurious, anonymous=args.anonymous)
+
+    t = time.perf_counter()
+    sim = generate(cfg)
+    gen_s = time.perf_counter() - t
+
+    races_dir = race_log.RACES_DIR
+    with tempfile.TemporaryDirectory() as tmp:
+        race_log.RACES_DIR = tmp
+        try:
+            t = time.perf_counter()
+            race, _, produced = simulate(cfg, RaceLog() if args.log else None, sim)
+            run_s = time.perf_counter() - t
+            if args.log:
+                size = os.path.getsize(RaceLog.list_races()[0])
+        finally:
+            race_log.RACES_DIR = races_dir
+
+    spurious = int((sim.kind == KIND_SPURIOUS).sum())
+    print(f"{len(sim)} cruces ({spurious} falsos, {sim.simultaneous} simultaneos) "
+          f"generados en {gen_s * 1000:.0f} ms")
+    print(f"{produced} eventos en {run_s:.2f} s = {len(sim) / run_s * 60 / 1e6:.2f} M cruces/min"
+          + (f" (carrera guardada: {size / 1e6:.1f} MB)" if args.log else ""))
+    problems = check(race, sim)
+    print("OK: vueltas, sectores y clasificacion como se esperaba" if not problems
+          else "\n".join(problems[:20]))
+    return 1 if problems else 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main())
@@ -0,0 +1,403 @@
+"""Virtual Arduino on a pseudo-terminal, for testing ArduinoSource without hardware.
+
+Speaks the JSON protocols of Arduino/LaserLapTimer and Arduino/LapTimer (v2).
+POSIX only (uses os.openpty); on Windows pair two ports with com0com instead.
+
+    python -m perlap.sim.virtual_arduino --firmware v2 --cars 3 --lap 4.5
+
+then select the printed port in PerLap.
+"""
+import argparse
+import json
+import os
+import random
+import select
+import tempfile
+import termios
+import threading
+import time
+import tty
+
+FIRMWARE_LASER = "laser"
+FIRMWARE_V2 = "v2"
+
+MIN_LAP_MS = 2000  # both firmwares
+V2_MAX_CARS = 6
+
+
+class VirtualArduino:
+    """Pseudo-terminal device emulating one of the PerLap firmwares.
+
+    ``port`` is a stable symlink to the current pty slave, so a simulated
+    disconnect (the pty is closed and a new one created) looks like a cable
+    being unplugged and plugged back into the same port.
+    """
+
+    def __init__(self, firmware: str = FIRMWARE_LASER, baseline: int = 800,
+                 stream_hz: float = 10.0, boot_delay_s: float = 0.0,
+                 enforce_min_lap: bool = True):
+        self.firmware = firmware
+        self.baseline = baseline
+        self.threshold = baseline // 2
+        self.stream_hz = stream_hz
+        self.boot_delay_s = boot_delay_s
+        self.enforce_min_lap = enforce_min_lap
+
+        self._dir = tempfile.mkdtemp(prefix="perlap-sim-")
+        self.port = os.path.join(self._dir, "ttyPERLAP0")
+        self._master = -1
+        self._slave = -1
+        self._slave_attrs = None
+        self._lock = threading.Lock()
+        self._running = False
+        self._threads: list[threading.Thread] = []
+        self._boot_ms = time.monotonic()
+
+        self.streaming = False
+        self.laser_on = True
+        self._last_cut_ms = -MIN_LAP_MS
+        # v2 firmware state
+        self._car_names: dict[int, str] = {}
+        self._car_last: dict[int, int] = {}
+        self._car_laps: dict[int, int] = {}
+        self._car_best: dict[int, int] = {}
+
+        self.cuts_sent = 0
+        self.lines_sent = 0
+        self.commands: list[str] = []
+
+    # ── Lifecycle ──
+
+    def start(self):
+        self._running = True
+        self._open_pty()
+        self._spawn(self._command_loop, "VirtualArduino-cmd")
+        self._spawn(self._stream_loop, "VirtualArduino-stream")
+        self._boot()
+
+    def stop(self):
+        self._running = False
+        for t in self._threads:
+            t.join(1.0)
+        self._threads.clear()
+        self._close_pty()
+        try:
+            os.unlink(self.port)
+            os.rmdir(self._dir)
+        except OSError:
+            pass
+
+    def disconnect(self, duration_s: float = 0.5, blocking: bool = False):
+        """Simulate a bumped cable: the port vanishes, then the board reboots."""
+        def _cycle():
+            self._close_pty()
+            time.sleep(duration_s)
+            if self._running:
+                self._open_pty()
+                self._boot()
+        if blocking:
+            _cycle()
+        else:
+            threading.Thread(target=_cycle, daemon=True).start()
+
+    def _spawn(self, target, name: str):
+        t = threading.Thread(target=target, name=name, daemon=True)
+        t.start()
+        self._threads.append(t)
+
+    def _open_pty(self):
+        master, slave = os.openpty()
+        tty.setraw(slave)  # no echo / line editing before the reader opens it
+        with self._lock:
+            self._master, self._slave = master, slave
+            self._slave_attrs = termios.tcgetattr(slave)
+        tmp = self.port + ".new"
+        os.symlink(os.ttyname(slave), tmp)
+        os.replace(tmp, self.port)
+
+    def _close_pty(self):
+        with self._lock:
+            master, slave = self._master, self._slave
+            self._master = self._slave = -1
+        for fd in (master, slave):
+            if fd >= 0:
+                try:
+                    os.close(fd)
+                except OSError:
+                    pass
+
+    def _boot(self):
+        if self.boot_delay_s:
+            time.sleep(self.boot_delay_s)
+        self._boot_ms = time.monotonic()
+        self._last_cut_ms = -MIN_LAP_MS
+        self._car_last.clear()
+        self._car_laps.clear()
+        self._car_best.clear()
+        self._car_names.clear()  # the real board forgets REG on reboot
+        self.streaming = False
+        if self.firmware == FIRMWARE_V2:
+            self.send_event("READY", {"ldr_baseline": self.baseline})
+        else:
+            self.send_event("READY", {"baseline": self.baseline, "threshold": self.threshold})
+
+    # ── Output ──
+
+    def millis(self) -> int:
+        return int((time.monotonic() - self._boot_ms) * 1000)
+
+    def send_raw(self, data: bytes) -> bool:
+        with self._lock:
+            if self._master < 0:
+                return False
+            try:
+                os.write(self._master, data)
+            except OSError:
+                return False
+        self.lines_sent += data.count(b"\n")
+        return True
+
+    def send_event(self, event: str, data: dict) -> bool:
+        line = json.dumps({"event": event, "ms": self.millis(), "data": data},
+                          separators=(",", ":"))
+        return self.send_raw(line.encode("utf-8") + b"\n")
+
+    def send_malformed(self):
+        self.send_raw(random.choice([
+            b'{"event":"LDR_CUT","ms":12,"data":{"val\n',
+            b"\xff\xfe\x00garbage\n",
+            b"LDR 512\n",
+            b'{"event":"LAP","data":\n',
+            b"\n",
+        ]))
+
+    # ── Crossings ──
+
+    def cut(self, car_slot: int = 0, ldr: int = 40) -> float | None:
+        """Simulate a beam cut (LaserLapTimer) or a Hall trigger (v2).
+
+        Returns the time.perf_counter() at which the line was written, or
+        None if the firmware would have ignored it (inside MIN_LAP_MS).
+        """
+        now = self.millis()
+        if self.firmware == FIRMWARE_V2:
+            return self._v2_crossing(car_slot, now)
+
+        if self.enforce_min_lap and now - self._last_cut_ms < MIN_LAP_MS:
+            return None
+        self._last_cut_ms = now
+        self.cuts_sent += 1
+        t = time.perf_counter()
+        return t if self.send_event("LDR_CUT", {"value": ldr}) else None
+
+    def _v2_crossing(self, slot: int, now: int) -> float | None:
+        t = time.perf_counter()
+        if slot not in self._car_names:
+            ok = self.send_event("START" if slot not in self._car_last else "LAP",
+                                 {"car": "UNKNOWN", "id": -1, "src": "HALL"})
+            self._car_last.setdefault(slot, now)
+            return t if ok else None
+
+        name = self._car_names[slot]
+        if slot not in self._car_last:
+            self._car_last[slot] = now
+            self._car_laps[slot] = 0
+            self.cuts_sent += 1
+            ok = self.send_event("START", {"car": name, "id": slot, "src": "HALL"})
+            return t if ok else None
+
+        elapsed = now - self._car_last[slot]
+        if self.enforce_min_lap and elapsed < MIN_LAP_MS:
+            return None
+        self._car_last[slot] = now
+        self._car_laps[slot] += 1
+        best = min(self._car_best.get(slot, 999999), elapsed)
+        self._car_best[slot] = best
+        self.cuts_sent += 1
+        ok = self.send_event("LAP", {
+            "car": name, "id": slot, "lap": self._car_laps[slot],
+            "time": elapsed, "time_fmt": f"{elapsed / 1000:.3f}",
+            "best": best, "src": "HALL",
+        })
+        return t if ok else None
+
+    def _reset_car(self, slot: int):
+        self._car_last.pop(slot, None)
+        self._car_laps.pop(slot, None)
+        self._car_best.pop(slot, None)
+
+    def run_random(self, duration_s: float, cars: int = 1, mean_lap_s: float = 5.0,
+                   jitter_s: float = 0.5, malformed_rate: float = 0.0):
+        """Blocking: random crossings per car (and optional garbage lines)."""
+        end = time.monotonic() + duration_s
+        due = {c: time.monotonic() + random.uniform(0, mean_lap_s) for c in range(cars)}
+        while self._running and time.monotonic() < end:
+            car, at = min(due.items(), key=lambda x: x[1])
+            time.sleep(max(0.0, at - time.monotonic()))
+            self.cut(car)
+            due[car] = at + max(0.1, random.gauss(mean_lap_s, jitter_s))
+            if malformed_rate and random.random() < malformed_rate:
+                self.send_malformed()
+
+    def run_script(self, script: list[tuple[float, str, int]]):
+        """Blocking: [(at_s, action, arg)], action in cut/disconnect/malformed."""
+        t0 = time.monotonic()
+        for at_s, action, arg in script:
+            time.sleep(max(0.0, t0 + at_s - time.monotonic()))
+            if action == "cut":
+                self.cut(arg)
+            elif action == "disconnect":
+                self.disconnect(arg / 1000)
+            elif action == "malformed":
+                self.send_malformed()
+
+    # ── Background loops ──
+
+    def _stream_loop(self):
+        next_t = time.monotonic()
+        while self._running:
+            if not self.streaming or self.stream_hz <= 0:
+                time.sleep(0.01)
+                next_t = time.monotonic()
+                continue
+            next_t += 1.0 / self.stream_hz
+            value = self.baseline + random.randint(-8, 8) if self.laser_on else 50
+            if self.firmware == FIRMWARE_LASER:
+                self.send_event("LDR_STREAM", {"value": value})
+            delay = next_t - time.monotonic()
+            if delay > 0:
+                time.sleep(delay)
+            else:
+                next_t = time.monotonic()  # can't keep up: don't burst
+
+    def _opened_by_host(self) -> bool:
+        # A pty has no DTR line; the reader configuring the port (baud rate)
+        # stands in for the DTR pulse that reboots a real Arduino on open
+        try:
+            attrs = termios.tcgetattr(self._slave)
+        except (termios.error, OSError):
+            return False
+        if attrs == self._slave_attrs:
+            return False
+        self._slave_attrs = attrs
+        return True
+
+    def _command_loop(self):
+        buf = b""
+        while self._running:
+            master = self._master
+            if master < 0:
+                time.sleep(0.01)
+                continue
+            if self._opened_by_host():
+                buf = b""
+                self._boot()
+            try:
+                r, _, _ = select.select([master], [], [], 0.01)
+                if not r:
+                    continue
+                chunk = os.read(master, 1024)
+            except OSError:
+                time.sleep(0.01)
+                continue
+            buf += chunk
+            while b"\n" in buf:
+                line, buf = buf.split(b"\n", 1)
+                cmd = line.decode("utf-8", errors="replace").strip()
+                if cmd:
+                    self.commands.append(cmd)
+                    try:
+                        self._handle_command(cmd)
+                    except ValueError:  # "THRESHOLD abc", "REG x" ...
+                        self.send_event("ERROR", {"msg": f"Comando desconocido: {cmd}"})
+
+    def _handle_command(self, cmd: str):
+        c = cmd.upper()
+        if c == "PING":
+            self.send_event("PONG", {})
+        elif c == "LDR":
+            self.send_event("LDR_READ", {"value": self.baseline, "baseline": self.baseline,
+                                         "threshold": self.threshold})
+        elif c == "RESET":
+            if self.firmware == FIRMWARE_V2:
+                for slot in list(self._car_last):
+                    self._reset_car(slot)
+                self.send_event("RESET", {})
+            else:
+                self._last_cut_ms = -MIN_LAP_MS
+                self.send_event("READY", {"baseline": self.baseline,
+                                          "threshold": self.threshold})
+        elif self.firmware == FIRMWARE_V2:
+            self._handle_v2_command(cmd, c)
+        elif c.startswith("THRESHOLD "):
+            self.threshold = int(c[10:])
+            self.send_event("THRESHOLD_SET", {"threshold": self.threshold})
+        elif c in ("STREAM ON", "STREAM OFF"):
+            self.streaming = c.endswith("ON")
+            self.send_event("STREAM", {"state": "ON" if self.streaming else "OFF"})
+        elif c in ("LASER ON", "LASER OFF"):
+            self.laser_on = c.endswith("ON")
+            self.send_event("LASER", {"state": "ON" if self.laser_on else "OFF"})
+        elif c == "TEST":
+            off = 60
+            self.send_event("TEST_RESULT", {"ldr_off": off, "ldr_on": self.baseline,
+                                            "diff": self.baseline - off,
+                                            "laser_detected": True})
+        else:
+            self.send_event("ERROR", {"msg": f"Comando desconocido: {cmd}"})
+
+    def _handle_v2_command(self, cmd: str, c: str):
+        if c.startswith("REG "):
+            slot = int(cmd[4:5])
+            name = cmd[6:].strip()[:11]
+            if not 0 <= slot < V2_MAX_CARS:
+                self.send_event("ERROR", {"msg": f"Slot inválido (0-{V2_MAX_CARS - 1})"})
+                return
+            self._car_names[slot] = name
+            self._reset_car(slot)
+            self.send_event("CAR_REG", {"slot": slot, "name": name})
+        elif c.startswith("CAL "):
+            slot = int(cmd[4:])
+            if slot not in self._car_names:
+                self.send_event("ERROR", {"msg": "Slot inválido o no registrado"})
+                return
+            self.send_event("CAL_SET", {"slot": slot, "name": self._car_names[slot],
+                                        "r": 40 + slot, "g": 60, "b": 80})
+        elif c == "STATUS":
+            for slot, name in sorted(self._car_names.items()):
+                self.send_event("STATUS", {
+                    "slot": slot, "name": name,
+                    "laps": self._car_laps.get(slot, 0),
+                    "best": self._car_best.get(slot, 999999),
+                    "started": slot in self._car_last,
+                })
+        else:
+            self.send_event("ERROR", {"msg": f"Comando desconocido: {cmd}"})
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Arduino virtual para PerLap")
+    parser.add_argument("--firmware", choices=(FIRMWARE_LASER, FIRMWARE_V2),
+                        default=FIRMWARE_LASER)
+    parser.add_argument("--cars", type=int, default=1)
+    parser.add_argument("--lap", type=float, default=5.0, help="vuelta media (s)")
+    parser.add_argument("--jitter", type=float, default=0.5)
+    parser.add_argument("--stream-hz", type=float, default=10.0)
+    parser.add_argument("--malformed", type=float, default=0.0,
+                        help="probabilidad de linea corrupta por cruce")
+    parser.add_argument("--duration", type=float, default=3600.0)
+    args = parser.parse_args()
+
+    dev = VirtualArduino(args.firmware, stream_hz=args.stream_hz)
+    dev.start()
+    print(f"Puerto virtual: {dev.port}", flush=True)
+    try:
+        dev.run_random(args.duration, args.cars, args.lap, args.jitter, args.malformed)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        dev.stop()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,29 @@
+from .models.events import EventType
+
+
+def format_time(ms: int) -> str:
+    if ms <= 0:
+        return "-"
+    seconds = ms / 1000
+    if seconds < 60:
+        return f"{seconds:.3f}s"
+    minutes = int(seconds // 60)
+    secs = seconds % 60
+    return f"{minutes}:{secs:06.3f}"
+
+
+def format_event(event) -> str:
+    """One-line description of a timing event (``LapEvent``), as shown live."""
+    if event.event == EventType.START:
+        return f"START: {event.car_name} en pista"
+    if event.event == EventType.LAP:
+        ahead = f" (+{format_time(event.interval_ms)})" if event.interval_ms else ""
+        return (f"VUELTA {event.lap_number}: {event.car_name} - "
+                f"{format_time(event.lap_time_ms)}{ahead}")
+    if event.event == EventType.SECTOR:
+        return f"S{event.sector}: {event.car_name} - {format_time(event.lap_time_ms)}"
+    if event.event == EventType.UNMATCHED:
+        if event.source == "LASER":
+            return "Fusion: corte de laser sin auto identificado"
+        return f"Fusion: {event.car_name or event.car_id} visto sin corte de laser"
+    return ""
@@ -0,0 +1,113 @@
+from datetime import date, timedelta
+
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
+                               QTableWidget, QTableWidgetItem, QHeaderView,
+                               QPushButton, QComboBox)
+from PySide6.QtCore import Qt
+
+from .standings import format_time
+from ..archive import analytics
+
+PERIODS = [
+    ("Todo", None),
+    ("Ultimos 30 dias", 30),
+    ("Ultimos 90 dias", 90),
+    ("Ultimo año", 365),
+]
+
+LAST_SESSIONS = 5  # shown in the detail line of the selected car
+
+
+class AnalyticsWidget(QWidget):
+    """Per-car statistics across every saved race."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        layout = QVBoxLayout(self)
+        layout.setContentsMargins(4, 4, 4, 4)
+
+        title = QLabel("HISTORIAL")
+        title.setStyleSheet("font-size: 14px; font-weight: bold; color: white;")
+        title.setAlignment(Qt.AlignmentFlag.AlignCenter)
+        layout.addWidget(title)
+
+        row = QHBoxLayout()
+        self._period_combo = QComboBox()
+        for text, days in PERIODS:
+            self._period_combo.addItem(text, days)
+        self._period_combo.setStyleSheet("background: #333; color: white; padding: 2px;")
+        self._period_combo.currentIndexChanged.connect(self.refresh)
+        row.addWidget(self._period_combo, 1)
+        btn = QPushButton("Actualizar")
+        btn.setStyleSheet("background: #333; color: white; padding: 4px 10px;")
+        btn.clicked.connect(self.refresh)
+        row.addWidget(btn)
+        layout.addLayout(row)
+
+        self._table = QTableWidget()
+        self._table.setColumnCount(8)
+        self._table.setHorizontalHeaderLabels(
+            ["Auto", "Ses", "Mejor", "Mediana", "P90", "σ", "Teórica", "Mejora"])
+        self._table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self._table.verticalHeader().setVisible(False)
+        self._table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self._table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self._table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self._table.setStyleSheet("""
+            QTableWidget { background-color: #2a2a2a; color: white; gridline-color: #444; }
+            QHeaderView::section { background-color: #333; color: #ccc; padding: 4px; }
+        """)
+        self._table.currentCellChanged.connect(self._on_row_selected)
+        layout.addWidget(self._table)
+
+        self._detail_label = QLabel("")
+        self._detail_label.setStyleSheet("font-size: 12px; color: #aaa; padding: 4px;")
+        self._detail_label.setWordWrap(True)
+        layout.addWidget(self._detail_label)
+
+        self._data = analytics.LapData.empty()
+        self._stats: list[dict] = []
+        self._since = ""
+
+    def refresh(self):
+        days = self._period_combo.currentData()
+        self._since = (date.today() - timedelta(days=days)).isoformat() if days else ""
+        self._data = analytics.load_laps()
+        self._stats = self._data.car_stats(self._since)
+
+        self._table.setRowCount(len(self._stats))
+        for r, s in enumerate(self._stats):
+            items = [
+                s["car"],
+                str(s["sessions"]),
+                format_time(s["best_ms"]),
+                format_time(s["median_ms"]),
+                format_time(s["p90_ms"]),
+                format_time(s["stddev_ms"]),
+                format_time(s["theoretical_best_ms"]),
+                f"{s['improvement_ms'] / 1000:+.3f}s" if s["sessions"] > 1 else "-",
+            ]
+            for col, text in enumerate(items):
+                item = QTableWidgetItem(text)
+                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
+                if col == 0:
+                    item.setToolTip(
+                        f"{s['laps']} vueltas - P10 {format_time(s['p10_ms'])}\n"
+                        f"Tendencia: {s['trend_ms_per_day']:+.1f} ms/dia"
+                    )
+                self._table.setItem(r, col, item)
+
+        laps = sum(s["laps"] for s in self._stats)
+        self._detail_label.setText(
+            f"{laps} vueltas en el periodo ({self._data.num_races} carreras guardadas)"
+            if self._stats
+            else "Sin carreras guardadas en el periodo"
+        )
+
+    def _on_row_selected(self, row, col, prev_row, prev_col):
+        if row < 0 or row >= len(self._stats):
+            return
+        car = self._stats[row]["car"]
+        sessions = self._data.sessions(car, self._since)[-LAST_SESSIONS:]
+        parts = [f"{s['date']}: {format_time(s['best_ms'])}" for s in sessions]
+        self._detail_label.setText(f"{car} - ultimas sesiones: {' | '.join(parts)}")
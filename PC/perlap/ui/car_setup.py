@@ -4,11 +4,14 @@ from PySide6.QtCore import Qt, Signal
 from PySide6.QtGui import QColor
 import numpy as np
 
+from ..models.car import UNSAMPLED_HSV_LOWER, UNSAMPLED_HSV_UPPER
+
 
 class CarSetupDialog(QDialog):
     car_registered = Signal(int, str, np.ndarray, np.ndarray, tuple)
+    calibrate_requested = Signal(int)  # slot: read TCS3200 color on the LapTimer
 
-    def __init__(self, max_cars: int = 6, parent=None):
+    def __init__(self, max_cars: int = 6, parent=None, hardware: bool = False):
         super().__init__(parent)
         self.setWindowTitle("Registrar Auto")
         self.setMinimumWidth(300)
@@ -28,7 +31,8 @@ class CarSetupDialog(QDialog):
         self._name_edit.setMaxLength(12)
         layout.addWidget(self._name_edit)
 
-        layout.addWidget(QLabel("Color (clic en el video para muestrear):"))
+        self._color_label = QLabel("Color (clic en el video para muestrear):")
+        layout.addWidget(self._color_label)
         self._color_preview = QFrame()
         self._color_preview.setFixedHeight(30)
         self._color_preview.setStyleSheet("background-color: #555; border: 1px solid #888;")
@@ -40,12 +44,27 @@ class CarSetupDialog(QDialog):
         )
         layout.addWidget(self._sample_btn)
 
+        # LapTimer v2: the car is identified by the TCS3200, not by the video
+        self._hardware = hardware
+        self._hw_cal_btn = QPushButton("Registrar y leer color del sensor")
+        self._hw_cal_btn.setStyleSheet(
+            "background-color: #444; padding: 8px; border: 1px solid #666;"
+        )
+        self._hw_cal_btn.setToolTip("Coloca el auto bajo el sensor TCS3200 antes de pulsar")
+        layout.addWidget(self._hw_cal_btn)
+        if hardware:
+            self._color_preview.setVisible(False)
+            self._sample_btn.setVisible(False)
+            self._color_label.setText("Color: sensor TCS3200 del LapTimer")
+        else:
+            self._hw_cal_btn.setVisible(False)
+
         btn_layout = QHBoxLayout()
         self._ok_btn = QPushButton("Registrar")
         self._ok_btn.setStyleSheet(
             "background-color: #2d5a2d; padding: 8px; border: 1px solid #4a4a4a;"
         )
-        self._ok_btn.setEnabled(False)
+        self._ok_btn.setEnabled(hardware)
         self._cancel_btn = QPushButton("Cancelar")
         self._cancel_btn.setStyleSheet(
             "background-color: #5a2d2d; padding: 8px; border: 1px solid #4a4a4a;"
@@ -61,6 +80,7 @@ class CarSetupDialog(QDialog):
         self._ok_btn.clicked.connect(self._on_ok)
         self._cancel_btn.clicked.connect(self.reject)
         self._sample_btn.clicked.connect(self._on_sample)
+        self._hw_cal_btn.clicked.connect(self._on_hw_calibrate)
 
     @property
     def wants_sample(self) -> bool:
@@ -89,9 +109,23 @@ class CarSetupDialog(QDialog):
         if not name:
             return
         slot = self._slot_combo.currentData()
+        if self._hardware and self._hsv_lower is None:
+            self.car_registered.emit(
+                slot, name, UNSAMPLED_HSV_LOWER, UNSAMPLED_HSV_UPPER, self._display_color
+            )
+            self.accept()
+            return
         if self._hsv_lower is None:
             return
         self.car_registered.emit(
             slot, name, self._hsv_lower, self._hsv_upper, self._display_color
         )
         self.accept()
+
+    def _on_hw_calibrate(self):
+        if not self._name_edit.text().strip():
+            return
+        slot = self._slot_combo.currentData()
+        self._on_ok()
+        # REG is queued before CAL, so the firmware slot exists when CAL runs
+        self.calibrate_requested.emit(slot)
@@ -0,0 +1,176 @@
+import time
+from typing import Callable
+
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QWidget,
+                               QTableWidget, QTableWidgetItem, QHeaderView,
+                               QPushButton, QFileDialog)
+from PySide6.QtCore import Qt, QTimer, QRectF
+from PySide6.QtGui import QPainter, QColor
+
+from ..profiler import profiler
+
+REFRESH_MS = 1000
+COLUMNS = ["Etapa", "Muestras", "p50", "p95", "p99", "Max"]  # times in ms
+
+
+class HistogramWidget(QWidget):
+    """Bars of a latency histogram (log-spaced bins)."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setMinimumHeight(120)
+        self._counts = []
+        self._edges = []
+
+    def set_data(self, counts, edges):
+        self._counts = list(counts)
+        self._edges = list(edges)
+        self.update()
+
+    def paintEvent(self, event):
+        p = QPainter(self)
+        p.fillRect(self.rect(), QColor("#222"))
+        if not self._counts or not max(self._counts):
+            p.setPen(QColor("#888"))
+            p.drawText(self.rect(), Qt.AlignmentFlag.AlignCenter, "Sin muestras")
+            return
+        top, bottom = 6, self.height() - 18
+        bar_w = self.width() / len(self._counts)
+        peak = max(self._counts)
+        p.setPen(Qt.PenStyle.NoPen)
+        p.setBrush(QColor("#4a9"))
+        for i, n in enumerate(self._counts):
+            if n:
+                h = max(1.0, (bottom - top) * n / peak)
+                p.drawRect(QRectF(i * bar_w + 1, bottom - h, bar_w - 2, h))
+        # Bin edges: every 4th label
+        p.setPen(QColor("#aaa"))
+        for i in range(0, len(self._edges), 4):
+            ms = self._edges[i]
+            text = f"{ms * 1000:.0f}us" if ms < 1 else f"{ms:g}ms"
+            p.drawText(int(i * bar_w), self.height() - 4, text)
+
+
+class DiagnosticsDialog(QDialog):
+    """Latency per pipeline stage (p50/p95/p99) and Chrome trace export.
+
+    ``extra`` gives summaries measured in other processes (multi-camera
+    workers) as (label, ``profiler.summary()`` rows).
+    """
+
+    def __init__(self, extra: Callable[[], list[tuple[str, list[dict]]]] = lambda: [],
+                 parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Diagnostico")
+        self.setMinimumSize(620, 480)
+        self.setStyleSheet("background-color: #2a2a2a; color: white;")
+        self._extra = extra
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(
+            "Tiempo de cada etapa en ms, sobre las ultimas muestras de cada una.\n"
+            "Elige una fila para ver su histograma."
+        ))
+
+        self._table = QTableWidget()
+        self._table.setColumnCount(len(COLUMNS))
+        self._table.setHorizontalHeaderLabels(COLUMNS)
+        self._table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self._table.horizontalHeader().setSectionResizeMode(
+            0, QHeaderView.ResizeMode.ResizeToContents)
+        self._table.verticalHeader().setVisible(False)
+        self._table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
+        self._table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
+        self._table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self._table.setStyleSheet("""
+            QTableWidget { background-color: #2a2a2a; color: white; gridline-color: #444; }
+            QHeaderView::section { background-color: #333; color: #ccc; padding: 4px; }
+        """)
+        self._table.currentCellChanged.connect(lambda *_: self._refresh_histogram())
+        layout.addWidget(self._table, 1)
+
+        self._histogram = HistogramWidget()
+        layout.addWidget(self._histogram)
+
+        self._status = QLabel("")
+        self._status.setStyleSheet("color: #aaa;")
+        layout.addWidget(self._status)
+
+        btn_layout = QHBoxLayout()
+        export_btn = QPushButton("Exportar traza...")
+        export_btn.setToolTip("Guardar las etapas en formato Chrome trace "
+                              "(chrome://tracing o ui.perfetto.dev)")
+        export_btn.clicked.connect(self._on_export)
+        reset_btn = QPushButton("Reiniciar")
+        reset_btn.clicked.connect(self._on_reset)
+        close_btn = QPushButton("Cerrar")
+        close_btn.clicked.connect(self.close)
+        for btn in (export_btn, reset_btn, close_btn):
+            btn.setStyleSheet("background: #333; color: white; padding: 6px 12px;")
+            btn_layout.addWidget(btn)
+        layout.addLayout(btn_layout)
+
+        self._timer = QTimer(self)
+        self._timer.setInterval(REFRESH_MS)
+        self._timer.timeout.connect(self.refresh)
+
+    def refresh(self):
+        rows = [(r["stage"], r) for r in profiler.summary()]
+        for label, summary in self._extra():
+            rows += [(f"{label}: {r['stage']}", r) for r in summary]
+
+        selected = self._selected_stage()
+        self._table.setRowCount(len(rows))
+        for i, (name, r) in enumerate(rows):
+            values = [name, str(r["count"])] + [
+                f"{r[k]:.3f}" for k in ("p50_ms", "p95_ms", "p99_ms", "max_ms")]
+            for col, text in enumerate(values):
+                item = QTableWidgetItem(text)
+                if col == 0:
+                    own = name == r["stage"]  # histograms only for stages of this process
+                    item.setData(Qt.ItemDataRole.UserRole, r["stage"] if own else "")
+                else:
+                    item.setTextAlignment(Qt.AlignmentFlag.AlignRight
+                                          | Qt.AlignmentFlag.AlignVCenter)
+                self._table.setItem(i, col, item)
+            if name == selected:
+                self._table.selectRow(i)
+        self._refresh_histogram()
+
+    def _selected_stage(self) -> str:
+        item = self._table.item(self._table.currentRow(), 0)
+        return item.text() if item is not None else ""
+
+    def _refresh_histogram(self):
+        item = self._table.item(self._table.currentRow(), 0)
+        stage = item.data(Qt.ItemDataRole.UserRole) if item is not None else ""
+        if stage:
+            self._histogram.set_data(*profiler.histogram(stage))
+        else:
+            self._histogram.set_data([], [])
+
+    def _on_export(self):
+        path, _ = QFileDialog.getSaveFileName(
+            self, "Exportar traza", time.strftime("perlap-traza_%Y-%m-%d_%H-%M-%S.json"),
+            "Chrome trace (*.json)")
+        if not path:
+            return
+        try:
+            spans = profiler.export_chrome_trace(path)
+        except OSError as e:
+            self._status.setText(f"No se pudo guardar: {e}")
+            return
+        self._status.setText(f"{spans} mediciones guardadas en {path}")
+
+    def _on_reset(self):
+        profiler.reset()
+        self.refresh()
+
+    def showEvent(self, event):
+        self.refresh()
+        self._timer.start()
+        super().showEvent(event)
+
+    def hideEvent(self, event):
+        self._timer.stop()
+        super().hideEvent(event)
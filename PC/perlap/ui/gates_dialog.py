@@ -0,0 +1,86 @@
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel,
+                               QPushButton, QComboBox, QGridLayout)
+from PySide6.QtCore import Signal
+
+from ..detection.gates import GateConfig, FINISH_GATE, MAX_SECTOR_GATES
+
+
+class GatesDialog(QDialog):
+    """Assigns a serial port to the finish line and to each sector gate."""
+
+    gates_configured = Signal(list)  # [GateConfig]
+
+    def __init__(self, ports: list[tuple[str, str]], gates: list[GateConfig], parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Puertas de cronometraje")
+        self.setMinimumWidth(360)
+        self.setStyleSheet("background-color: #2a2a2a; color: white;")
+
+        layout = QVBoxLayout(self)
+        layout.addWidget(QLabel(
+            "Un Arduino LaserLapTimer por puerta.\n"
+            "Las puertas intermedias dividen la vuelta en sectores."
+        ))
+
+        current = {g.gate: g.port for g in gates}
+        grid = QGridLayout()
+        self._combos: dict[int, QComboBox] = {}
+        for row, gate in enumerate(range(MAX_SECTOR_GATES + 1)):
+            label = "Meta" if gate == FINISH_GATE else f"Sector {gate}"
+            grid.addWidget(QLabel(label), row, 0)
+            combo = QComboBox()
+            combo.setStyleSheet("background: #444; color: white; padding: 4px;")
+            combo.addItem("(sin puerta)", "")
+            for device, desc in ports:
+                combo.addItem(f"{device} - {desc}", device)
+            port = current.get(gate, "")
+            if port and combo.findData(port) < 0:
+                combo.addItem(f"{port} (no conectado)", port)
+            combo.setCurrentIndex(max(0, combo.findData(port)))
+            grid.addWidget(combo, row, 1)
+            self._combos[gate] = combo
+        layout.addLayout(grid)
+
+        self._error_label = QLabel("")
+        self._error_label.setStyleSheet("color: #f66;")
+        layout.addWidget(self._error_label)
+
+        btn_layout = QHBoxLayout()
+        ok_btn = QPushButton("Aceptar")
+        ok_btn.setStyleSheet(
+            "background-color: #2d5a2d; padding: 8px; border: 1px solid #4a4a4a;"
+        )
+        ok_btn.clicked.connect(self._on_accept)
+        cancel_btn = QPushButton("Cancelar")
+        cancel_btn.setStyleSheet(
+            "background-color: #5a2d2d; padding: 8px; border: 1px solid #4a4a4a;"
+        )
+        cancel_btn.clicked.connect(self.reject)
+        btn_layout.addWidget(ok_btn)
+        btn_layout.addWidget(cancel_btn)
+        layout.addLayout(btn_layout)
+
+    def _on_accept(self):
+        gates = []
+        used = set()
+        for gate, combo in self._combos.items():
+            port = combo.currentData()
+            if not port:
+                continue
+            if port in used:
+                self._error_label.setText(f"{port} asignado a mas de una puerta")
+                return
+            used.add(port)
+            gates.append(GateConfig(port, gate))
+
+        # Sectors are numbered by position: gates must be consecutive from 1
+        sectors = sorted(g.gate for g in gates if g.gate != FINISH_GATE)
+        if sectors != list(range(1, len(sectors) + 1)):
+            self._error_label.setText("Asigna los sectores en orden (1, 2, 3)")
+            return
+        if sectors and not any(g.gate == FINISH_GATE for g in gates):
+            self._error_label.setText("Los sectores necesitan una puerta de meta")
+            return
+
+        self.gates_configured.emit(gates)
+        self.accept()
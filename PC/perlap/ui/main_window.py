@@ -1,23 +1,38 @@
-import json
 import os
+import time
+from functools import partial
 
 from PySide6.QtWidgets import (QMainWindow, QWidget, QHBoxLayout, QVBoxLayout,
                                QPushButton, QToolBar, QStatusBar, QMessageBox,
                                QSplitter, QTabWidget, QComboBox, QLabel,
                                QStackedWidget, QSlider, QSpinBox)
-from PySide6.QtCore import Qt, QTimer
+from PySide6.QtCore import Qt, QTimer, Signal
 from PySide6.QtGui import QImage, QAction
 import numpy as np
 import cv2
 
+from ..config import CONFIG_PATH, Config, ConfigStore
 from ..models.race import RaceManager, MAX_CARS
 from ..models.race_log import RaceLog
 from ..models.time_trial import TimeTrial
+from ..models.ranking_store import RankingStore
 from ..models.events import LapEvent, EventType
-from ..detection.camera import CameraSource, DEFAULT_MIN_PIXEL_COUNT
+from ..timefmt import format_event
+from ..models.event_bus import (EventBus, SOURCE_CAMERA, SOURCE_ARDUINO, SOURCE_FUSION,
+                                SOURCE_GATES)
+from ..models.timing_thread import TimingThread, TimingBatch
+from ..detection.camera import DEFAULT_MIN_PIXEL_COUNT
 from ..detection.finish_line import FinishLine
 from ..detection.color_id import ColorCalibrator, SENSITIVITY_PRESETS, DEFAULT_SENSITIVITY
-from ..detection.arduino import ArduinoSource
+from ..detection.arduino import PROTOCOL_LAPTIMER_V2, STATE_BACKOFF, STATE_WAIT_READY
+from ..detection.fusion import DEFAULT_FUSION_WINDOW_MS
+from ..detection.gates import FINISH_GATE
+from ..detection.multicam import MultiCameraReader, format_camera_stats
+from ..detection.replay import ReplaySource
+from ..net.live_server import LiveServer
+from ..net.nodes import NodeServer
+from ..profiler import profiler
+from .sources import CameraSource, ArduinoSource, GateSource
 from .video_widget import VideoWidget
 from .standings import StandingsWidget, format_time
 from .car_setup import CarSetupDialog
@@ -25,18 +40,29 @@ from .race_view import RaceViewWidget
 from .time_trial_widget import TimeTrialWidget
 from .ranking_widget import RankingWidget
 from .arduino_widget import ArduinoCalibrationWidget
-
-CONFIG_PATH = os.path.join(os.path.dirname(os.path.dirname(os.path.dirname(__file__))),
-                           "config.json")
+from .gates_dialog import GatesDialog
+from .analytics_widget import AnalyticsWidget
+from .replay_bar import ReplayBar
+from .race_picker import RacePickerDialog
+from .diagnostics import DiagnosticsDialog
 
 MODE_RACE = 0
 MODE_TIME_TRIAL = 1
 
-SOURCE_CAMERA = "CAMERA"
-SOURCE_ARDUINO = "ARDUINO"
+SOURCE_NAMES = {
+    SOURCE_CAMERA: "Camara USB",
+    SOURCE_ARDUINO: "Arduino Laser",
+    SOURCE_FUSION: "Camara + Laser",
+    SOURCE_GATES: "Puertas (sectores)",
+}
+
+UI_REFRESH_MS = 33  # the UI picks up timing results about 30 times a second
+
+_FRAME_LATENCY = profiler.stage("ui.frame_latency")  # grab -> frame on the GUI thread
 
 
 class MainWindow(QMainWindow):
+    _ranking_saved = Signal(object)  # Future from the ranking store's writer thread
 
     def __init__(self, race_manager: RaceManager, camera_source: CameraSource,
                  arduino_source: ArduinoSource | None = None):
@@ -48,8 +74,11 @@ class MainWindow(QMainWindow):
         self._race = race_manager
         self._camera = camera_source
         self._arduino = arduino_source or ArduinoSource()
+        self._gates = GateSource()
+        self._gates_connected: set[int] = set()
         self._race_log = RaceLog()
-        self._time_trial = TimeTrial()
+        self._ranking = RankingStore()
+        self._time_trial = TimeTrial(ranking=self._ranking)
         self._finish_line = FinishLine()
         self._fl_points: list[tuple[int, int]] = []
         self._last_frame_bgr: np.ndarray | None = None
@@ -58,6 +87,23 @@ class MainWindow(QMainWindow):
         self._racing = False
         self._mode = MODE_RACE
         self._detection_source = SOURCE_CAMERA
+        # Detections go straight from the source threads onto the bus; the
+        # timing thread owns the race, the time trial, the log and the fuser
+        self._bus = EventBus()
+        self._timing = TimingThread(race_manager, self._time_trial, self._race_log, self._bus)
+        self._replay: ReplaySource | None = None
+        self._replay_events: list[LapEvent] = []
+        self._live_race = race_manager  # self._race while a replay runs on its own
+        # Scoreboards/overlays on the LAN (config.json "live_port", 0 = off)
+        self._live_port = 0
+        self._live_multicast = ""
+        self._live: LiveServer | None = None
+        # Remote cameras/lasers (config.json "node_port", 0 = off) feed the same bus
+        self._node_port = 0
+        self._nodes: NodeServer | None = None
+        self._config_store = ConfigStore(CONFIG_PATH)
+        self._diagnostics: DiagnosticsDialog | None = None
+        self._config_extra: dict = {}  # config.json keys of newer versions, kept as read
 
         self._setup_ui()
         self._setup_toolbar()
@@ -69,6 +115,13 @@ class MainWindow(QMainWindow):
         self._fps_timer.timeout.connect(self._update_fps)
         self._fps_timer.start(1000)
 
+        self._timing.start()
+        self._ui_timer = QTimer()
+        self._ui_timer.timeout.connect(self._refresh_timing)
+        self._ui_timer.start(UI_REFRESH_MS)
+
+        QTimer.singleShot(0, self._check_unfinished_races)
+
     # -----------------------------------------------------------
     # UI Setup
     # -----------------------------------------------------------
@@ -109,7 +162,22 @@ class MainWindow(QMainWindow):
         self._race_view = RaceViewWidget()
         self._race_tabs.addTab(self._race_view, "Tiempos")
 
-        self._right_stack.addWidget(self._race_tabs)
+        self._analytics = AnalyticsWidget()
+        self._race_tabs.addTab(self._analytics, "Historial")
+        self._race_tabs.currentChanged.connect(self._on_race_tab_changed)
+
+        race_page = QWidget()
+        race_layout = QVBoxLayout(race_page)
+        race_layout.setContentsMargins(0, 0, 0, 0)
+        self._replay_bar = ReplayBar()
+        self._replay_bar.setVisible(False)
+        self._replay_bar.play_toggled.connect(self._on_replay_play_toggled)
+        self._replay_bar.speed_changed.connect(self._on_replay_speed_changed)
+        self._replay_bar.seek_requested.connect(self._on_replay_seek)
+        self._replay_bar.close_requested.connect(self._stop_replay)
+        race_layout.addWidget(self._replay_bar)
+        race_layout.addWidget(self._race_tabs)
+        self._right_stack.addWidget(race_page)
 
         # --- Page 1: Time trial tabs ---
         self._tt_tabs = QTabWidget()
@@ -122,7 +190,9 @@ class MainWindow(QMainWindow):
         self._tt_widget = TimeTrialWidget(total_laps=5)
         self._tt_tabs.addTab(self._tt_widget, "Contrarreloj")
 
-        self._ranking_widget = RankingWidget()
+        self._ranking_widget = RankingWidget(self._ranking, self._time_trial.total_laps,
+                                             self._time_trial.track)
+        self._ranking_widget.track_changed.connect(self._on_ranking_track_changed)
         self._tt_tabs.addTab(self._ranking_widget, "Ranking")
 
         self._right_stack.addWidget(self._tt_tabs)
@@ -147,11 +217,36 @@ class MainWindow(QMainWindow):
         # Source selector
         toolbar.addWidget(QLabel(" Fuente: "))
         self._source_combo = QComboBox()
-        self._source_combo.addItem("Camara USB", SOURCE_CAMERA)
-        self._source_combo.addItem("Arduino Laser", SOURCE_ARDUINO)
+        for source, name in SOURCE_NAMES.items():
+            self._source_combo.addItem(name, source)
         self._source_combo.currentIndexChanged.connect(self._on_source_changed)
         toolbar.addWidget(self._source_combo)
 
+        self._fusion_label = QLabel(" Ventana: ")
+        toolbar.addWidget(self._fusion_label)
+        self._fusion_spin = QSpinBox()
+        self._fusion_spin.setRange(20, 2000)
+        self._fusion_spin.setSingleStep(10)
+        self._fusion_spin.setSuffix(" ms")
+        self._fusion_spin.setValue(DEFAULT_FUSION_WINDOW_MS)
+        self._fusion_spin.setToolTip(
+            "Distancia maxima entre el corte del laser y la deteccion de color"
+        )
+        self._fusion_spin.setStyleSheet(
+            "QSpinBox { background: #444; color: white; padding: 2px 4px; "
+            "border: 1px solid #666; min-width: 60px; }"
+        )
+        self._fusion_spin.valueChanged.connect(self._on_fusion_window_changed)
+        toolbar.addWidget(self._fusion_spin)
+        self._fusion_controls = [self._fusion_label, self._fusion_spin]
+        for w in self._fusion_controls:
+            w.setVisible(False)
+
+        self._btn_gates = QPushButton("Puertas...")
+        self._btn_gates.clicked.connect(self._on_configure_gates)
+        self._btn_gates_action = toolbar.addWidget(self._btn_gates)
+        self._btn_gates_action.setVisible(False)
+
         toolbar.addSeparator()
 
         # Mode selector
@@ -188,14 +283,24 @@ class MainWindow(QMainWindow):
         self._btn_reset.clicked.connect(self._on_reset)
         toolbar.addWidget(self._btn_reset)
 
+        self._btn_replay = QPushButton("Repetición...")
+        self._btn_replay.setToolTip("Reproducir una carrera guardada")
+        self._btn_replay.clicked.connect(self._on_open_replay)
+        toolbar.addWidget(self._btn_replay)
+
+        btn_diag = QPushButton("Diagnostico")
+        btn_diag.setToolTip("Tiempo de cada etapa de la deteccion y exportar traza")
+        btn_diag.clicked.connect(self._on_diagnostics)
+        toolbar.addWidget(btn_diag)
+
         toolbar.addSeparator()
 
         # --- Camera-specific controls ---
         self._cam_label = QLabel(" Camara: ")
         toolbar.addWidget(self._cam_label)
         self._cam_combo = QComboBox()
-        for i in range(5):
-            self._cam_combo.addItem(f"Dispositivo {i}", i)
+        for i, name in enumerate(self._camera.device_names()):
+            self._cam_combo.addItem(name, i)
         self._cam_combo.currentIndexChanged.connect(self._on_camera_changed)
         toolbar.addWidget(self._cam_combo)
 
@@ -250,28 +355,43 @@ class MainWindow(QMainWindow):
         self.setStatusBar(self._status)
         self._fps_label = QLabel("FPS: --")
         self._source_label = QLabel("Fuente: Camara USB")
-        self._cars_label = QLabel("Autos: 0/6")
+        self._cars_label = QLabel(f"Autos: 0/{MAX_CARS}")
         self._mode_label = QLabel("Modo: Carrera")
         self._status.addWidget(self._source_label)
         self._status.addWidget(self._fps_label)
         self._status.addWidget(self._mode_label)
+        self._live_label = QLabel()
+        self._live_label.setVisible(False)
+        self._status.addPermanentWidget(self._live_label)
+        self._nodes_label = QLabel()
+        self._nodes_label.setVisible(False)
+        self._status.addPermanentWidget(self._nodes_label)
         self._status.addPermanentWidget(self._cars_label)
 
     def _connect_signals(self):
+        # Detections: the reader hooks put them straight onto the bus from the
+        # reader threads, without going through Qt
+        bus = self._bus
+        camera, arduino = self._camera.reader, self._arduino.reader
+        camera.crossing_detected.connect(partial(bus.crossing, SOURCE_CAMERA))
+        if isinstance(camera, MultiCameraReader):
+            # Cameras on other lines (pit lane...) time intermediate sectors
+            camera.gate_crossing.connect(partial(bus.gate_crossing, SOURCE_CAMERA))
+        arduino.crossing_detected.connect(partial(bus.crossing, SOURCE_ARDUINO))
+        arduino.device_start.connect(partial(bus.device_start, SOURCE_ARDUINO))
+        arduino.device_lap.connect(partial(bus.device_lap, SOURCE_ARDUINO))
+        self._gates.reader.gate_crossing.connect(partial(bus.gate_crossing, SOURCE_GATES))
+
         # Camera signals
         self._camera.frame_ready.connect(self._on_frame)
-        self._camera.crossing_detected.connect(
-            lambda car_id: self._on_crossing(car_id, "CAMERA")
-        )
+        self._camera.device_changed.connect(self._on_camera_device)
         self._video.finish_line_point.connect(self._on_fl_point)
         self._video.color_sample_point.connect(self._on_color_sample)
         self._tt_widget.name_submitted.connect(self._on_tt_name_submitted)
+        self._ranking_saved.connect(self._on_ranking_saved)
         self._tt_widget.trial_reset.connect(self._on_tt_reset)
 
         # Arduino signals
-        self._arduino.crossing_detected.connect(
-            lambda car_id: self._on_crossing(car_id, "ARDUINO")
-        )
         self._arduino.ldr_value.connect(self._arduino_widget.update_ldr)
         self._arduino.connection_changed.connect(self._on_arduino_connection)
         self._arduino.threshold_changed.connect(
@@ -281,6 +401,11 @@ class MainWindow(QMainWindow):
         self._arduino.error_occurred.connect(
             lambda msg: self._status.showMessage(f"Arduino: {msg}", 5000)
         )
+        self._arduino.state_changed.connect(self._on_arduino_state)
+        self._arduino.ports_changed.connect(
+            lambda ports: self._arduino_widget.update_ports(ports, self._arduino.port)
+        )
+        self._arduino.port_reassigned.connect(self._on_arduino_port_reassigned)
 
         # Arduino widget signals
         self._arduino_widget.threshold_changed.connect(self._arduino.set_threshold)
@@ -292,54 +417,136 @@ class MainWindow(QMainWindow):
 
         self._arduino.test_result.connect(self._arduino_widget.show_test_result)
 
+        # LapTimer v2 (multi-car firmware)
+        self._arduino.protocol_detected.connect(self._on_arduino_protocol)
+        self._arduino.car_registered.connect(
+            lambda car_id, name: self._status.showMessage(
+                f"LapTimer: {name} registrado (slot {car_id})", 3000)
+        )
+        self._arduino.car_calibrated.connect(
+            lambda car_id, r, g, b: self._status.showMessage(
+                f"LapTimer: color de {self._live_race.cars[car_id].name} "
+                f"R{r} G{g} B{b}", 5000)
+        )
+        self._arduino.status_received.connect(
+            lambda st: self._status.showMessage(
+                f"LapTimer: {st.get('name', '?')} - {st.get('laps', 0)} vueltas", 3000)
+        )
+
+        # Timing gates (sector splits)
+        self._gates.gate_connection.connect(self._on_gate_connection)
+        self._gates.error_occurred.connect(
+            lambda msg: self._status.showMessage(msg, 5000)
+        )
+
     # -----------------------------------------------------------
     # Detection source switching
     # -----------------------------------------------------------
 
     def _on_source_changed(self, index: int):
-        source = self._source_combo.currentData()
-        self._detection_source = source
+        self._apply_source(self._source_combo.currentData())
+        self._save_config()
 
-        if source == SOURCE_ARDUINO:
-            self._camera.stop()
-            self._left_stack.setCurrentIndex(1)
-            self._source_label.setText("Fuente: Arduino Laser")
-
-            # Hide camera controls
-            for w in self._camera_controls:
-                w.setVisible(False)
-
-            # Refresh ports and start Arduino
-            self._refresh_arduino_ports()
-            port = self._arduino_widget.selected_port
-            if port:
-                self._arduino.port = port
+    def _apply_source(self, source: str):
+        self._detection_source = source
+        use_camera = source in (SOURCE_CAMERA, SOURCE_FUSION)
+        use_arduino = source in (SOURCE_ARDUINO, SOURCE_FUSION)
+        use_gates = source == SOURCE_GATES
+
+        if use_arduino:
+            if not self._arduino.isRunning():
+                # Refresh ports and start Arduino; with no port yet the source's
+                # port watcher picks the Arduino up when it is plugged in
+                self._refresh_arduino_ports()
+                port = self._arduino_widget.selected_port
+                if port:
+                    self._arduino.port = port
                 self._arduino.start()
                 self._arduino.set_streaming(True)
+        elif self._arduino.isRunning():
+            self._arduino.set_streaming(False)
+            self._arduino.stop()
+
+        if use_gates:
+            if not self._gates.isRunning():
+                self._gates.start()
+        elif self._gates.isRunning():
+            self._gates.stop()
+            self._gates_connected.clear()
+        self._apply_sector_gates()
+
+        if use_camera:
+            if not self._camera.isRunning():
+                self._camera.start()
         else:
-            # Stop Arduino
-            if self._arduino.isRunning():
-                self._arduino.set_streaming(False)
-                self._arduino.stop()
+            self._camera.stop()
 
-            self._left_stack.setCurrentIndex(0)
-            self._source_label.setText("Fuente: Camara USB")
+        self._left_stack.setCurrentIndex(1 if source == SOURCE_ARDUINO else 0)
+        self._source_label.setText(f"Fuente: {SOURCE_NAMES[source]}")
 
-            # Show camera controls
-            for w in self._camera_controls:
-                w.setVisible(True)
+        # Camera-only controls; LapTimer v2 registers cars on the device
+        for w in self._camera_controls:
+            w.setVisible(use_camera)
+        if not use_camera:
+            self._btn_register.setVisible(self._arduino.protocol == PROTOCOL_LAPTIMER_V2)
+        for w in self._fusion_controls:
+            w.setVisible(source == SOURCE_FUSION)
+        self._btn_gates_action.setVisible(use_gates)
 
-            self._camera.start()
+        with self._timing.lock:
+            self._timing.fuser.reset()
+            self._timing.fusion = source == SOURCE_FUSION
+
+    # --- Timing gates ---
+
+    def _on_configure_gates(self):
+        if self._racing:
+            QMessageBox.warning(self, "Carrera en curso",
+                                "Finaliza la carrera antes de cambiar las puertas.")
+            return
+        dialog = GatesDialog(ArduinoSource.list_ports(), self._gates.gates, self)
+        dialog.gates_configured.connect(self._on_gates_configured)
+        dialog.exec()
 
+    def _on_gates_configured(self, gates: list):
+        self._gates.set_gates(gates)
+        self._apply_sector_gates()
         self._save_config()
 
+    def _apply_sector_gates(self):
+        if self._detection_source == SOURCE_GATES:
+            sectors = self._gates.sector_gate_count
+        elif self._detection_source in (SOURCE_CAMERA, SOURCE_FUSION):
+            sectors = self._camera.sector_gate_count
+        else:
+            sectors = 0
+        changed = sectors + 1 != self._live_race.sector_count
+        if changed:
+            with self._timing.lock:
+                self._live_race.set_sector_gates(sectors)
+        if self._replay is None:
+            if changed:
+                self._standings.update_standings(self._race_standings())
+            self._race_view.set_sectors_visible(sectors > 0)
+
+    def _on_gate_connection(self, gate: int, connected: bool):
+        if connected:
+            self._gates_connected.add(gate)
+        else:
+            self._gates_connected.discard(gate)
+        label = "Meta" if gate == FINISH_GATE else f"S{gate}"
+        state = "conectada" if connected else "desconectada"
+        self._status.showMessage(
+            f"Puerta {label} {state} ({len(self._gates_connected)}/{len(self._gates.gates)})",
+            3000)
+
     def _on_arduino_port_changed(self, port: str):
         was_running = self._arduino.isRunning()
         if was_running:
             self._arduino.set_streaming(False)
             self._arduino.stop()
         self._arduino.port = port
-        if self._detection_source == SOURCE_ARDUINO and port:
+        if self._detection_source in (SOURCE_ARDUINO, SOURCE_FUSION) and port:
             self._arduino.start()
             self._arduino.set_streaming(True)
         self._save_config()
@@ -351,6 +558,27 @@ class MainWindow(QMainWindow):
         else:
             self._status.showMessage("Arduino desconectado", 3000)
 
+    def _on_arduino_state(self, state: str):
+        if state == STATE_WAIT_READY:
+            self._status.showMessage("Arduino: esperando READY...", 3000)
+        elif state == STATE_BACKOFF:
+            self._status.showMessage("Arduino: reconectando...", 3000)
+
+    def _on_arduino_port_reassigned(self, port: str):
+        # Chosen by the source itself (hot-plug): just reflect it
+        self._arduino_widget.update_ports(ArduinoSource.list_ports(), port)
+        self._status.showMessage(f"Arduino en {port}", 3000)
+        self._save_config()
+
+    def _on_arduino_protocol(self, protocol: str):
+        if self._detection_source != SOURCE_ARDUINO:
+            return
+        v2 = protocol == PROTOCOL_LAPTIMER_V2
+        self._btn_register.setVisible(v2)
+        self._source_label.setText(
+            "Fuente: Arduino LapTimer v2" if v2 else "Fuente: Arduino Laser"
+        )
+
     def _refresh_arduino_ports(self):
         ports = ArduinoSource.list_ports()
         current = self._arduino.port
@@ -368,27 +596,33 @@ class MainWindow(QMainWindow):
 
     def _on_mode_changed(self, index: int):
         self._mode = self._mode_combo.currentData()
+        self._timing.time_trial_mode = self._mode == MODE_TIME_TRIAL
         self._right_stack.setCurrentIndex(self._mode)
 
         if self._mode == MODE_RACE:
             self._btn_race.setText("Iniciar Carrera")
             self._btn_race.setVisible(True)
             self._btn_reset.setVisible(True)
+            self._btn_replay.setVisible(True)
             self._mode_label.setText("Modo: Carrera")
         else:
             self._btn_race.setVisible(False)
             self._btn_reset.setVisible(False)
+            self._btn_replay.setVisible(False)
+            self._stop_replay()
             self._mode_label.setText("Modo: Contrarreloj")
             self._ranking_widget.refresh()
             if self._racing:
                 self._racing = False
-                self._race_log.end_race()
+                with self._timing.lock:
+                    self._race_log.end_race()
 
     # -----------------------------------------------------------
     # Frame handling
     # -----------------------------------------------------------
 
-    def _on_frame(self, image: QImage):
+    def _on_frame(self, image: QImage, t: float):
+        _FRAME_LATENCY.since(t)
         self._fps_count += 1
         self._video.update_frame(image)
 
@@ -399,90 +633,124 @@ class MainWindow(QMainWindow):
             self._last_frame_bgr = arr.copy()
 
     # -----------------------------------------------------------
-    # Crossing dispatch - routes to race or time trial
+    # Timing results - batched at the UI refresh rate
     # -----------------------------------------------------------
 
-    def _on_crossing(self, car_id: int, source: str):
-        if self._mode == MODE_TIME_TRIAL:
-            self._on_tt_crossing(car_id, source)
-        else:
-            self._on_race_crossing(car_id, source)
-
-    # --- Race mode crossing ---
+    # Sources stamp each crossing when they detect it and the timing thread
+    # times laps from that stamp, so however late the UI shows them does not matter
 
-    def _on_race_crossing(self, car_id: int, source: str):
-        event = self._race.process_crossing(car_id, source)
-        if event is None:
+    def _refresh_timing(self):
+        batch = self._timing.take()
+        if batch is None:
+            return
+        if batch.race_events and self._replay is None:
+            # Only live timing goes to the scoreboards, never a replay
+            if self._live is not None:
+                self._live.publish(batch.race_events, batch.standings)
+            self._show_race_events(batch.race_events, batch.standings)
+        if batch.trial_events:
+            self._show_trial_events(batch)
+
+    def _show_race_events(self, events: list[LapEvent], standings: list[dict]):
+        """One UI update for any number of race events."""
+        shown = []
+        for event in events:
+            if event.event == EventType.UNMATCHED:
+                self._status.showMessage(format_event(event), 3000)
+            else:
+                shown.append(event)
+        if not shown:
             return
 
-        if event.event == EventType.START:
-            self._standings.show_event(
-                f"START: {event.car_name} en pista"
-            )
-        elif event.event == EventType.LAP:
-            self._standings.show_event(
-                f"VUELTA {event.lap_number}: {event.car_name} - "
-                f"{format_time(event.lap_time_ms)}"
-            )
-            self._race_view.add_event(event)
-
-        if self._race_log.active:
-            self._race_log.record_event(event)
+        self._standings.show_event(format_event(shown[-1]))
+        laps = [e for e in shown if e.event == EventType.LAP]
+        self._race_view.add_events(laps)
+        for event in laps:
+            self._standings.show_position_changes(event.position_changes)
+        self._standings.update_standings(standings)
+
+    def _show_trial_events(self, batch: TimingBatch):
+        for event in batch.trial_events:
+            if event.event == EventType.UNMATCHED:
+                self._status.showMessage(format_event(event), 3000)
+            elif event.event == EventType.START:
+                self._tt_widget.on_start()
+            elif event.event == EventType.LAP:
+                self._tt_widget.on_lap(event.lap_number, event.lap_time_ms,
+                                       batch.trial_total_ms, event.best_lap_ms)
+        if batch.trial_finished:
+            self._tt_widget.on_finish(batch.trial_total_ms)
+
+    def _on_fusion_window_changed(self, value: int):
+        self._timing.fuser.window_ms = value
+        self._save_config()
 
-        self._standings.update_standings(self._race.get_standings())
+    def _on_race_tab_changed(self, index: int):
+        # Loaded when shown: only races saved since the last look are parsed
+        if self._race_tabs.widget(index) is self._analytics:
+            self._analytics.refresh()
 
-    # --- Time trial crossing ---
+    def _on_tt_name_submitted(self, player_name: str):
+        # Saved on the store's writer thread; the result comes back as a signal
+        with self._timing.lock:
+            future = self._time_trial.submit_to_ranking(player_name)
+        future.add_done_callback(self._ranking_saved.emit)
+        self._status.showMessage(f"Guardando {player_name}...", 2000)
 
-    def _on_tt_crossing(self, car_id: int, source: str):
-        event = self._time_trial.process_crossing(car_id, source)
-        if event is None:
+    def _on_ranking_saved(self, future):
+        try:
+            entry = future.result()
+        except Exception as e:
+            self._status.showMessage(f"Error al guardar en el ranking: {e}", 5000)
             return
-
-        if event.event == EventType.START:
-            self._tt_widget.on_start()
-        elif event.event == EventType.LAP:
-            self._tt_widget.on_lap(
-                event.lap_number,
-                event.lap_time_ms,
-                self._time_trial.total_time_ms,
-                self._time_trial.best_lap_ms,
-            )
-            if self._time_trial.finished:
-                self._tt_widget.on_finish(self._time_trial.total_time_ms)
-
-    def _on_tt_name_submitted(self, player_name: str):
-        entry = self._time_trial.submit_to_ranking(player_name)
         pos = entry.get("position", "?")
         total = format_time(entry["total_ms"])
+        pb = " - Mejor marca personal!" if entry.get("personal_best") else ""
         self._status.showMessage(
-            f"Guardado! {player_name} - {total} - Posicion #{pos}", 5000
+            f"Guardado! {entry['player']} - {total} - Posicion #{pos}{pb}", 5000
         )
-        self._ranking_widget.refresh()
-        self._ranking_widget.highlight_player(player_name)
+        self._ranking_widget.add_entry(entry)
         self._tt_tabs.setCurrentIndex(1)  # Switch to ranking tab
 
+    def _on_ranking_track_changed(self, track: str):
+        self._time_trial.track = track
+        self._save_config()
+
     def _on_tt_reset(self):
-        self._time_trial.reset()
+        with self._timing.lock:
+            self._time_trial.reset()
+            self._timing.discard()
 
     # -----------------------------------------------------------
     # Car registration
     # -----------------------------------------------------------
 
     def _on_register_car(self):
-        self._car_setup_dialog = CarSetupDialog(MAX_CARS, self)
+        hardware = self._detection_source == SOURCE_ARDUINO
+        self._car_setup_dialog = CarSetupDialog(MAX_CARS, self, hardware=hardware)
         self._car_setup_dialog.car_registered.connect(self._do_register_car)
-        self._car_setup_dialog._sample_btn.clicked.connect(
-            lambda: self._video.set_mode("color_sample")
-        )
+        if hardware:
+            self._car_setup_dialog.calibrate_requested.connect(self._arduino.calibrate_car)
+        else:
+            self._car_setup_dialog._sample_btn.clicked.connect(
+                lambda: self._video.set_mode("color_sample")
+            )
         self._car_setup_dialog.show()
 
     def _do_register_car(self, slot: int, name: str, hsv_lower: np.ndarray,
                          hsv_upper: np.ndarray, display_color: tuple):
-        self._race.register_car(slot, name, hsv_lower, hsv_upper, display_color)
+        existing = self._race.cars[slot]
+        if (hsv_lower > hsv_upper).any() and existing.active and existing.sampled:
+            # Registered on the LapTimer: keep the camera color sampled earlier
+            hsv_lower, hsv_upper = existing.hsv_lower, existing.hsv_upper
+            display_color = existing.display_color
+        with self._timing.lock:
+            self._race.register_car(slot, name, hsv_lower, hsv_upper, display_color)
         self._sync_cars_to_camera()
+        self._sync_cars_to_arduino()
         active = len(self._race.get_active_cars())
-        self._cars_label.setText(f"Autos: {active}/6")
-        self._standings.update_standings(self._race.get_standings())
+        self._cars_label.setText(f"Autos: {active}/{MAX_CARS}")
+        self._standings.update_standings(self._race_standings())
         self._save_config()
 
     def _on_color_sample(self, x: int, y: int):
@@ -522,7 +790,7 @@ class MainWindow(QMainWindow):
 
     def _on_toggle_race(self):
         if not self._racing:
-            if self._detection_source == SOURCE_CAMERA:
+            if self._detection_source in (SOURCE_CAMERA, SOURCE_FUSION):
                 active = self._race.get_active_cars()
                 if not active:
                     QMessageBox.warning(self, "Sin autos",
@@ -534,22 +802,26 @@ class MainWindow(QMainWindow):
                     return
 
             self._racing = True
-            self._race.reset()
-            self._race_view.clear()
-
             active = self._race.get_active_cars()
             car_names = {cid: car.name for cid, car in active} if active else {0: "AUTO"}
-            self._race_log.start_race(car_names)
+            with self._timing.lock:
+                self._race.reset()
+                self._race_log.start_race(car_names)
+                self._timing.discard()
+            self._standings.clear_position_changes()
+            self._reset_device_laps()
+            self._race_view.clear()
 
             self._btn_race.setText("Finalizar Carrera")
             self._btn_race.setStyleSheet(
                 "background-color: #5a2d2d; padding: 6px 12px; border: 1px solid #4a4a4a;"
             )
-            self._standings.update_standings(self._race.get_standings())
+            self._show_reset_standings()
             self._status.showMessage("Carrera iniciada", 3000)
         else:
             self._racing = False
-            path = self._race_log.end_race()
+            with self._timing.lock:
+                path = self._race_log.end_race()
             self._btn_race.setText("Iniciar Carrera")
             self._btn_race.setStyleSheet(
                 "background-color: #2d5a2d; padding: 6px 12px; border: 1px solid #4a4a4a;"
@@ -557,33 +829,246 @@ class MainWindow(QMainWindow):
             if path:
                 self._status.showMessage(f"Carrera guardada: {path}", 5000)
 
+    def _check_unfinished_races(self):
+        paths = RaceLog.find_incomplete()
+        if not paths:
+            return
+        # Only the latest can still be resumed; older ones are just summarized
+        for path in paths[:-1]:
+            self._finalize_race_log(path)
+        path = paths[-1]
+        answer = QMessageBox.question(
+            self, "Carrera sin terminar",
+            f"La carrera {os.path.basename(path)} no se cerro correctamente.\n"
+            "¿Continuarla? (No = guardarla como terminada)",
+        )
+        if answer == QMessageBox.StandardButton.Yes:
+            self._resume_race(path)
+        else:
+            self._finalize_race_log(path)
+
+    def _finalize_race_log(self, path: str):
+        try:
+            out = RaceLog.finalize(path)
+        except (OSError, ValueError) as e:
+            self._status.showMessage(f"No se pudo recuperar {path}: {e}", 5000)
+            return
+        self._status.showMessage(f"Carrera recuperada: {out}", 5000)
+
+    def _resume_race(self, path: str):
+        self._mode_combo.setCurrentIndex(self._mode_combo.findData(MODE_RACE))
+        with self._timing.lock:
+            try:
+                events = self._race_log.resume(path)
+            except (OSError, ValueError) as e:
+                self._status.showMessage(f"No se pudo recuperar {path}: {e}", 5000)
+                return
+            self._race.restore(events, RaceLog.elapsed_ms(path))
+            self._timing.discard()
+        self._race_view.set_events([LapEvent.from_dict(e) for e in events
+                                    if e["event"] == EventType.LAP.value])
+
+        self._racing = True
+        self._btn_race.setText("Finalizar Carrera")
+        self._btn_race.setStyleSheet(
+            "background-color: #5a2d2d; padding: 6px 12px; border: 1px solid #4a4a4a;"
+        )
+        self._show_reset_standings()
+        self._status.showMessage("Carrera reanudada", 3000)
+
     def _on_reset(self):
-        self._race.reset()
+        with self._timing.lock:
+            self._race.reset()
+            self._timing.discard()
+        self._standings.clear_position_changes()
+        self._reset_device_laps()
         self._race_view.clear()
-        self._standings.update_standings(self._race.get_standings())
+        self._show_reset_standings()
         self._standings.show_event("")
         self._status.showMessage("Contadores reiniciados", 3000)
 
+    def _show_reset_standings(self):
+        standings = self._race_standings()
+        self._standings.update_standings(standings)
+        if self._live is not None:
+            self._live.reset(standings)
+
+    def _reset_device_laps(self):
+        # LapTimer v2 keeps per-car lap state; LaserLapTimer RESET would recalibrate
+        if self._arduino.isRunning() and self._arduino.protocol == PROTOCOL_LAPTIMER_V2:
+            self._arduino.request_reset()
+
+    # -----------------------------------------------------------
+    # Replay
+    # -----------------------------------------------------------
+
+    def _on_open_replay(self):
+        if self._racing:
+            QMessageBox.warning(self, "Carrera en curso",
+                                "Finaliza la carrera antes de ver una repetición.")
+            return
+        picker = RacePickerDialog(self)
+        if picker.exec() and picker.path:
+            self.start_replay(picker.path)
+
+    def _on_diagnostics(self):
+        if self._diagnostics is None:
+            self._diagnostics = DiagnosticsDialog(self._worker_stages, self)
+        self._diagnostics.show()
+        self._diagnostics.raise_()
+
+    def _worker_stages(self) -> list[tuple[str, list[dict]]]:
+        # Several cameras: their stages are measured in their own processes
+        if not isinstance(self._camera.reader, MultiCameraReader):
+            return []
+        return [(spec.label, stats.get("stages", []))
+                for spec, stats in zip(self._camera.cameras, self._camera.reader.stats)]
+
+    def start_replay(self, path: str, speed: float = 1.0):
+        """Replay a saved race on its own RaceManager; live detections are ignored meanwhile."""
+        try:
+            race = RaceLog.load_race(path)
+        except (OSError, ValueError, KeyError) as e:
+            self._status.showMessage(f"No se pudo abrir {path}: {e}", 5000)
+            return
+        self._stop_replay()
+        self._mode_combo.setCurrentIndex(self._mode_combo.findData(MODE_RACE))
+
+        colors = {car.name: car.display_color for _, car in self._live_race.get_active_cars()}
+        self._timing.enabled = False
+        self._timing.discard()
+        self._race = RaceManager()
+        self._replay = ReplaySource(race, self._race, speed, colors=colors, parent=self)
+        self._replay.crossing.connect(self._on_replay_crossing)
+        self._replay.gate_crossing.connect(self._on_replay_sector)
+        self._replay.position_changed.connect(self._on_replay_position)
+        self._replay.seeked.connect(self._on_replay_seeked)
+        self._replay.finished.connect(lambda: self._replay_bar.set_playing(False))
+
+        self._show_race_state([])
+        self._race_view.set_sectors_visible(self._race.sector_count > 1)
+        for w in (self._btn_race, self._btn_reset, self._btn_register):
+            w.setEnabled(False)
+        self._replay_bar.start(self._replay.race_id, len(self._replay), speed)
+        self._replay_bar.setVisible(True)
+        self._replay.start()
+
+    def _stop_replay(self):
+        if self._replay is None:
+            return
+        self._replay.pause()
+        self._replay.deleteLater()
+        self._replay = None
+        self._replay_events.clear()
+        self._race = self._live_race
+        self._timing.enabled = True
+        self._replay_bar.setVisible(False)
+        for w in (self._btn_race, self._btn_reset, self._btn_register):
+            w.setEnabled(True)
+        self._show_race_state([])
+        self._apply_sector_gates()
+        if self._live is not None:
+            self._live.reset(self._race_standings())
+
+    def _race_standings(self) -> list[dict]:
+        with self._timing.lock:
+            return self._race.get_standings()
+
+    def _show_race_state(self, laps: list[LapEvent]):
+        self._standings.clear_position_changes()
+        self._standings.show_event("")
+        self._race_view.set_events(laps)
+        self._standings.update_standings(self._race_standings())
+
+    # The replay drives its own RaceManager on this thread (its checkpoints
+    # need each event processed as it is emitted); the UI is updated once per
+    # replay step, like a timing batch
+
+    def _on_replay_crossing(self, car_id: int, source: str, at: float):
+        event = self._race.process_crossing(car_id, source, at)
+        if event is not None:
+            self._replay_events.append(event)
+
+    def _on_replay_sector(self, gate: int, car_id: int, source: str, at: float):
+        event = self._race.process_sector(gate, car_id, source, at)
+        if event is not None:
+            self._replay_events.append(event)
+
+    def _on_replay_position(self, index: int):
+        if self._replay_events:
+            self._show_race_events(self._replay_events, self._race.get_standings())
+            self._replay_events = []
+        self._replay_bar.set_position(index, self._replay.race_time_ms())
+
+    def _on_replay_seeked(self, index: int):
+        self._replay_events.clear()
+        self._show_race_state(self._replay.lap_events(index))
+
+    def _on_replay_seek(self, index: int):
+        if self._replay is not None:
+            self._replay.seek(index)
+
+    def _on_replay_play_toggled(self, play: bool):
+        if self._replay is None:
+            return
+        if play:
+            if self._replay.index >= len(self._replay):
+                self._replay.seek(0)
+            self._replay.start()
+        else:
+            self._replay.pause()
+
+    def _on_replay_speed_changed(self, speed: float):
+        if self._replay is not None:
+            self._replay.set_speed(speed)
+
     # -----------------------------------------------------------
     # Camera
     # -----------------------------------------------------------
 
     def _on_camera_changed(self, index: int):
-        device = self._cam_combo.currentData()
-        self._camera.stop()
-        self._camera.device_index = device
-        self._camera.start()
+        # Opened on the camera's side while the current one keeps capturing
+        self._camera.switch_device(self._cam_combo.currentData())
+        if (self._detection_source in (SOURCE_CAMERA, SOURCE_FUSION)
+                and not self._camera.isRunning()):
+            self._camera.start()
+        self._save_config()
+
+    def _on_camera_device(self, device: int, opened: bool):
+        name = self._cam_combo.itemText(device)
+        if opened:
+            # Several cameras: each has its own line
+            self._finish_line = self._camera.finish_line
+            self._status.showMessage(f"Camara: {name}", 3000)
+        else:
+            self._status.showMessage(f"No se pudo abrir la camara {name}", 5000)
 
     def _sync_cars_to_camera(self):
-        entries = [(i, c) for i, c in enumerate(self._race.cars) if c.active]
+        entries = [(i, c) for i, c in enumerate(self._live_race.cars) if c.active]
         self._camera.set_cars(entries)
 
+    def _sync_cars_to_arduino(self):
+        self._arduino.set_cars(
+            [(i, c.name) for i, c in enumerate(self._live_race.cars) if c.active]
+        )
+
     def _update_fps(self):
-        if self._detection_source == SOURCE_CAMERA:
+        if self._detection_source in (SOURCE_CAMERA, SOURCE_FUSION):
             self._fps_label.setText(f"FPS: {self._fps_count}")
+            if self._camera.cameras:
+                # One process per camera: its own rate, CPU and capture latency
+                self._fps_label.setToolTip("\n".join(
+                    format_camera_stats(spec, stats)
+                    for spec, stats in zip(self._camera.cameras, self._camera.reader.stats)))
+        elif self._detection_source == SOURCE_GATES:
+            self._fps_label.setText(f"Puertas: {len(self._gates_connected)}")
         else:
             self._fps_label.setText("Arduino")
         self._fps_count = 0
+        if self._live is not None:
+            self._live_label.setText(f"En vivo :{self._live.port} ({self._live.client_count})")
+        if self._nodes is not None:
+            self._nodes_label.setText(self._nodes_text())
 
     # -----------------------------------------------------------
     # Detection sensitivity
@@ -613,52 +1098,51 @@ class MainWindow(QMainWindow):
     # -----------------------------------------------------------
 
     def _save_config(self):
-        config = {
-            "finish_line": self._finish_line.to_dict() if self._finish_line.defined else None,
-            "camera_index": self._camera.device_index,
-            "sensitivity": ColorCalibrator.get_sensitivity(),
-            "min_pixel_count": self._camera.min_pixel_count,
-            "detection_source": self._detection_source,
-            "arduino_port": self._arduino.port,
-            "arduino_threshold": self._arduino_widget.threshold,
-            "cars": [],
-        }
-        for i, car in enumerate(self._race.cars):
-            if car.active:
-                d = car.to_dict()
-                d["slot"] = i
-                config["cars"].append(d)
-        with open(CONFIG_PATH, "w", encoding="utf-8") as f:
-            json.dump(config, f, indent=2, ensure_ascii=False)
+        # Snapshot now; the store writes it off the UI thread once changes settle
+        self._config_store.save(Config(
+            finish_line=self._finish_line if self._finish_line.defined else None,
+            camera_index=self._camera.device_index,
+            sensitivity=ColorCalibrator.get_sensitivity(),
+            min_pixel_count=self._camera.min_pixel_count,
+            detection_source=self._detection_source,
+            arduino_port=self._arduino.port,
+            arduino_threshold=self._arduino_widget.threshold,
+            fusion_window_ms=self._timing.fuser.window_ms,
+            gates=list(self._gates.gates),
+            ranking_track=self._time_trial.track,
+            live_port=self._live_port,
+            live_multicast=self._live_multicast,
+            node_port=self._node_port,
+            cars=[(i, car) for i, car in enumerate(self._live_race.cars) if car.active],
+            cameras=self._camera.cameras,
+            extra=self._config_extra,
+        ))
 
     def _load_config(self):
-        if not os.path.exists(CONFIG_PATH):
-            return
-        try:
-            with open(CONFIG_PATH, "r", encoding="utf-8") as f:
-                config = json.load(f)
-        except (json.JSONDecodeError, OSError):
-            return
+        config = self._config_store.load()
+        self._config_extra = config.extra
+        # Widgets are set with their signals blocked and the result applied
+        # once below, instead of each change restarting sources and repainting
 
-        if config.get("finish_line"):
-            self._finish_line = FinishLine.from_dict(config["finish_line"])
-            self._camera.set_finish_line(self._finish_line)
+        self._camera.device_index = config.camera_index
+        self._cam_combo.blockSignals(True)
+        self._cam_combo.setCurrentIndex(config.camera_index)
+        self._cam_combo.blockSignals(False)
 
-        if config.get("camera_index") is not None:
-            idx = config["camera_index"]
-            self._camera.device_index = idx
-            self._cam_combo.setCurrentIndex(idx)
+        # Line of the camera shown (several cameras: also kept per camera)
+        if config.finish_line is not None:
+            self._camera.set_finish_line(config.finish_line)
+        self._finish_line = self._camera.finish_line
 
         # Restore detection sensitivity
-        if config.get("sensitivity"):
-            sens = config["sensitivity"]
-            ColorCalibrator.set_sensitivity(sens)
+        if config.sensitivity:
+            ColorCalibrator.set_sensitivity(config.sensitivity)
             self._sens_combo.blockSignals(True)
-            self._sens_combo.setCurrentText(sens)
+            self._sens_combo.setCurrentText(config.sensitivity)
             self._sens_combo.blockSignals(False)
 
-        if config.get("min_pixel_count") is not None:
-            px = config["min_pixel_count"]
+        if config.min_pixel_count is not None:
+            px = config.min_pixel_count
             self._camera.min_pixel_count = px
             self._px_slider.blockSignals(True)
             self._px_spin.blockSignals(True)
@@ -668,36 +1152,99 @@ class MainWindow(QMainWindow):
             self._px_spin.blockSignals(False)
 
         # Restore Arduino settings
-        if config.get("arduino_port"):
-            self._arduino.port = config["arduino_port"]
+        if config.arduino_port:
+            self._arduino.port = config.arduino_port
 
-        if config.get("arduino_threshold") is not None:
-            self._arduino_widget.set_confirmed_threshold(config["arduino_threshold"])
+        if config.arduino_threshold is not None:
+            self._arduino_widget.set_confirmed_threshold(config.arduino_threshold)
 
-        for car_data in config.get("cars", []):
-            from ..models.car import CarColor
-            slot = car_data.pop("slot", 0)
-            car = CarColor.from_dict(car_data)
+        self._timing.fuser.window_ms = config.fusion_window_ms
+        self._fusion_spin.blockSignals(True)
+        self._fusion_spin.setValue(self._timing.fuser.window_ms)
+        self._fusion_spin.blockSignals(False)
+
+        if config.gates:
+            self._gates.set_gates(config.gates)
+
+        if config.ranking_track:
+            self._time_trial.track = config.ranking_track
+            self._ranking_widget.set_track(self._time_trial.track)
+
+        for slot, car in config.cars:
             self._race.register_car(
                 slot, car.name, car.hsv_lower, car.hsv_upper, car.display_color
             )
 
+        self._live_port = config.live_port
+        self._live_multicast = config.live_multicast
+        if self._live_port:
+            self._start_live()
+        self._node_port = config.node_port
+        if self._node_port:
+            self._start_nodes()
+
         self._sync_cars_to_camera()
+        self._sync_cars_to_arduino()
         active = len(self._race.get_active_cars())
-        self._cars_label.setText(f"Autos: {active}/6")
-        self._standings.update_standings(self._race.get_standings())
+        self._cars_label.setText(f"Autos: {active}/{MAX_CARS}")
+
+        # Detection source last: starts the sources it needs
+        idx = self._source_combo.findData(config.detection_source)
+        self._source_combo.blockSignals(True)
+        self._source_combo.setCurrentIndex(max(idx, 0))
+        self._source_combo.blockSignals(False)
+        self._apply_source(self._source_combo.currentData())
+        self._standings.update_standings(self._race_standings())
+
+    def _start_live(self):
+        try:
+            live = LiveServer(port=self._live_port, multicast=self._live_multicast)
+            live.start()
+        except (OSError, ValueError) as e:
+            self._status.showMessage(f"No se pudo abrir el puerto {self._live_port}: {e}", 5000)
+            return
+        self._live = live
+        self._live.reset(self._race_standings())
+        self._live_label.setText(f"En vivo :{live.port} (0)")
+        self._live_label.setVisible(True)
 
-        # Restore detection source (must be last - triggers UI switch)
-        source = config.get("detection_source", SOURCE_CAMERA)
-        if source == SOURCE_ARDUINO:
-            self._source_combo.setCurrentIndex(1)  # triggers _on_source_changed
+    def _start_nodes(self):
+        nodes = NodeServer(self._bus, port=self._node_port)
+        try:
+            nodes.start()
+        except OSError as e:
+            self._status.showMessage(f"No se pudo abrir el puerto {self._node_port}: {e}", 5000)
+            return
+        self._nodes = nodes
+        self._nodes_label.setText(self._nodes_text())
+        self._nodes_label.setVisible(True)
+
+    def _nodes_text(self) -> str:
+        nodes = self._nodes.nodes()
+        text = f"Nodos: {sum(n['connected'] for n in nodes)}/{len(nodes)}"
+        self._nodes_label.setToolTip("\n".join(
+            f"{n['node']}: {'conectado' if n['connected'] else 'desconectado'}, "
+            f"reloj {n['offset_ms']:+.1f} ms, {n['received']} cruces" for n in nodes))
+        return text
 
     def closeEvent(self, event):
+        self._stop_replay()
         self._save_config()
-        if self._race_log.active:
-            self._race_log.end_race()
+        self._config_store.close()  # writes it now: the process is about to end
+        self._ui_timer.stop()
         self._camera.stop()
         if self._arduino.isRunning():
             self._arduino.set_streaming(False)
             self._arduino.stop()
+        if self._gates.isRunning():
+            self._gates.stop()
+        if self._nodes is not None:
+            self._nodes.stop()
+        # Sources stopped: the timing thread finishes what is queued, then the log
+        self._timing.stop()
+        if self._race_log.active:
+            self._race_log.end_race()
+        if self._live is not None:
+            self._live.stop()
+        self._ranking.close()
         event.accept()
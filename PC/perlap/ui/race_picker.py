@@ -0,0 +1,73 @@
+from typing import Optional
+
+from PySide6.QtWidgets import (QDialog, QVBoxLayout, QHBoxLayout, QLabel, QTableView,
+                               QHeaderView, QAbstractItemView, QPushButton, QFileDialog)
+
+from ..archive.catalog import browse_races
+from ..models import race_log
+from .table_models import RaceListModel
+
+
+class RacePickerDialog(QDialog):
+    """Pick a saved race from the archive catalog (or any file) to replay."""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setWindowTitle("Repetir carrera")
+        self.setMinimumSize(520, 420)
+        self.setStyleSheet("background-color: #2a2a2a; color: white;")
+        self.path: Optional[str] = None
+
+        layout = QVBoxLayout(self)
+        races = browse_races(race_log.RACES_DIR)
+        layout.addWidget(QLabel(f"{len(races)} carreras guardadas" if races
+                                else "No hay carreras guardadas"))
+
+        self._model = RaceListModel(races, self)
+        self._table = QTableView()
+        self._table.setModel(self._model)
+        self._table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
+        self._table.verticalHeader().setVisible(False)
+        self._table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self._table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self._table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
+        self._table.setStyleSheet("""
+            QTableView { background-color: #2a2a2a; color: white; gridline-color: #444; }
+            QHeaderView::section { background-color: #333; color: #ccc; padding: 4px; }
+        """)
+        self._table.doubleClicked.connect(lambda index: self._choose(index.row()))
+        if races:
+            self._table.selectRow(0)
+        layout.addWidget(self._table, 1)
+
+        btn_layout = QHBoxLayout()
+        open_btn = QPushButton("Repetir")
+        open_btn.setStyleSheet(
+            "background-color: #2d5a2d; padding: 8px; border: 1px solid #4a4a4a;"
+        )
+        open_btn.clicked.connect(lambda: self._choose(self._table.currentIndex().row()))
+        other_btn = QPushButton("Otro archivo...")
+        other_btn.setStyleSheet("background: #333; padding: 8px; border: 1px solid #4a4a4a;")
+        other_btn.clicked.connect(self._on_other_file)
+        cancel_btn = QPushButton("Cancelar")
+        cancel_btn.setStyleSheet(
+            "background-color: #5a2d2d; padding: 8px; border: 1px solid #4a4a4a;"
+        )
+        cancel_btn.clicked.connect(self.reject)
+        btn_layout.addWidget(open_btn)
+        btn_layout.addWidget(other_btn)
+        btn_layout.addWidget(cancel_btn)
+        layout.addLayout(btn_layout)
+
+    def _choose(self, row: int):
+        race = self._model.race(row)
+        if race is not None:
+            self.path = race["path"]
+            self.accept()
+
+    def _on_other_file(self):
+        path, _ = QFileDialog.getOpenFileName(
+            self, "Repetir carrera", race_log.RACES_DIR, "Carreras (*.plr *.json)")
+        if path:
+            self.path = path
+            self.accept()
@@ -1,10 +1,10 @@
-from PySide6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QTableWidget,
-                               QTableWidgetItem, QHeaderView, QScrollArea)
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QTableView,
+                               QHeaderView, QAbstractItemView)
 from PySide6.QtCore import Qt
-from PySide6.QtGui import QColor, QBrush
 
 from ..models.events import LapEvent, EventType
 from .standings import format_time
+from .table_models import LapHistoryModel
 
 
 class RaceViewWidget(QWidget):
@@ -19,16 +19,19 @@ class RaceViewWidget(QWidget):
         title.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(title)
 
-        self._lap_table = QTableWidget()
-        self._lap_table.setColumnCount(4)
-        self._lap_table.setHorizontalHeaderLabels(["Auto", "Vuelta", "Tiempo", "Gap"])
+        self._model = LapHistoryModel(self)
+        self._lap_table = QTableView()
+        self._lap_table.setModel(self._model)
+        self._lap_table.setColumnHidden(4, True)
         self._lap_table.horizontalHeader().setSectionResizeMode(
             QHeaderView.ResizeMode.Stretch)
         self._lap_table.verticalHeader().setVisible(False)
-        self._lap_table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self._lap_table.setSelectionMode(QTableWidget.SelectionMode.NoSelection)
+        # Fixed row height: the view never measures rows it does not paint
+        self._lap_table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self._lap_table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self._lap_table.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
         self._lap_table.setStyleSheet("""
-            QTableWidget { background-color: #2a2a2a; color: white; gridline-color: #444; }
+            QTableView { background-color: #2a2a2a; color: white; gridline-color: #444; }
             QHeaderView::section { background-color: #333; color: #ccc; padding: 4px; }
         """)
         layout.addWidget(self._lap_table)
@@ -37,44 +40,33 @@ class RaceViewWidget(QWidget):
         self._fastest_label.setStyleSheet("font-size: 12px; color: #f0f; padding: 4px;")
         layout.addWidget(self._fastest_label)
 
-        self._events: list[LapEvent] = []
-        self._fastest_lap_ms = 999999
         self._fastest_lap_car = ""
 
+    def set_sectors_visible(self, visible: bool):
+        self._lap_table.setColumnHidden(4, not visible)
+
     def add_event(self, event: LapEvent):
-        if event.event != EventType.LAP:
-            return
-        self._events.append(event)
+        if event.event == EventType.LAP:
+            self.add_events([event])
 
-        if event.lap_time_ms < self._fastest_lap_ms:
-            self._fastest_lap_ms = event.lap_time_ms
-            self._fastest_lap_car = event.car_name
+    def add_events(self, events: list[LapEvent]):
+        """Several LAP events (oldest first) in one table update."""
+        fastest = self._model.add_events(events)
+        if fastest is not None:
+            self._fastest_lap_car = fastest.car_name
             self._fastest_label.setText(
-                f"Vuelta rápida: {event.car_name} - {format_time(event.lap_time_ms)}"
+                f"Vuelta rápida: {fastest.car_name} - {format_time(fastest.lap_time_ms)}"
             )
 
-        self._refresh_table()
-
-    def _refresh_table(self):
-        self._lap_table.setRowCount(len(self._events))
-        for row, ev in enumerate(reversed(self._events)):
-            items = [
-                ev.car_name,
-                str(ev.lap_number),
-                format_time(ev.lap_time_ms),
-                format_time(ev.lap_time_ms - self._fastest_lap_ms)
-                if ev.lap_time_ms > self._fastest_lap_ms else "RÁPIDA",
-            ]
-            for col, text in enumerate(items):
-                item = QTableWidgetItem(text)
-                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                if col == 3 and text == "RÁPIDA":
-                    item.setForeground(QBrush(QColor(255, 0, 255)))
-                self._lap_table.setItem(row, col, item)
+    def set_events(self, events: list[LapEvent]):
+        """Show these LAP events (oldest first) instead of the current ones."""
+        self._model.set_events(events)
+        fastest = self._model.fastest_event()
+        self._fastest_lap_car = fastest.car_name if fastest else ""
+        self._fastest_label.setText(
+            f"Vuelta rápida: {fastest.car_name} - {format_time(fastest.lap_time_ms)}"
+            if fastest else ""
+        )
 
     def clear(self):
-        self._events.clear()
-        self._fastest_lap_ms = 999999
-        self._fastest_lap_car = ""
-        self._fastest_label.setText("")
-        self._lap_table.setRowCount(0)
+        self.set_events([])
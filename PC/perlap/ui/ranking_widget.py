@@ -1,17 +1,24 @@
 from PySide6.QtWidgets import (QWidget, QVBoxLayout, QHBoxLayout, QLabel,
-                               QTableWidget, QTableWidgetItem, QHeaderView,
-                               QPushButton, QMessageBox)
-from PySide6.QtCore import Qt
-from PySide6.QtGui import QColor, QBrush, QFont
+                               QTableView, QHeaderView, QAbstractItemView,
+                               QPushButton, QMessageBox, QComboBox)
+from PySide6.QtCore import Qt, Signal
 
 from .standings import format_time
-from ..models.time_trial import TimeTrial
+from .table_models import RankingTableModel
+from ..models.ranking_store import RankingStore, DEFAULT_TRACK
 
 
 class RankingWidget(QWidget):
+    track_changed = Signal(str)
+    # Emitted from the store's writer thread once a delete/clear is on disk
+    _row_deleted = Signal(int)
+    _store_changed = Signal()
 
-    def __init__(self, parent=None):
+    def __init__(self, store: RankingStore, laps: int, track: str = DEFAULT_TRACK,
+                 parent=None):
         super().__init__(parent)
+        self._store = store
+        self._laps = laps
         layout = QVBoxLayout(self)
         layout.setContentsMargins(8, 8, 8, 8)
 
@@ -20,28 +27,39 @@ class RankingWidget(QWidget):
         title.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(title)
 
-        self._table = QTableWidget()
-        self._table.setColumnCount(5)
-        self._table.setHorizontalHeaderLabels(
-            ["#", "Jugador", "Total", "Mejor Vta", "Fecha"]
-        )
+        # One ranking per lap count and track configuration
+        track_row = QHBoxLayout()
+        track_row.addWidget(QLabel(f"{laps} vueltas - Pista:"))
+        self._track_combo = QComboBox()
+        self._track_combo.setEditable(True)
+        self._track_combo.setStyleSheet("background: #333; color: white; padding: 2px;")
+        self._track_combo.lineEdit().setPlaceholderText("(sin nombre)")
+        self._track_combo.lineEdit().editingFinished.connect(self._on_track_edited)
+        self._track_combo.activated.connect(self._on_track_edited)
+        track_row.addWidget(self._track_combo, 1)
+        layout.addLayout(track_row)
+
+        self._model = RankingTableModel(store, laps, track, self)
+        self._table = QTableView()
+        self._table.setModel(self._model)
         header = self._table.horizontalHeader()
         header.setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         header.setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed)
         self._table.setColumnWidth(0, 35)
         self._table.verticalHeader().setVisible(False)
-        self._table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self._table.setSelectionMode(QTableWidget.SelectionMode.SingleSelection)
-        self._table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
+        self._table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self._table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self._table.setSelectionMode(QAbstractItemView.SelectionMode.SingleSelection)
+        self._table.setSelectionBehavior(QAbstractItemView.SelectionBehavior.SelectRows)
         self._table.setStyleSheet("""
-            QTableWidget {
+            QTableView {
                 background-color: #2a2a2a; color: white;
                 gridline-color: #444; font-size: 13px;
             }
             QHeaderView::section {
                 background-color: #333; color: #ccc; padding: 4px;
             }
-            QTableWidget::item:selected {
+            QTableView::item:selected {
                 background-color: #3a3a1a;
             }
         """)
@@ -74,71 +92,73 @@ class RankingWidget(QWidget):
 
         layout.addLayout(btn_row)
 
-        self._ranking_data: list[dict] = []
-        self._table.currentCellChanged.connect(self._on_row_selected)
-
-        self.refresh()
+        self._table.selectionModel().currentRowChanged.connect(self._on_row_selected)
+        self._model.modelReset.connect(self._show_count)
+        self._row_deleted.connect(self._model.remove_row)
+        self._row_deleted.connect(self._show_count)
+        self._store_changed.connect(self.refresh)
+
+        self._fill_tracks()
+        self._show_count()
+
+    @property
+    def track(self) -> str:
+        return self._model.track
+
+    def set_track(self, track: str):
+        self._model.set_partition(self._laps, track)
+        self._fill_tracks()
+
+    def _fill_tracks(self):
+        self._track_combo.blockSignals(True)
+        self._track_combo.clear()
+        tracks = self._store.tracks()
+        if self.track not in tracks:
+            tracks.append(self.track)
+        self._track_combo.addItems(sorted(tracks))
+        self._track_combo.setCurrentText(self.track)
+        self._track_combo.blockSignals(False)
+
+    def _on_track_edited(self, *_):
+        track = self._track_combo.currentText().strip()
+        if track != self.track:
+            self.set_track(track)
+            self.track_changed.emit(track)
 
     def refresh(self):
-        self._ranking_data = TimeTrial.load_ranking()
-        self._table.setRowCount(len(self._ranking_data))
-
-        gold = QColor(255, 215, 0)
-        silver = QColor(192, 192, 192)
-        bronze = QColor(205, 127, 50)
-
-        for row, entry in enumerate(self._ranking_data):
-            date_str = entry.get("date", "")[:10]
-            items = [
-                str(row + 1),
-                entry.get("player", "???"),
-                format_time(entry.get("total_ms", 0)),
-                format_time(entry.get("best_lap_ms", 0)),
-                date_str,
-            ]
-
-            for col, text in enumerate(items):
-                item = QTableWidgetItem(text)
-                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-
-                if row == 0:
-                    item.setForeground(QBrush(gold))
-                    if col == 0:
-                        item.setFont(QFont("Consolas", 14, QFont.Weight.Bold))
-                elif row == 1:
-                    item.setForeground(QBrush(silver))
-                elif row == 2:
-                    item.setForeground(QBrush(bronze))
-
-                self._table.setItem(row, col, item)
-
-        self._detail_label.setText(
-            f"{len(self._ranking_data)} jugadores en el ranking"
-        )
+        self._model.refresh()
 
-    def highlight_player(self, player_name: str):
-        for row, entry in enumerate(self._ranking_data):
-            if entry.get("player") == player_name:
-                self._table.selectRow(row)
-                self._table.scrollTo(self._table.model().index(row, 0))
-                break
+    def _show_count(self, *_):
+        self._detail_label.setText(f"{self._model.rowCount()} marcas en el ranking")
 
-    def _on_row_selected(self, row, col, prev_row, prev_col):
-        if row < 0 or row >= len(self._ranking_data):
+    def add_entry(self, entry: dict):
+        """Insert a just-saved run at its position and select it."""
+        self._model.insert_entry(entry)
+        self._show_count()
+        if entry.get("track") != self.track:
+            return
+        row = entry["position"] - 1
+        self._table.selectRow(row)
+        self._table.scrollTo(self._model.index(row, 0))
+
+    def _on_row_selected(self, current, previous):
+        entry = self._model.entry(current.row())
+        if entry is None:
             self._detail_label.setText("")
             return
-        entry = self._ranking_data[row]
         laps = entry.get("lap_times_ms", [])
         lap_strs = [f"V{i+1}: {format_time(t)}" for i, t in enumerate(laps)]
-        self._detail_label.setText(
-            f"{entry.get('player', '???')} - {' | '.join(lap_strs)}"
-        )
+        text = f"{entry.get('player', '???')} - {' | '.join(lap_strs)}"
+        pb = self._store.personal_best(entry["player"], self._laps, self.track)
+        if pb and pb["id"] != entry["id"]:
+            text += f"\nMejor marca: {format_time(pb['total_ms'])} (#{pb['position']})"
+        self._detail_label.setText(text)
 
     def _on_delete_selected(self):
-        row = self._table.currentRow()
-        if row < 0 or row >= len(self._ranking_data):
+        row = self._table.currentIndex().row()
+        entry = self._model.entry(row)
+        if entry is None:
             return
-        entry = self._ranking_data[row]
         name = entry.get("player", "???")
         total = format_time(entry.get("total_ms", 0))
         reply = QMessageBox.question(
@@ -147,18 +167,18 @@ class RankingWidget(QWidget):
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
         )
         if reply == QMessageBox.StandardButton.Yes:
-            self._ranking_data.pop(row)
-            TimeTrial.save_ranking(self._ranking_data)
-            self.refresh()
+            future = self._store.delete(entry["id"])
+            future.add_done_callback(lambda _: self._row_deleted.emit(row))
 
     def _on_clear_all(self):
-        if not self._ranking_data:
+        count = self._model.rowCount()
+        if not count:
             return
         reply = QMessageBox.question(
             self, "Borrar ranking",
-            f"Borrar las {len(self._ranking_data)} marcas del ranking?",
+            f"Borrar las {count} marcas del ranking?",
             QMessageBox.StandardButton.Yes | QMessageBox.StandardButton.No,
         )
         if reply == QMessageBox.StandardButton.Yes:
-            TimeTrial.save_ranking([])
-            self.refresh()
+            future = self._store.clear(self._laps, self.track)
+            future.add_done_callback(lambda _: self._store_changed.emit())
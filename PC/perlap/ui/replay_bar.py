@@ -0,0 +1,80 @@
+from PySide6.QtWidgets import (QWidget, QHBoxLayout, QLabel, QPushButton, QComboBox,
+                               QSlider)
+from PySide6.QtCore import Qt, Signal
+
+from ..detection.replay import SPEEDS
+from ..timefmt import format_time
+
+
+class ReplayBar(QWidget):
+    """Controls of a race replay: play/pause, speed, position slider, close."""
+
+    play_toggled = Signal(bool)      # True = play
+    speed_changed = Signal(float)
+    seek_requested = Signal(int)     # event index
+    close_requested = Signal()
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.setStyleSheet(
+            "QPushButton { background: #444; color: white; padding: 4px 10px; "
+            "border: 1px solid #666; }"
+            "QComboBox { background: #444; color: white; padding: 2px; }"
+            "QLabel { color: #fc0; }"
+        )
+        layout = QHBoxLayout(self)
+        layout.setContentsMargins(4, 2, 4, 2)
+
+        self._title = QLabel("")
+        layout.addWidget(self._title)
+
+        self._btn_play = QPushButton("Pausa")
+        self._btn_play.clicked.connect(self._on_play_clicked)
+        layout.addWidget(self._btn_play)
+
+        self._speed_combo = QComboBox()
+        for text, speed in SPEEDS:
+            self._speed_combo.addItem(text, speed)
+        self._speed_combo.currentIndexChanged.connect(
+            lambda i: self.speed_changed.emit(self._speed_combo.itemData(i)))
+        layout.addWidget(self._speed_combo)
+
+        self._slider = QSlider(Qt.Orientation.Horizontal)
+        self._slider.setTracking(False)  # seek on release, not on every pixel
+        self._slider.valueChanged.connect(self.seek_requested.emit)
+        layout.addWidget(self._slider, 1)
+
+        self._pos_label = QLabel("")
+        layout.addWidget(self._pos_label)
+
+        btn_close = QPushButton("Cerrar")
+        btn_close.clicked.connect(self.close_requested.emit)
+        layout.addWidget(btn_close)
+
+        self._playing = False
+
+    def start(self, title: str, events: int, speed: float):
+        self._title.setText(f"REPETICIÓN {title}")
+        self._slider.blockSignals(True)
+        self._slider.setRange(0, events)
+        self._slider.setValue(0)
+        self._slider.blockSignals(False)
+        self._speed_combo.blockSignals(True)
+        self._speed_combo.setCurrentIndex(max(self._speed_combo.findData(speed), 0))
+        self._speed_combo.blockSignals(False)
+        self.set_playing(True)
+
+    def set_playing(self, playing: bool):
+        self._playing = playing
+        self._btn_play.setText("Pausa" if playing else "Seguir")
+
+    def set_position(self, index: int, race_ms: int):
+        if not self._slider.isSliderDown():
+            self._slider.blockSignals(True)
+            self._slider.setValue(index)
+            self._slider.blockSignals(False)
+        self._pos_label.setText(f"{format_time(race_ms)}  {index}/{self._slider.maximum()}")
+
+    def _on_play_clicked(self):
+        self.set_playing(not self._playing)
+        self.play_toggled.emit(self._playing)
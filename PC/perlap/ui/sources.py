@@ -0,0 +1,311 @@
+"""Qt faces of the detection readers: same API, results as Qt signals.
+
+The readers (``detection.camera/arduino/gates``) are Qt-free and report
+through hooks on their own threads; each hook is forwarded to a signal
+here, so connected slots are queued to the GUI thread as before (or called
+in the reader thread with ``DirectConnection``).
+"""
+import time
+
+from PySide6.QtCore import QObject, QTimer, Signal
+from PySide6.QtGui import QImage
+
+from ..detection.arduino import ArduinoReader
+from ..detection.camera import CameraReader
+from ..detection.finish_line import FinishLine
+from ..detection.gates import GateReader
+from ..detection.multicam import MultiCameraReader, CameraSpec
+from ..profiler import profiler
+
+CAMERA_DEVICES = 5          # devices offered in the camera combo
+DISPLAY_INTERVAL_MS = 33    # multi-camera: shown camera polled at ~30 fps
+
+_QIMAGE = profiler.stage("ui.qimage")
+
+
+def _forward(reader, source: QObject, names: tuple[str, ...]):
+    for name in names:
+        getattr(reader, name).connect(getattr(source, name).emit)
+
+
+def _to_qimage(frame) -> QImage:
+    t0 = time.perf_counter()
+    h, w, ch = frame.shape
+    img = QImage(frame.data, w, h, ch * w, QImage.Format.Format_BGR888).copy()
+    _QIMAGE.since(t0)
+    return img
+
+
+class CameraSource(QObject):
+    frame_ready = Signal(QImage, float)  # frame, perf_counter() when it was grabbed
+    # car_id, perf_counter() when the frame was grabbed, {"frame": n, "pixels": count}
+    crossing_detected = Signal(int, float, dict)
+    device_changed = Signal(int, bool)  # device index, opened
+
+    def __init__(self, device_index: int = 0, parent=None):
+        super().__init__(parent)
+        self.reader = CameraReader(device_index)
+        _forward(self.reader, self, ("crossing_detected", "device_changed"))
+        self.reader.frame_ready.connect(self._on_frame)
+
+    def _on_frame(self, display, t: float):
+        self.frame_ready.emit(_to_qimage(display), t)
+
+    def device_names(self) -> list[str]:
+        return [f"Dispositivo {i}" for i in range(CAMERA_DEVICES)]
+
+    @property
+    def cameras(self) -> list[CameraSpec]:
+        return []  # a single camera: config.json "finish_line" and "camera_index"
+
+    @property
+    def sector_gate_count(self) -> int:
+        return 0
+
+    @property
+    def finish_line(self) -> FinishLine:
+        return self.reader.config.finish_line
+
+    @property
+    def device_index(self) -> int:
+        return self.reader.device_index
+
+    @device_index.setter
+    def device_index(self, value: int):
+        self.reader.switch_device(value)
+
+    def switch_device(self, device_index: int):
+        self.reader.switch_device(device_index)
+
+    @property
+    def min_pixel_count(self) -> int:
+        return self.reader.min_pixel_count
+
+    @min_pixel_count.setter
+    def min_pixel_count(self, value: int):
+        self.reader.min_pixel_count = value
+
+    def set_cars(self, cars):
+        self.reader.set_cars(cars)
+
+    def set_finish_line(self, fl):
+        self.reader.set_finish_line(fl)
+
+    def start(self):
+        self.reader.start()
+
+    def stop(self):
+        self.reader.stop()
+
+    def isRunning(self) -> bool:
+        return self.reader.is_running
+
+
+class MultiCameraSource(QObject):
+    """Qt face of ``MultiCameraReader``, with the ``CameraSource`` API.
+
+    ``device_index`` is the camera shown (and whose line is edited); its
+    frames are polled from shared memory on the GUI thread. Every camera
+    keeps detecting in its own process whichever is shown.
+    """
+
+    frame_ready = Signal(QImage, float)
+    crossing_detected = Signal(int, float, dict)
+    device_changed = Signal(int, bool)  # camera, opened
+
+    def __init__(self, cameras: list[CameraSpec], parent=None):
+        super().__init__(parent)
+        self.reader = MultiCameraReader(cameras)
+        _forward(self.reader, self, ("crossing_detected", "device_changed"))
+        self._shown = 0
+        self._seq = 0
+        self._timer = QTimer(self)
+        self._timer.setInterval(DISPLAY_INTERVAL_MS)
+        self._timer.timeout.connect(self._poll_frame)
+
+    def _poll_frame(self):
+        latest = self.reader.latest_frame(self._shown)
+        if latest is None or latest[0] == self._seq:
+            return
+        self._seq, frame, t = latest
+        self.frame_ready.emit(_to_qimage(frame), t)
+
+    def device_names(self) -> list[str]:
+        return [c.label for c in self.reader.cameras]
+
+    @property
+    def cameras(self) -> list[CameraSpec]:
+        return self.reader.cameras
+
+    @property
+    def sector_gate_count(self) -> int:
+        return self.reader.sector_gate_count
+
+    @property
+    def device_index(self) -> int:
+        return self._shown
+
+    @device_index.setter
+    def device_index(self, value: int):
+        self.switch_device(value)
+
+    def switch_device(self, device_index: int):
+        if not 0 <= device_index < len(self.reader.cameras) or device_index == self._shown:
+            return
+        self._shown = device_index
+        self._seq = 0
+        if self.isRunning():
+            self.device_changed.emit(device_index, True)
+
+    @property
+    def min_pixel_count(self) -> int:
+        return self.reader.min_pixel_count
+
+    @min_pixel_count.setter
+    def min_pixel_count(self, value: int):
+        self.reader.min_pixel_count = value
+
+    @property
+    def finish_line(self) -> FinishLine:
+        return self.reader.cameras[self._shown].finish_line or FinishLine()
+
+    def set_cars(self, cars):
+        self.reader.set_cars(cars)
+
+    def set_finish_line(self, fl):
+        self.reader.set_finish_line(self._shown, fl)
+
+    def start(self):
+        self.reader.start()
+        self._timer.start()
+
+    def stop(self):
+        self._timer.stop()
+        self.reader.stop()
+
+    def isRunning(self) -> bool:
+        return self.reader.is_running
+
+
+class ArduinoSource(QObject):
+    """Qt face of ``ArduinoReader`` (LaserLapTimer / LapTimer v2 firmware)."""
+
+    # Times are perf_counter() when the line was read, before any queued dispatch
+    crossing_detected = Signal(int, float, dict)  # car_id (0), time, {"ldr", "device_ms"}
+    device_start = Signal(int, float)   # car_id, time (LapTimer v2 START)
+    device_lap = Signal(int, int, float)  # car_id, lap_time_ms measured by the device, time
+    protocol_detected = Signal(str)     # PROTOCOL_LASER / PROTOCOL_LAPTIMER_V2
+    car_registered = Signal(int, str)   # car_id, name confirmed by CAR_REG
+    car_calibrated = Signal(int, int, int, int)  # car_id, r, g, b (CAL_SET)
+    status_received = Signal(dict)      # STATUS line, "car_id" mapped to RaceManager
+    ldr_value = Signal(int)             # live LDR reading
+    connection_changed = Signal(bool)   # connected/disconnected
+    threshold_changed = Signal(int)     # confirmed threshold from Arduino
+    ready = Signal(int, int)            # baseline, threshold on startup
+    error_occurred = Signal(str)        # error message
+    test_result = Signal(int, int, int, bool)  # ldr_off, ldr_on, diff, laser_detected
+    state_changed = Signal(str)         # STATE_*
+    ports_changed = Signal(list)        # [(device, description)] on hot-plug
+    port_reassigned = Signal(str)       # same Arduino re-enumerated / auto-found
+
+    list_ports = staticmethod(ArduinoReader.list_ports)
+    find_arduino = staticmethod(ArduinoReader.find_arduino)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.reader = ArduinoReader()
+        _forward(self.reader, self, (
+            "crossing_detected", "device_start", "device_lap", "protocol_detected",
+            "car_registered", "car_calibrated", "status_received", "ldr_value",
+            "connection_changed", "threshold_changed", "ready", "error_occurred",
+            "test_result", "state_changed", "ports_changed", "port_reassigned",
+        ))
+
+    @property
+    def port(self) -> str:
+        return self.reader.port
+
+    @port.setter
+    def port(self, value: str):
+        self.reader.port = value
+
+    @property
+    def protocol(self) -> str:
+        return self.reader.protocol
+
+    @property
+    def state(self) -> str:
+        return self.reader.state
+
+    # Commands: queued by the reader, sent from its thread
+    def send_command(self, cmd: str):
+        self.reader.send_command(cmd)
+
+    def set_threshold(self, value: int):
+        self.reader.set_threshold(value)
+
+    def set_laser(self, on: bool):
+        self.reader.set_laser(on)
+
+    def set_streaming(self, on: bool):
+        self.reader.set_streaming(on)
+
+    def request_ldr(self):
+        self.reader.request_ldr()
+
+    def request_reset(self):
+        self.reader.request_reset()
+
+    def request_test(self):
+        self.reader.request_test()
+
+    def request_status(self):
+        self.reader.request_status()
+
+    def set_cars(self, cars: list[tuple[int, str]]):
+        self.reader.set_cars(cars)
+
+    def calibrate_car(self, car_id: int):
+        self.reader.calibrate_car(car_id)
+
+    def start(self):
+        self.reader.start()
+
+    def stop(self):
+        self.reader.stop()
+
+    def isRunning(self) -> bool:
+        return self.reader.is_running
+
+
+class GateSource(QObject):
+    """Qt face of ``GateReader`` (one LaserLapTimer per timing gate)."""
+
+    gate_crossing = Signal(int, int, float)   # gate, car_id (-1), perf_counter time
+    gate_connection = Signal(int, bool)       # gate, connected
+    error_occurred = Signal(str)
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.reader = GateReader()
+        _forward(self.reader, self, ("gate_crossing", "gate_connection", "error_occurred"))
+
+    @property
+    def gates(self):
+        return self.reader.gates
+
+    @property
+    def sector_gate_count(self) -> int:
+        return self.reader.sector_gate_count
+
+    def set_gates(self, gates):
+        self.reader.set_gates(gates)
+
+    def start(self):
+        self.reader.start()
+
+    def stop(self):
+        self.reader.stop()
+
+    def isRunning(self) -> bool:
+        return self.reader.is_running
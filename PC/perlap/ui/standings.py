@@ -1,18 +1,9 @@
-from PySide6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QTableWidget,
-                               QTableWidgetItem, QHeaderView)
+from PySide6.QtWidgets import (QWidget, QVBoxLayout, QLabel, QTableView,
+                               QHeaderView, QAbstractItemView)
 from PySide6.QtCore import Qt
-from PySide6.QtGui import QColor, QBrush
 
-
-def format_time(ms: int) -> str:
-    if ms <= 0:
-        return "-"
-    seconds = ms / 1000
-    if seconds < 60:
-        return f"{seconds:.3f}s"
-    minutes = int(seconds // 60)
-    secs = seconds % 60
-    return f"{minutes}:{secs:06.3f}"
+from ..timefmt import format_time  # noqa: F401  (other widgets import it from here)
+from .table_models import StandingsTableModel
 
 
 class StandingsWidget(QWidget):
@@ -28,17 +19,17 @@ class StandingsWidget(QWidget):
         title.setAlignment(Qt.AlignmentFlag.AlignCenter)
         layout.addWidget(title)
 
-        self._table = QTableWidget()
-        self._table.setColumnCount(5)
-        self._table.setHorizontalHeaderLabels(["Pos", "Auto", "Vtas", "Mejor", "Última"])
+        self._model = StandingsTableModel(self)
+        self._table = QTableView()
+        self._table.setModel(self._model)
         self._table.horizontalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Stretch)
         self._table.horizontalHeader().setSectionResizeMode(0, QHeaderView.ResizeMode.Fixed)
         self._table.setColumnWidth(0, 35)
         self._table.verticalHeader().setVisible(False)
-        self._table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self._table.setSelectionMode(QTableWidget.SelectionMode.NoSelection)
+        self._table.setEditTriggers(QAbstractItemView.EditTrigger.NoEditTriggers)
+        self._table.setSelectionMode(QAbstractItemView.SelectionMode.NoSelection)
         self._table.setStyleSheet("""
-            QTableWidget { background-color: #2a2a2a; color: white; gridline-color: #444; }
+            QTableView { background-color: #2a2a2a; color: white; gridline-color: #444; }
             QHeaderView::section { background-color: #333; color: #ccc; padding: 4px; }
         """)
         layout.addWidget(self._table)
@@ -51,22 +42,17 @@ class StandingsWidget(QWidget):
         layout.addWidget(self._last_event_label)
 
     def update_standings(self, standings: list[dict]):
-        self._table.setRowCount(len(standings))
-        for row, s in enumerate(standings):
-            color = QColor(*s["color"][::-1]) if s.get("color") else QColor(255, 255, 255)
-            items = [
-                str(row + 1),
-                s["name"],
-                str(s["laps"]),
-                format_time(s["best_ms"]),
-                format_time(s["last_ms"]),
-            ]
-            for col, text in enumerate(items):
-                item = QTableWidgetItem(text)
-                item.setTextAlignment(Qt.AlignmentFlag.AlignCenter)
-                if col == 1:
-                    item.setForeground(QBrush(color))
-                self._table.setItem(row, col, item)
+        """Refresh the table; only rows whose contents changed are repainted."""
+        self._model.update_standings(standings)
+
+    def show_position_changes(self, changes: list):
+        """Mark cars that gained (▲) or lost (▼) places on the last lap."""
+        for ch in changes:
+            if ch.old:
+                self._model.trend[ch.car_id] = 1 if ch.new < ch.old else -1
+
+    def clear_position_changes(self):
+        self._model.trend.clear()
 
     def show_event(self, text: str):
         self._last_event_label.setText(text)
@@ -0,0 +1,335 @@
+from typing import Optional
+
+from PySide6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PySide6.QtGui import QColor, QBrush, QFont
+
+from ..models.events import LapEvent
+from ..models.ranking_store import RankingStore, DEFAULT_TRACK
+from ..timefmt import format_time
+
+# Texts are formatted in data(), so only the rows the view paints pay for
+# format_time; adding a row is one beginInsertRows regardless of table size.
+
+_CENTER = int(Qt.AlignmentFlag.AlignCenter)
+_WHITE = QColor(255, 255, 255)
+_FASTEST = QColor(255, 0, 255)
+_PODIUM = (QColor(255, 215, 0), QColor(192, 192, 192), QColor(205, 127, 50))
+
+
+class LapHistoryModel(QAbstractTableModel):
+    """Every LAP event of the race, newest first."""
+
+    HEADERS = ["Auto", "Vuelta", "Tiempo", "Gap", "Sectores"]
+    GAP_COL = 3
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._events: list[LapEvent] = []  # oldest first; row 0 is the last one
+        self.fastest_lap_ms = 0
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._events)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        ev = self._events[len(self._events) - 1 - index.row()]
+        col = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if col == 0:
+                return ev.car_name
+            if col == 1:
+                return str(ev.lap_number)
+            if col == 2:
+                return format_time(ev.lap_time_ms)
+            if col == self.GAP_COL:
+                if ev.lap_time_ms > self.fastest_lap_ms:
+                    return format_time(ev.lap_time_ms - self.fastest_lap_ms)
+                return "RÁPIDA"
+            return " | ".join(format_time(ms) for ms in ev.sectors_ms)
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return _CENTER
+        if (role == Qt.ItemDataRole.ForegroundRole and col == self.GAP_COL
+                and ev.lap_time_ms <= self.fastest_lap_ms):
+            return QBrush(_FASTEST)
+        return None
+
+    def add_event(self, event: LapEvent) -> bool:
+        """Prepend a lap; returns True if it is the new fastest lap."""
+        self.beginInsertRows(QModelIndex(), 0, 0)
+        self._events.append(event)
+        self.endInsertRows()
+        if self.fastest_lap_ms and event.lap_time_ms >= self.fastest_lap_ms:
+            return False
+        self.fastest_lap_ms = event.lap_time_ms
+        # Every gap is relative to the fastest lap; the view repaints only what it shows
+        if len(self._events) > 1:
+            self.dataChanged.emit(self.index(0, self.GAP_COL),
+                                  self.index(len(self._events) - 1, self.GAP_COL))
+        return True
+
+    def add_events(self, events: list[LapEvent]) -> Optional[LapEvent]:
+        """Prepend several laps in one insert; returns the new fastest lap among them, if any."""
+        if not events:
+            return None
+        self.beginInsertRows(QModelIndex(), 0, len(events) - 1)
+        self._events.extend(events)
+        self.endInsertRows()
+        fastest = min(events, key=lambda e: e.lap_time_ms)
+        if self.fastest_lap_ms and fastest.lap_time_ms >= self.fastest_lap_ms:
+            return None
+        self.fastest_lap_ms = fastest.lap_time_ms
+        if len(self._events) > 1:
+            self.dataChanged.emit(self.index(0, self.GAP_COL),
+                                  self.index(len(self._events) - 1, self.GAP_COL))
+        return fastest
+
+    def clear(self):
+        self.set_events([])
+
+    def set_events(self, events: list[LapEvent]):
+        """Replace the whole history (oldest first) in one model reset."""
+        self.beginResetModel()
+        self._events = list(events)
+        self.fastest_lap_ms = min((e.lap_time_ms for e in events), default=0)
+        self.endResetModel()
+
+    def fastest_event(self) -> Optional[LapEvent]:
+        return min(self._events, key=lambda e: e.lap_time_ms, default=None)
+
+
+class StandingsTableModel(QAbstractTableModel):
+    """Classification rows as given by ``RaceManager.get_standings``."""
+
+    HEADERS = ["Pos", "Auto", "Vtas", "Mejor", "Última"]
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self._rows: list[dict] = []
+        self._keys: list[tuple] = []  # what each row shows, to skip unchanged rows
+        self.trend: dict[int, int] = {}  # car_id -> +1 gained / -1 lost
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._rows)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        s = self._rows[index.row()]
+        col = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if col == 0:
+                trend = self.trend.get(s["id"], 0)
+                return f"{index.row() + 1}{' ▲' if trend > 0 else ' ▼' if trend < 0 else ''}"
+            if col == 1:
+                return s["name"]
+            if col == 2:
+                return str(s["laps"])
+            return format_time(s["best_ms"] if col == 3 else s["last_ms"])
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return _CENTER
+        if col == 1 and role == Qt.ItemDataRole.ForegroundRole:
+            return QBrush(QColor(*s["color"][::-1]) if s.get("color") else _WHITE)
+        if col == 1 and role == Qt.ItemDataRole.ToolTipRole:
+            return self._stats_tooltip(s)
+        return None
+
+    def update_standings(self, standings: list[dict]):
+        """Replace the rows, notifying the view only for rows that changed."""
+        old, new = len(self._rows), len(standings)
+        if new > old:
+            self.beginInsertRows(QModelIndex(), old, new - 1)
+            self._rows.extend(standings[old:])
+            self._keys.extend([()] * (new - old))
+            self.endInsertRows()
+        elif new < old:
+            self.beginRemoveRows(QModelIndex(), new, old - 1)
+            del self._rows[new:], self._keys[new:]
+            self.endRemoveRows()
+
+        last = self.columnCount() - 1
+        for row, s in enumerate(standings):
+            key = (s["id"], s["name"], s["laps"], s["best_ms"], s["last_ms"],
+                   s.get("color"), self.trend.get(s["id"], 0))
+            self._rows[row] = s
+            if self._keys[row] != key:
+                self._keys[row] = key
+                self.dataChanged.emit(self.index(row, 0), self.index(row, last))
+
+    @staticmethod
+    def _stats_tooltip(s: dict) -> str:
+        if not s.get("laps"):
+            return s["name"]
+        return (
+            f"Promedio: {format_time(s.get('avg_ms', 0))}\n"
+            f"Últimas vueltas: {format_time(s.get('last_n_avg_ms', 0))}\n"
+            f"Consistencia (σ): {format_time(s.get('stddev_ms', 0))}\n"
+            f"Mejor teórica: {format_time(s.get('theoretical_best_ms', 0))}"
+        )
+
+
+class RankingTableModel(QAbstractTableModel):
+    """One ranking partition, read from the store a page at a time."""
+
+    HEADERS = ["#", "Jugador", "Total", "Mejor Vta", "Fecha"]
+    PAGE_SIZE = 200
+    MAX_PAGES = 20  # cached pages; the oldest is dropped beyond this
+
+    def __init__(self, store: RankingStore, laps: int, track: str = DEFAULT_TRACK,
+                 parent=None):
+        super().__init__(parent)
+        self._store = store
+        self._laps = laps
+        self._track = track
+        self._pages: dict[int, list[dict]] = {}
+        self._count = store.count(laps, track)
+
+    @property
+    def track(self) -> str:
+        return self._track
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else self._count
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def entry(self, row: int) -> Optional[dict]:
+        if not 0 <= row < self._count:
+            return None
+        page_no = row // self.PAGE_SIZE
+        page = self._pages.get(page_no)
+        if page is None:
+            if len(self._pages) >= self.MAX_PAGES:
+                del self._pages[next(iter(self._pages))]
+            page = self._pages[page_no] = self._store.top(
+                self._laps, self._track, self.PAGE_SIZE, page_no * self.PAGE_SIZE)
+        offset = row - page_no * self.PAGE_SIZE
+        return page[offset] if offset < len(page) else None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        row, col = index.row(), index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            entry = self.entry(row)
+            if entry is None:
+                return ""
+            if col == 0:
+                return str(row + 1)
+            if col == 1:
+                return entry.get("player", "???")
+            if col == 2:
+                return format_time(entry.get("total_ms", 0))
+            if col == 3:
+                return format_time(entry.get("best_lap_ms", 0))
+            return entry.get("date", "")[:10]
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return _CENTER
+        if role == Qt.ItemDataRole.ForegroundRole and row < len(_PODIUM):
+            return QBrush(_PODIUM[row])
+        if role == Qt.ItemDataRole.FontRole and row == 0 and col == 0:
+            return QFont("Consolas", 14, QFont.Weight.Bold)
+        return None
+
+    def set_partition(self, laps: int, track: str):
+        self.beginResetModel()
+        self._laps, self._track = laps, track
+        self._reload()
+        self.endResetModel()
+
+    def refresh(self):
+        self.beginResetModel()
+        self._reload()
+        self.endResetModel()
+
+    def _reload(self):
+        self._pages.clear()
+        self._count = self._store.count(self._laps, self._track)
+
+    def insert_entry(self, entry: dict):
+        """A run was saved at ``entry["position"]``: one row insert, no reload."""
+        if entry.get("laps") != self._laps or entry.get("track") != self._track:
+            return
+        row = min(max(entry["position"] - 1, 0), self._count)
+        self.beginInsertRows(QModelIndex(), row, row)
+        self._drop_pages_from(row)
+        self._count += 1
+        self.endInsertRows()
+
+    def remove_row(self, row: int):
+        if not 0 <= row < self._count:
+            return
+        self.beginRemoveRows(QModelIndex(), row, row)
+        self._drop_pages_from(row)
+        self._count -= 1
+        self.endRemoveRows()
+
+    def _drop_pages_from(self, row: int):
+        first = row // self.PAGE_SIZE
+        for page_no in [p for p in self._pages if p >= first]:
+            del self._pages[page_no]
+
+
+class RaceListModel(QAbstractTableModel):
+    """Saved races as catalog rows (``archive.catalog.browse_races``), newest first."""
+
+    HEADERS = ["Fecha", "Autos", "Vueltas", "Duracion"]
+
+    def __init__(self, races: list[dict], parent=None):
+        super().__init__(parent)
+        self._races = races
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self._races)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.HEADERS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return self.HEADERS[section]
+        return None
+
+    def race(self, row: int) -> Optional[dict]:
+        return self._races[row] if 0 <= row < len(self._races) else None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        race = self._races[index.row()]
+        col = index.column()
+        if role == Qt.ItemDataRole.DisplayRole:
+            if col == 0:
+                return race["date"][:19].replace("T", " ") or race["id"]
+            if col == 1:
+                return str(race["num_cars"])
+            if col == 2:
+                return str(race["total_laps"])
+            return format_time(race["duration_ms"])
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return _CENTER
+        if role == Qt.ItemDataRole.ToolTipRole:
+            return race["path"]
+        return None